@@ -0,0 +1,133 @@
+"""
+app/asr_batching.py
+Micro-batching des requêtes ASR concurrentes.
+
+Les clips qui arrivent dans une courte fenêtre (ASR_BATCH_WINDOW_MS, 30 ms par
+défaut) sont regroupés, jusqu'à `max_batch` clips, puis décodés ensemble par
+ASRModule.process_batch (passé à submit) dans le pool ASR. Chaque appelant reçoit son propre dict
+de résultat, identique à celui de process_audio.
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+
+from app.asr_pool import ASRQueueFull
+
+
+class _BatchItem:
+    __slots__ = ("process_batch", "audio", "options", "future")
+
+    def __init__(self, process_batch, audio, options):
+        self.process_batch = process_batch
+        self.audio = audio
+        self.options = options
+        self.future = Future()
+
+
+class ASRBatcher:
+    def __init__(self, pool, max_batch: int = 8, window_ms: float = 30.0):
+        self.pool = pool
+        self.max_batch = max(1, max_batch)
+        self.window = window_ms / 1000.0
+
+        # Au plus un lot plein par place de la file du pool : au-delà on rejette tout de suite
+        self._pending = queue.Queue(maxsize=pool.max_queue * self.max_batch)
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._batch_sizes = Counter()
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._collect_loop, name="asr-batcher", daemon=True)
+        self._thread.start()
+        print(f"[ASR BATCH] Lots de {self.max_batch} clips max, fenêtre {self.window * 1000:.0f} ms")
+
+    def stop(self) -> None:
+        if not self._running:
+            return
+        self._running = False
+        self._pending.put(None)
+        self._thread.join(5.0)
+
+    def submit(self, process_batch, audio, **options) -> Future:
+        """ `process_batch` : ASRModule.process_batch ; `audio` : signal float32 16 kHz """
+        item = _BatchItem(process_batch, audio, options)
+        try:
+            self._pending.put_nowait(item)
+        except queue.Full:
+            raise ASRQueueFull("File de micro-batching pleine") from None
+        return item.future
+
+    async def run(self, process_batch, audio, **options):
+        return await asyncio.wrap_future(self.submit(process_batch, audio, **options))
+
+    def _collect_loop(self) -> None:
+        while True:
+            first = self._pending.get()
+            if first is None:
+                return
+
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._pending.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._pending.put(None)  # on termine proprement après ce lot
+                    break
+                batch.append(item)
+
+            # Un lot par modèle et par jeu d'options de décodage (profil, langue...)
+            groups = {}
+            for item in batch:
+                key = (item.process_batch, tuple(sorted(item.options.items())))
+                groups.setdefault(key, []).append(item)
+            for items in groups.values():
+                self._dispatch(items)
+
+    def _dispatch(self, items) -> None:
+        with self._lock:
+            self._batch_sizes[len(items)] += 1
+
+        try:
+            job = self.pool.submit(items[0].process_batch, [it.audio for it in items], **items[0].options)
+        except Exception as e:
+            for it in items:
+                it.future.set_exception(e)
+            return
+
+        def _fan_out(done: Future) -> None:
+            error = done.exception()
+            for i, it in enumerate(items):
+                if error is not None:
+                    it.future.set_exception(error)
+                else:
+                    it.future.set_result(done.result()[i])
+
+        job.add_done_callback(_fan_out)
+
+    def stats(self) -> dict:
+        with self._lock:
+            sizes = dict(self._batch_sizes)
+        batches = sum(sizes.values())
+        clips = sum(size * n for size, n in sizes.items())
+        return {
+            "max_batch": self.max_batch,
+            "window_ms": round(self.window * 1000, 1),
+            "pending": self._pending.qsize(),
+            "batches": batches,
+            "clips": clips,
+            "avg_batch_size": round(clips / batches, 2) if batches else 0.0,
+            "batch_sizes": {str(k): v for k, v in sorted(sizes.items())},
+        }
@@ -0,0 +1,143 @@
+"""
+app/asr_pool.py
+Exécution des décodages ASR hors de la boucle asyncio.
+
+Un nombre fixe de threads consomme une file d'attente bornée. Quand la file est
+pleine, la soumission échoue immédiatement (HTTP 429) au lieu d'empiler des
+requêtes qui expireraient de toute façon côté robot. CTranslate2 relâche le GIL
+pendant l'inférence : avec `num_workers` égal au nombre de threads, un même
+WhisperModel traite plusieurs décodages en parallèle.
+"""
+import asyncio
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from app.metrics import summarize
+
+
+class ASRQueueFull(Exception):
+    """ File d'attente pleine : le client doit réessayer plus tard (HTTP 429) """
+
+
+class ASRPoolClosed(Exception):
+    """ Pool arrêté ou pas encore démarré (HTTP 503) """
+
+
+class _Job:
+    __slots__ = ("fn", "args", "kwargs", "future", "enqueued_at")
+
+    def __init__(self, fn, args, kwargs):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = Future()
+        self.enqueued_at = time.perf_counter()
+
+
+class ASRWorkerPool:
+    def __init__(self, workers: int = 2, max_queue: int = 8, name: str = "asr", history: int = 500):
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.name = name
+
+        self._queue = queue.Queue(maxsize=self.max_queue)
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+
+        self._busy = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+        self._wait_times = deque(maxlen=history)  # temps passé dans la file (s)
+        self._run_times = deque(maxlen=history)  # temps d'exécution (s)
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        for i in range(self.workers):
+            t = threading.Thread(target=self._worker_loop, name=f"{self.name}-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        print(f"[ASR POOL] {self.workers} worker(s), file max {self.max_queue}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if not self._running:
+            return
+        self._running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """ Place un appel bloquant dans la file ; lève ASRQueueFull si elle est pleine """
+        if not self._running:
+            raise ASRPoolClosed(f"Pool {self.name} non démarré")
+
+        job = _Job(fn, args, kwargs)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            with self._lock:
+                self._counters["rejected"] += 1
+            raise ASRQueueFull(f"File {self.name} pleine ({self.max_queue} requêtes en attente)") from None
+
+        with self._lock:
+            self._counters["submitted"] += 1
+        return job.future
+
+    async def run(self, fn, *args, **kwargs):
+        """ Variante awaitable de submit() pour les endpoints asyncio """
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def _worker_loop(self) -> None:
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            if not job.future.set_running_or_notify_cancel():
+                continue
+
+            started = time.perf_counter()
+            with self._lock:
+                self._busy += 1
+                self._wait_times.append(started - job.enqueued_at)
+
+            try:
+                result = job.fn(*job.args, **job.kwargs)
+            except BaseException as e:
+                job.future.set_exception(e)
+                outcome = "failed"
+            else:
+                job.future.set_result(result)
+                outcome = "completed"
+
+            with self._lock:
+                self._busy -= 1
+                self._counters[outcome] += 1
+                self._run_times.append(time.perf_counter() - started)
+
+    def stats(self) -> dict:
+        with self._lock:
+            waits = list(self._wait_times)
+            runs = list(self._run_times)
+            busy = self._busy
+            counters = dict(self._counters)
+
+        return {
+            "workers": self.workers,
+            "busy": busy,
+            "queue_depth": self._queue.qsize(),
+            "max_queue": self.max_queue,
+            **counters,
+            "wait_ms": summarize(waits, scale=1000.0),
+            "run_ms": summarize(runs, scale=1000.0),
+        }
@@ -0,0 +1,131 @@
+"""
+app/asr_stream.py
+Transcription incrémentale d'un flux PCM 16 kHz mono (int16 little-endian),
+utilisée par le WebSocket /v1/asr/stream.
+
+Le flux est décodé sur une fenêtre croissante (greedy, rapide). Les segments
+terminés depuis plus de `holdback` secondes sont considérés comme stables :
+ils sont validés et retirés de la fenêtre. Quand l'utilisateur se tait, il ne
+reste donc qu'une courte queue à décoder en beam search pour le résultat final.
+"""
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE, pcm16_to_float
+
+
+class StreamingTranscriber:
+    def __init__(self, asr, partial_interval=1.0, holdback=1.5, max_window=25.0,
+                 language_lock_prob=0.7, language=None, sample_rate=SAMPLE_RATE):
+        self.asr = asr
+        self.sample_rate = sample_rate
+        self.partial_interval = partial_interval  # secondes d'audio entre deux partiels
+        self.holdback = holdback  # marge avant de considérer un segment comme stable
+        self.max_window = max_window  # Whisper ne voit que 30 s : on force la validation avant
+        self.language_lock_prob = language_lock_prob
+
+        self.language = language  # langue épinglée de la session, sinon détectée au premier partiel
+        self._info = None
+        self._window = np.zeros(0, dtype=np.float32)
+        self._carry = b""  # octet orphelin si une trame arrive coupée au milieu d'un échantillon
+        self._pending = 0  # échantillons reçus depuis le dernier partiel
+        self._committed = []  # segments faster-whisper validés
+
+    @property
+    def window_duration(self):
+        return len(self._window) / self.sample_rate
+
+    @property
+    def committed_text(self):
+        return " ".join(s.text.strip() for s in self._committed).strip()
+
+    def feed(self, pcm_bytes):
+        """ Ajoute des trames PCM int16 ; renvoie True quand un partiel est dû """
+        data = self._carry + pcm_bytes
+        usable = len(data) - (len(data) % 2)
+        self._carry = data[usable:]
+        if usable == 0:
+            return False
+
+        samples = pcm16_to_float(data[:usable])
+        self._window = np.concatenate([self._window, samples])
+        self._pending += len(samples)
+        return self._pending >= self.partial_interval * self.sample_rate
+
+    def partial(self):
+        """ Décodage greedy de la fenêtre courante, validation des segments stables """
+        self._pending = 0
+        if self.window_duration < 0.3:
+            return self._partial_message([])
+
+        if self.asr.vad.detect(self._window) is None:
+            # Pas de voix dans la fenêtre : pas de décodage, on ne garde que la fin
+            if self.window_duration > 2 * self.holdback:
+                self._cut(self.window_duration - self.holdback)
+            return self._partial_message([])
+
+        segments, info, _ = self.asr.decode(
+            self._window,
+            beam_size=1,
+            language=self.language,
+            initial_prompt=self._prompt(),
+            condition_on_previous_text=False,
+        )
+        self._remember_language(info)
+
+        window_end = self.window_duration
+        stable = [s for s in segments if s.end <= window_end - self.holdback]
+        if window_end >= self.max_window and not stable:
+            # Fenêtre trop longue sans pause : on valide tout sauf le dernier segment
+            stable = segments[:-1] if len(segments) > 1 else segments
+
+        if stable:
+            self._committed.extend(stable)
+            self._cut(stable[-1].end)
+        elif not segments and window_end > 2 * self.holdback:
+            # Silence : inutile de garder (et de re-décoder) le début de la fenêtre
+            self._cut(window_end - self.holdback)
+
+        return self._partial_message(segments[len(stable):])
+
+    def final(self):
+        """ Décodage précis de la queue restante ; même format que /v1/asr """
+        tail, info, duration = [], self._info, 0.0
+        if self.window_duration >= 0.1 and self.asr.vad.detect(self._window) is not None:
+            tail, info, duration = self.asr.decode(
+                self._window,
+                beam_size=5,
+                language=self.language,
+                initial_prompt=self._prompt(),
+            )
+
+        self._window = self._window[:0]
+        if info is None:
+            result = self.asr.empty_result()
+        else:
+            result = self.asr.build_result(self._committed + list(tail), info, duration)
+        result["type"] = "final"
+        return result
+
+    def _cut(self, seconds):
+        cut = min(len(self._window), int(seconds * self.sample_rate))
+        self._window = self._window[cut:]
+
+    def _prompt(self):
+        # Le texte déjà validé sert de contexte au décodage de la suite
+        text = self.committed_text
+        return text[-200:] if text else None
+
+    def _remember_language(self, info):
+        self._info = info
+        if self.language is None and info.language_probability >= self.language_lock_prob:
+            self.language = info.language
+
+    def _partial_message(self, tentative):
+        stable_text = self.committed_text
+        tentative_text = " ".join(s.text.strip() for s in tentative).strip()
+        return {
+            "type": "partial",
+            "text": f"{stable_text} {tentative_text}".strip(),
+            "stable_text": stable_text,
+            "language": self.language,
+        }
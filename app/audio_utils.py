@@ -0,0 +1,146 @@
+"""
+app/audio_utils.py
+Décodage et rééchantillonnage audio en mémoire, sans passer par le disque.
+
+Tout le pipeline ASR travaille sur des signaux float32 mono à 16 kHz
+(le format attendu par faster-whisper quand on lui passe un tableau NumPy).
+"""
+import struct
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+
+_WAVE_FORMAT_PCM = 1
+_WAVE_FORMAT_IEEE_FLOAT = 3
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+class AudioDecodeError(ValueError):
+    pass
+
+
+def is_wav(data) -> bool:
+    return len(data) >= 12 and data[:4] == b"RIFF" and data[8:12] == b"WAVE"
+
+
+def pcm16_to_float(data) -> np.ndarray:
+    """ PCM int16 little-endian -> float32 dans [-1, 1] """
+    usable = len(data) - (len(data) % 2)
+    return np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def _pcm_to_float(data, sampwidth: int, audio_format: int) -> np.ndarray:
+    usable = len(data) - (len(data) % sampwidth)
+    data = data[:usable]
+
+    if audio_format == _WAVE_FORMAT_IEEE_FLOAT:
+        dtype = "<f4" if sampwidth == 4 else "<f8"
+        return np.frombuffer(data, dtype=dtype).astype(np.float32)
+    if sampwidth == 1:
+        # Le 8 bits WAV est non signé
+        return (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    if sampwidth == 2:
+        return pcm16_to_float(data)
+    if sampwidth == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        ints = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        ints = np.where(ints & 0x800000, ints - 0x1000000, ints)
+        return ints.astype(np.float32) / 8388608.0
+    if sampwidth == 4:
+        return np.frombuffer(data, dtype="<i4").astype(np.float32) / 2147483648.0
+    raise AudioDecodeError(f"Largeur d'échantillon non supportée: {sampwidth} octets")
+
+
+def decode_wav(data):
+    """
+    Décode un WAV complet en mémoire -> (signal float32 mono, fréquence).
+    Tolère les en-têtes de flux (taille de chunk 'data' nulle ou trop grande),
+    comme ceux produits par l'application micro du téléphone.
+    """
+    if not is_wav(data):
+        raise AudioDecodeError("En-tête RIFF/WAVE absent")
+
+    fmt = None
+    pos = 12
+    while pos + 8 <= len(data):
+        chunk_id = data[pos:pos + 4]
+        chunk_size = struct.unpack("<I", data[pos + 4:pos + 8])[0]
+        body = pos + 8
+
+        if chunk_id == b"fmt ":
+            if chunk_size < 16 or body + 16 > len(data):
+                raise AudioDecodeError("Chunk 'fmt ' tronqué")
+            audio_format, n_channels, sample_rate = struct.unpack("<HHI", data[body:body + 8])
+            bits = struct.unpack("<H", data[body + 14:body + 16])[0]
+            if audio_format == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                if body + 26 > len(data):
+                    raise AudioDecodeError("Chunk 'fmt ' tronqué")
+                audio_format = struct.unpack("<H", data[body + 24:body + 26])[0]
+            if n_channels < 1:
+                raise AudioDecodeError(f"Nombre de canaux invalide: {n_channels}")
+            if sample_rate <= 0:
+                raise AudioDecodeError(f"Fréquence d'échantillonnage invalide: {sample_rate}")
+            if bits < 8:
+                raise AudioDecodeError(f"Largeur d'échantillon non supportée: {bits} bits")
+            fmt = (audio_format, n_channels, sample_rate, bits // 8)
+
+        elif chunk_id == b"data":
+            if fmt is None:
+                raise AudioDecodeError("Chunk 'data' avant le chunk 'fmt '")
+            end = body + chunk_size
+            if chunk_size == 0 or end > len(data):
+                end = len(data)
+            audio_format, n_channels, sample_rate, sampwidth = fmt
+            if audio_format not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_IEEE_FLOAT):
+                raise AudioDecodeError(f"Format WAV non supporté: {audio_format}")
+            samples = _pcm_to_float(data[body:end], sampwidth, audio_format)
+            return to_mono(samples, n_channels), sample_rate
+
+        pos = body + chunk_size + (chunk_size % 2)
+
+    raise AudioDecodeError("Chunk 'data' introuvable")
+
+
+def to_mono(samples: np.ndarray, n_channels: int) -> np.ndarray:
+    if n_channels <= 1:
+        return samples
+    usable = len(samples) - (len(samples) % n_channels)
+    return samples[:usable].reshape(-1, n_channels).mean(axis=1)
+
+
+def resample(samples: np.ndarray, orig_sr: int, target_sr: int = SAMPLE_RATE) -> np.ndarray:
+    """ Rééchantillonnage linéaire (suffisant pour la parole vers 16 kHz) """
+    if orig_sr <= 0:
+        raise AudioDecodeError(f"Fréquence d'échantillonnage invalide: {orig_sr}")
+    if orig_sr == target_sr or len(samples) == 0:
+        return samples.astype(np.float32, copy=False)
+    n_out = int(round(len(samples) * target_sr / orig_sr))
+    positions = np.arange(n_out, dtype=np.float64) * (orig_sr / target_sr)
+    return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+
+def load_audio(audio, sample_rate=None) -> np.ndarray:
+    """
+    Convertit une entrée en mémoire en signal float32 mono 16 kHz :
+    - bytes WAV (en-tête RIFF) : décodés, la fréquence du fichier fait foi ;
+    - autres bytes : PCM int16 brut à `sample_rate` (16 kHz par défaut) ;
+    - tableau NumPy : entiers 16 bits ou flottants, à `sample_rate` (16 kHz par défaut).
+    """
+    if isinstance(audio, np.ndarray):
+        if audio.dtype == np.int16:
+            samples = audio.astype(np.float32) / 32768.0
+        else:
+            samples = audio.astype(np.float32, copy=False)
+        if samples.ndim > 1:
+            samples = samples.mean(axis=1)
+        return resample(samples, SAMPLE_RATE if sample_rate is None else sample_rate)
+
+    if isinstance(audio, (bytes, bytearray, memoryview)):
+        data = bytes(audio)
+        if is_wav(data):
+            samples, wav_rate = decode_wav(data)
+            return resample(samples, wav_rate)
+        return resample(pcm16_to_float(data), SAMPLE_RATE if sample_rate is None else sample_rate)
+
+    raise AudioDecodeError(f"Type d'entrée audio non supporté: {type(audio).__name__}")
@@ -0,0 +1,243 @@
+"""
+app/context_window.py
+Token-budgeted conversation context with rolling summarization.
+
+The prompt sent to the LLM is: system prompt (+ summary of the older turns) and
+the most recent messages that fit in the backend's token budget
+(`max_tokens - reserve_tokens`, the reserve being left for the reply). Once the
+history grows past `fold_at` of that budget, the oldest `summary_chunk` messages
+are folded into the summary by a background thread, off the response path; the
+turn being answered just drops whatever does not fit. The summary itself is
+capped at `summary_max_tokens`, so a verbose summary cannot eat the budget of
+the recent messages. Folding whole chunks
+(instead of sliding one message per turn) keeps the start of the prompt
+identical from one turn to the next, so servers with prompt caching (Ollama,
+llama.cpp) only re-evaluate the new messages and prompt time stays flat.
+
+Token counts use a HuggingFace tokenizer.json when one is configured (and the
+`tokenizers` package is installed), otherwise a characters-per-token estimate.
+Configuration: configs/context_window.json ("default" keys, overridden per backend).
+"""
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.lru_cache import LRUCache
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:  # optional dependency (exact token counts)
+    Tokenizer = None
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", "context_window.json")
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "max_tokens": 2048,
+    "reserve_tokens": 256,
+    "fold_at": 0.75,
+    "summary_chunk": 6,
+    "keep_recent": 4,
+    "summary_max_tokens": 256,
+    "max_messages": 200,
+    "tokenizer": None,
+    "chars_per_token": 3.5,
+}
+
+SUMMARY_HEADER = "\n\nRésumé de la conversation jusqu'ici :\n"
+SUMMARY_PROMPT = (
+    "Tu résumes une conversation entre un visiteur et le robot d'accueil d'une salle multisports. "
+    "Écris en français un résumé factuel de quelques phrases : demandes du visiteur, informations données, "
+    "réservations en cours (activité, créneau), préférences exprimées. N'invente rien."
+)
+
+
+class TokenCounter:
+    """Token counts for one backend: exact with a tokenizer.json, else estimated from the text length."""
+
+    MESSAGE_OVERHEAD = 4  # role and separators added by chat templates
+
+    def __init__(self, tokenizer_path: Optional[str] = None, chars_per_token: float = 3.5):
+        self.chars_per_token = chars_per_token
+        self._tokenizer = None
+        self._memo = LRUCache(2048)
+        if tokenizer_path:
+            if Tokenizer is None:
+                print("[Context] tokenizers not installed, token counts are estimated")
+            else:
+                try:
+                    self._tokenizer = Tokenizer.from_file(tokenizer_path)
+                except Exception as e:
+                    print(f"[Context] Could not load tokenizer {tokenizer_path} ({e}), token counts are estimated")
+
+    @property
+    def exact(self) -> bool:
+        return self._tokenizer is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._tokenizer is None:
+            return int(len(text) / self.chars_per_token) + 1
+        tokens = self._memo.get(text)
+        if tokens is None:
+            tokens = len(self._tokenizer.encode(text, add_special_tokens=False).ids)
+            self._memo.set(text, tokens)
+        return tokens
+
+    def count_message(self, message: Dict[str, str]) -> int:
+        return self.count(message.get("content", "")) + self.MESSAGE_OVERHEAD
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """Longest prefix of `text` within `max_tokens`, cut on a word boundary when possible."""
+        if self.count(text) <= max_tokens:
+            return text
+        if self._tokenizer is None:
+            end = max(0, int((max_tokens - 1) * self.chars_per_token))
+        else:
+            offsets = self._tokenizer.encode(text, add_special_tokens=False).offsets
+            end = offsets[max_tokens - 1][1] if max_tokens > 0 else 0
+        cut = text[:end]
+        space = cut.rfind(" ")
+        return (cut[:space] if space > 0 else cut).rstrip()
+
+
+class ContextBuilder:
+    def __init__(self, llm, max_tokens: int = 2048, reserve_tokens: int = 256, fold_at: float = 0.75,
+                 summary_chunk: int = 6, keep_recent: int = 4, summary_max_tokens: int = 256,
+                 max_messages: int = 200, counter: Optional[TokenCounter] = None, enabled: bool = True):
+        self.llm = llm
+        self.enabled = enabled
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.fold_at = fold_at
+        self.summary_chunk = max(2, summary_chunk)
+        self.keep_recent = max(1, keep_recent)
+        self.summary_max_tokens = summary_max_tokens
+        self.max_messages = max_messages
+        self.counter = counter or TokenCounter()
+        # guards session["history"] / session["summary"] against the folding thread
+        self.lock = threading.RLock()
+        self._folding = set()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summary")
+        self._counters = {"folds": 0, "fold_errors": 0, "truncated_turns": 0}
+
+    @classmethod
+    def from_config(cls, llm, config_path: str = DEFAULT_CONFIG_PATH) -> "ContextBuilder":
+        """Settings for llm.backend: DEFAULT_CONFIG, then the file's "default", then its "backends" entry."""
+        cfg = dict(DEFAULT_CONFIG)
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        cfg["enabled"] = data.get("enabled", cfg["enabled"])
+        cfg.update(data.get("default", {}))
+        cfg.update(data.get("backends", {}).get(llm.backend, {}))
+        tokenizer = cfg["tokenizer"]
+        if tokenizer and not os.path.isabs(tokenizer):
+            tokenizer = os.path.join(os.path.dirname(os.path.abspath(config_path)), "..", tokenizer)
+        return cls(llm, max_tokens=cfg["max_tokens"], reserve_tokens=cfg["reserve_tokens"],
+                   fold_at=cfg["fold_at"], summary_chunk=cfg["summary_chunk"], keep_recent=cfg["keep_recent"],
+                   summary_max_tokens=cfg["summary_max_tokens"], max_messages=cfg["max_messages"], counter=TokenCounter(tokenizer, cfg["chars_per_token"]),
+                   enabled=cfg["enabled"])
+
+    # ---------- Prompt ----------
+
+    @staticmethod
+    def system_prompt(base_prompt: str, session: Dict[str, Any]) -> str:
+        summary = session.get("summary")
+        return base_prompt + SUMMARY_HEADER + summary if summary else base_prompt
+
+    def budget(self, system_prompt: str) -> int:
+        """Tokens left for the history once the system prompt and the reply reserve are counted."""
+        return self.max_tokens - self.reserve_tokens - self.counter.count(system_prompt) - TokenCounter.MESSAGE_OVERHEAD
+
+    def build(self, base_prompt: str, session: Dict[str, Any]) -> Tuple[str, List[Dict[str, str]]]:
+        """(system prompt with the summary, most recent messages fitting in the budget)."""
+        with self.lock:
+            history = list(session.get("history", []))
+            system_prompt = self.system_prompt(base_prompt, session)
+        if not self.enabled:
+            return system_prompt, history
+
+        budget = self.budget(system_prompt)
+        used, start = 0, len(history)
+        while start > 0:
+            cost = self.counter.count_message(history[start - 1])
+            # the latest message always goes in, even alone over budget
+            if used + cost > budget and start < len(history):
+                break
+            used += cost
+            start -= 1
+        if start > 0:
+            self._count("truncated_turns")
+        return system_prompt, history[start:]
+
+    def trim(self, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Hard cap on the stored history (memory bound, independent of the summary)."""
+        return history[-self.max_messages:] if len(history) > self.max_messages else history
+
+    # ---------- Summary folding ----------
+
+    def maybe_fold(self, sessions, session_id: str, base_prompt: str) -> bool:
+        """Schedule a fold of the oldest messages if the history is past `fold_at` of the budget."""
+        if not self.enabled:
+            return False
+        with self.lock:
+            if session_id in self._folding:
+                return False
+            session = sessions.get(session_id)
+            history = session.get("history", [])
+            foldable = len(history) - self.keep_recent
+            if foldable < 2:
+                return False
+            tokens = sum(self.counter.count_message(m) for m in history)
+            if tokens <= self.fold_at * self.budget(self.system_prompt(base_prompt, session)):
+                return False
+            chunk = history[:min(self.summary_chunk, foldable)]
+            self._folding.add(session_id)
+        self._executor.submit(self._fold, sessions, session_id, session.get("summary"), chunk)
+        return True
+
+    def _fold(self, sessions, session_id: str, summary: Optional[str], chunk: List[Dict[str, str]]) -> None:
+        try:
+            lines = [("Visiteur" if m["role"] == "user" else "Robot") + " : " + m["content"] for m in chunk]
+            request = ("Résumé actuel :\n" + summary + "\n\n" if summary else "") + \
+                      "Échanges à intégrer au résumé :\n" + "\n".join(lines)
+            new_summary = self.llm.generate_chat(SUMMARY_PROMPT, [{"role": "user", "content": request}]).strip()
+            new_summary = self.counter.truncate(new_summary, self.summary_max_tokens)
+            if not new_summary:
+                raise ValueError("empty summary")
+            with self.lock:
+                session = sessions.get(session_id)
+                history = session.get("history", [])
+                # the session may have been reset or trimmed meanwhile: only fold what is still there
+                if history[:len(chunk)] != chunk or session.get("summary") != summary:
+                    return
+                session["history"] = history[len(chunk):]
+                session["summary"] = new_summary
+                sessions.update(session_id, session)
+                self._counters["folds"] += 1
+            print(f"[Context] Session {session_id}: {len(chunk)} messages folded into the summary")
+        except Exception as e:
+            self._count("fold_errors")
+            print(f"[Context] Summary failed for session {session_id}: {e}")
+        finally:
+            with self.lock:
+                self._folding.discard(session_id)
+
+    def _count(self, counter: str) -> None:
+        with self.lock:
+            self._counters[counter] += 1
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self.lock:
+            counters = dict(self._counters)
+            folding = len(self._folding)
+        return {"enabled": self.enabled, "max_tokens": self.max_tokens, "exact_tokens": self.counter.exact,
+                "folding": folding, **counters}
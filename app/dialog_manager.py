@@ -4,9 +4,14 @@ Dialog manager that uses LLMClient to generate assistant replies and
 maintains per-session message history (user/assistant).
 Falls back to simple rule-based replies if LLM fails.
 """
-from typing import Tuple, Dict, Any, List
+from typing import Tuple, Dict, Any, List, Iterator, AsyncIterator
 from app.sessions import SessionStore
 from app.llm import LLMClient, LLMError
+from app.llm_router import LLMRouter
+from app.sentences import SentenceChunker
+from app.response_cache import ResponseCache, DEFAULT_CONFIG_PATH as CACHE_CONFIG_PATH
+from app.fast_path import FastPathRouter, DEFAULT_CONFIG_PATH as FAST_PATH_CONFIG_PATH
+from app.context_window import ContextBuilder, DEFAULT_CONFIG_PATH as CONTEXT_CONFIG_PATH
 import os
 import json
 import random
@@ -36,36 +41,95 @@ RULES = {
     "ask_activities": "Nous proposons fitness, basket, natation, tennis, futsal et yoga. Laquelle vous intéresse ?",
 }
 
-llm_openai = "llm_openai_config.json"
+# Ollama's native API, same server as llm_openai_config.json: the prompt prefix stays cached between turns
+llm_ollama = "llm_ollama_config.json"
 
 class DialogManager:
-    def __init__(self, sessions: SessionStore, llm_config_path: str = None):
+    def __init__(self, sessions: SessionStore, llm_config_path: str = None, cache_config_path: str = None,
+                 fast_path_config_path: str = None, context_config_path: str = None):
         self.sessions = sessions
-        cfg_path = llm_config_path or os.path.join(os.path.dirname(__file__), "..", "configs", llm_openai)
-        self.llm = LLMClient(cfg_path)
+        cfg_path = llm_config_path or os.path.join(os.path.dirname(__file__), "..", "configs", llm_ollama)
         # system prompt can be overridden in config file (optional)
         try:
             with open(cfg_path, "r", encoding="utf-8") as f:
                 cfg = json.load(f)
                 self.system_prompt = cfg.get("system_prompt", DEFAULT_SYSTEM_PROMPT)
         except Exception:
+            cfg = {}
             self.system_prompt = DEFAULT_SYSTEM_PROMPT
+        # a config listing "backends" (configs/llm_router.json) routes over several LLMs with failover
+        self.llm = LLMRouter.from_config(cfg_path) if "backends" in cfg else LLMClient(cfg_path)
+        # FAQ-style replies are served from cache (keyed on model, prompt, intent and recent history)
+        self.cache = ResponseCache.from_config(cache_config_path or CACHE_CONFIG_PATH)
+        self._cache_namespace = f"{self.llm.backend}:{self.llm.model}"
+        # Confident intents with a known answer skip the LLM entirely
+        self.fast_path = FastPathRouter.from_config(fast_path_config_path or FAST_PATH_CONFIG_PATH)
+        # Prompt kept under the backend's token budget, older turns folded into a summary
+        self.context = ContextBuilder.from_config(self.llm, context_config_path or CONTEXT_CONFIG_PATH)
 
     def _append_message(self, session_id: str, role: str, content: str) -> None:
+        with self.context.lock:
+            session = self.sessions.get(session_id)
+            history = session.setdefault("history", [])
+            history.append({"role": role, "content": content})
+            # the prompt size is bounded by the context builder; this only bounds memory
+            session["history"] = self.context.trim(history)
+            self.sessions.update(session_id, session)
+        if role == "assistant":
+            # after the reply, so the summary call never delays the answer
+            self.context.maybe_fold(self.sessions, session_id, self.system_prompt)
+
+    def _begin_turn(self, session_id: str, parse_result: Dict[str, Any]):
+        """Store the user message and return (intent, entities, system_prompt, history) for the LLM call."""
+        intent = parse_result.get("intent", "unknown")
+        entities = parse_result.get("entities", {})
+        user_text = parse_result.get("raw_text") or parse_result.get("text") or ""
+        # store user message in history
+        if user_text:
+            self._append_message(session_id, "user", user_text)
+
         session = self.sessions.get(session_id)
-        history = session.setdefault("history", [])
-        history.append({"role": role, "content": content})
-        # limit history length to avoid huge prompts (keep last N pairs)
-        max_msgs = 20
-        if len(history) > max_msgs:
-            # keep the last max_msgs entries
-            session["history"] = history[-max_msgs:]
-        self.sessions.update(session_id, session)
-
-    def handle(self, session_id: str, parse_result: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        system_prompt, history = self.context.build(self.system_prompt, session)
+        return intent, entities, system_prompt, history
+
+    def _cache_lookup(self, intent: str, system_prompt: str, history: List[Dict[str, str]], use_cache: bool):
+        """
+        (key, cached reply); key is None when this turn must not read nor feed the cache.
+        `system_prompt` is the one sent to the LLM: with a conversation summary, sessions only
+        share replies if their summaries match too.
+        """
+        if not self.cache.enabled:
+            return None, None
+        if not use_cache:
+            self.cache.count("skipped")
+            return None, None
+        if not self.cache.cacheable(intent):
+            self.cache.count("uncacheable")
+            return None, None
+        key = self.cache.key(self._cache_namespace, system_prompt, intent, history)
+        cached = self.cache.get(key)
+        if cached:
+            print("[DialogManager] Response cache hit for intent:", intent)
+        return key, cached
+
+    def _finish_turn(self, session_id: str, intent: str, entities: Dict[str, Any],
+                     assistant_text: str) -> Tuple[str, Dict[str, Any]]:
+        # Vérifier si la réponse est vide
+        if not assistant_text or not assistant_text.strip():
+            print("[DialogManager] WARNING: LLM returned empty response, using fallback")
+            raise LLMError("Empty response from LLM")
+
+        print("[DialogManager] LLM response length:", len(assistant_text))
+        # append assistant message to history
+        self._append_message(session_id, "assistant", assistant_text)
+        return assistant_text, self._actions(intent, entities)
+
+    def handle(self, session_id: str, parse_result: Dict[str, Any],
+               use_cache: bool = True) -> Tuple[str, Dict[str, Any]]:
         """
         parse_result should contain at least {"intent": str, "entities": {...}} and original text under 'raw_text'
         The robot should pass the user's raw text in parse_result['raw_text'] or we use last user message in session.
+        use_cache=False forces a fresh LLM answer (replies that depend on personal context).
         """
 
         # --- BLOC DE DEBUG AJOUTÉ ---
@@ -75,70 +139,194 @@ class DialogManager:
         print("[DEBUG DM] parse_result complet: {}".format(json.dumps(parse_result, indent=2)))
         # ----------------------------
 
-        intent = parse_result.get("intent", "unknown")
-        entities = parse_result.get("entities", {})
-        user_text = parse_result.get("raw_text") or parse_result.get("text") or ""
-        # store user message in history
-        if user_text:
-            self._append_message(session_id, "user", user_text)
-
-        session = self.sessions.get(session_id)
-        history: List[Dict[str, str]] = session.get("history", [])
+        intent, entities, system_prompt, history = self._begin_turn(session_id, parse_result)
+        templated = self.fast_path.route(parse_result)
+        if templated:
+            print("[DialogManager] Fast path answer for intent:", intent)
+            return self._finish_turn(session_id, intent, entities, templated)
+        key, cached = self._cache_lookup(intent, system_prompt, history, use_cache)
+        if cached:
+            return self._finish_turn(session_id, intent, entities, cached)
 
         # Try LLM generation
         try:
             print("[DialogManager] calling LLM with intent:", intent)
-            print("[DialogManager] System prompt length:", len(self.system_prompt))
+            print("[DialogManager] System prompt length:", len(system_prompt))
             print("[DialogManager] History length:", len(history))
 
-            # FIX: Utiliser self.system_prompt au lieu de ""
-            assistant_text = self.llm.generate_chat(self.system_prompt, history)
-            
-            # Vérifier si la réponse est vide
-            if not assistant_text or not assistant_text.strip():
-                print("[DialogManager] WARNING: LLM returned empty response, using fallback")
-                raise LLMError("Empty response from LLM")
-            
-            print("[DialogManager] LLM response length:", len(assistant_text))
-            
-            # append assistant message to history
-            self._append_message(session_id, "assistant", assistant_text)
-            # Basic post-processing or action extraction can be done here (simple heuristics)
-            actions = {}
-            # If parse_result intent is book_activity and entities provided, echo action
-            if intent == "book_activity":
-                activity = entities.get("activity")
-                time = entities.get("time")
-                if activity and time:
-                    # record booking in a simple file-based store (reuse previous mechanism)
-                    actions["booking"] = {"activity": activity, "time": time}
-            return assistant_text, actions
+            # FIX: Utiliser le system prompt (+ résumé) au lieu de ""
+            assistant_text = self.llm.generate_chat(system_prompt, history, session_id=session_id)
+            result = self._finish_turn(session_id, intent, entities, assistant_text)
+            if key:
+                self.cache.put(key, intent, assistant_text)
+            return result
         except LLMError as e:
             print("[DialogManager] LLMError:", e)
-            # fallback to rule-based answers
-            rule_val = RULES.get(intent)
-            if rule_val:
-                # si c'est une liste de phrases, on en choisit une au hasard
-                if isinstance(rule_val, list):
-                    tmpl = random.choice(rule_val)
-                else:
-                    tmpl = rule_val
-
-                # appliquer .format si la phrase contient des variables {…}
-                if "{" in tmpl:
-                    resp = tmpl.format(**entities)
-                else:
-                    resp = tmpl
-
-                # store fallback assistant reply
-                self._append_message(session_id, "assistant", resp)
-                return resp, {}
-
-            # default fallback message
-            default = "Désolé, le système de dialogue n'est pas disponible pour le moment. Pouvez-vous reformuler ?"
-            self._append_message(session_id, "assistant", default)
-            return default, {}
+            return self._fallback(session_id, intent, entities), {}
+
+    async def ahandle(self, session_id: str, parse_result: Dict[str, Any],
+                      use_cache: bool = True) -> Tuple[str, Dict[str, Any]]:
+        """
+        Asyncio variant of handle(): the LLM call goes through LLMClient.agenerate_chat, so a
+        conversation waiting on the model costs no thread. Session updates are in-memory and quick.
+        """
+        intent, entities, system_prompt, history = self._begin_turn(session_id, parse_result)
+        templated = self.fast_path.route(parse_result)
+        if templated:
+            return self._finish_turn(session_id, intent, entities, templated)
+        key, cached = self._cache_lookup(intent, system_prompt, history, use_cache)
+        if cached:
+            return self._finish_turn(session_id, intent, entities, cached)
+        try:
+            print("[DialogManager] calling LLM (async) with intent:", intent)
+            assistant_text = await self.llm.agenerate_chat(system_prompt, history, session_id=session_id)
+            result = self._finish_turn(session_id, intent, entities, assistant_text)
+            if key:
+                self.cache.put(key, intent, assistant_text)
+            return result
+        except LLMError as e:
+            print("[DialogManager] LLMError:", e)
+            return self._fallback(session_id, intent, entities), {}
+
+    def handle_stream(self, session_id: str, parse_result: Dict[str, Any],
+                      use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of handle(): yields {"type": "sentence", "text", "index"} events as soon as
+        each sentence of the LLM answer is complete, then a final
+        {"type": "end", "text", "actions", "session_id"} event carrying the full reply.
+        The full text is committed to the session history once, at the end of the stream.
+        """
+        turn = _StreamTurn(self, session_id, parse_result)
+        templated = self.fast_path.route(parse_result)
+        if templated:
+            # no LLM call: the whole answer is known, sentences go out immediately
+            yield from turn.feed(templated)
+            yield from turn.finish()
+            return
+        key, cached = self._cache_lookup(turn.intent, turn.system_prompt, turn.history, use_cache)
+        try:
+            if cached:
+                deltas = [cached]
+            else:
+                deltas = self.llm.generate_chat_stream(turn.system_prompt, turn.history, session_id=session_id)
+            for delta in deltas:
+                yield from turn.feed(delta)
+            events = turn.finish()
+            if key and not cached:
+                self.cache.put(key, turn.intent, turn.text)
+            yield from events
+        except LLMError as e:
+            yield from turn.fail(e)
+
+    async def ahandle_stream(self, session_id: str, parse_result: Dict[str, Any],
+                             use_cache: bool = True) -> AsyncIterator[Dict[str, Any]]:
+        """Asyncio variant of handle_stream(), same events."""
+        turn = _StreamTurn(self, session_id, parse_result)
+        templated = self.fast_path.route(parse_result)
+        if templated:
+            for event in turn.feed(templated) + turn.finish():
+                yield event
+            return
+        key, cached = self._cache_lookup(turn.intent, turn.system_prompt, turn.history, use_cache)
+        try:
+            if cached:
+                for event in turn.feed(cached):
+                    yield event
+            else:
+                async for delta in self.llm.agenerate_chat_stream(turn.system_prompt, turn.history,
+                                                                  session_id=session_id):
+                    for event in turn.feed(delta):
+                        yield event
+            events = turn.finish()
+            if key and not cached:
+                self.cache.put(key, turn.intent, turn.text)
+            for event in events:
+                yield event
+        except LLMError as e:
+            for event in turn.fail(e):
+                yield event
+
+    def _actions(self, intent: str, entities: Dict[str, Any]) -> Dict[str, Any]:
+        # Basic post-processing or action extraction can be done here (simple heuristics)
+        actions = {}
+        # If parse_result intent is book_activity and entities provided, echo action
+        if intent == "book_activity":
+            activity = entities.get("activity")
+            time = entities.get("time")
+            if activity and time:
+                # record booking in a simple file-based store (reuse previous mechanism)
+                actions["booking"] = {"activity": activity, "time": time}
+        return actions
+
+    def _fallback(self, session_id: str, intent: str, entities: Dict[str, Any]) -> str:
+        # fallback to rule-based answers
+        rule_val = RULES.get(intent)
+        if rule_val:
+            # si c'est une liste de phrases, on en choisit une au hasard
+            if isinstance(rule_val, list):
+                tmpl = random.choice(rule_val)
+            else:
+                tmpl = rule_val
+
+            # appliquer .format si la phrase contient des variables {…}
+            if "{" in tmpl:
+                resp = tmpl.format(**entities)
+            else:
+                resp = tmpl
+
+            # store fallback assistant reply
+            self._append_message(session_id, "assistant", resp)
+            return resp
+
+        # default fallback message
+        default = "Désolé, le système de dialogue n'est pas disponible pour le moment. Pouvez-vous reformuler ?"
+        self._append_message(session_id, "assistant", default)
+        return default
         
+class _StreamTurn:
+    """Sentence events of one streamed turn, shared by handle_stream() and ahandle_stream()."""
+
+    def __init__(self, manager: DialogManager, session_id: str, parse_result: Dict[str, Any]):
+        self.manager = manager
+        self.session_id = session_id
+        self.intent, self.entities, self.system_prompt, self.history = manager._begin_turn(session_id, parse_result)
+        self.chunker = SentenceChunker()
+        self.sentences: List[str] = []
+        self.text = ""
+        # exact generated text: stored in history so the next prompt matches the server's KV cache
+        self.raw_text = ""
+
+    def _sentence(self, text: str) -> Dict[str, Any]:
+        self.sentences.append(text)
+        return {"type": "sentence", "text": text, "index": len(self.sentences) - 1}
+
+    def _end(self, text: str, actions: Dict[str, Any]) -> Dict[str, Any]:
+        return {"type": "end", "text": text, "actions": actions, "session_id": self.session_id}
+
+    def feed(self, delta: str) -> List[Dict[str, Any]]:
+        self.raw_text += delta
+        return [self._sentence(sentence) for sentence in self.chunker.feed(delta)]
+
+    def finish(self) -> List[Dict[str, Any]]:
+        events = [self._sentence(sentence) for sentence in self.chunker.flush()]
+        if not self.sentences:
+            raise LLMError("Empty response from LLM")
+        self.text = " ".join(self.sentences)
+        self.manager._append_message(self.session_id, "assistant", self.raw_text.strip() or self.text)
+        return events + [self._end(self.text, self.manager._actions(self.intent, self.entities))]
+
+    def fail(self, error: LLMError) -> List[Dict[str, Any]]:
+        print("[DialogManager] LLMError during stream:", error)
+        if self.sentences:
+            # the robot already said part of the answer: keep what was streamed
+            assistant_text = " ".join(self.sentences)
+            self.manager._append_message(self.session_id, "assistant", assistant_text)
+            return [self._end(assistant_text, self.manager._actions(self.intent, self.entities))]
+        # nothing spoken yet: the rule-based answer replaces the whole reply
+        fallback = self.manager._fallback(self.session_id, self.intent, self.entities)
+        return [self._sentence(fallback), self._end(fallback, {})]
+
+
 if __name__ == "__main__":
     import time
     
@@ -0,0 +1,83 @@
+"""
+app/fast_path.py
+Deterministic answers for confidently recognized intents, without calling the LLM.
+
+Each intent listed in configs/fast_path.json has a minimum NLU confidence and one
+or more templates. Templates are str.format strings rendered with the NLU
+entities ({activity}, {location}...) and the structured "data" section of the
+config ({hours[semaine]}, {activities}...). A turn takes the fast path only if
+the intent is configured, the confidence reaches the threshold and at least one
+template can be fully rendered; everything else goes to the LLM.
+"""
+import json
+import os
+import random
+import string
+import threading
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", "fast_path.json")
+
+
+class FastPathRouter:
+    def __init__(self, intents: Dict[str, Dict[str, Any]], data: Optional[Dict[str, Any]] = None,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.intents = intents
+        self.data = data or {}
+        self._lock = threading.Lock()
+        self._answered = Counter()
+        self._counters = {"answered": 0, "low_confidence": 0, "missing_entities": 0, "not_configured": 0}
+
+    @classmethod
+    def from_config(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "FastPathRouter":
+        """Build from a JSON config file; a missing file disables the fast path."""
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                cfg = json.load(f)
+        except FileNotFoundError:
+            return cls({}, enabled=False)
+        return cls(cfg.get("intents", {}), cfg.get("data", {}), cfg.get("enabled", True))
+
+    def route(self, parse_result: Dict[str, Any]) -> Optional[str]:
+        """Templated answer for this NLU result, or None if the turn should go to the LLM."""
+        if not self.enabled:
+            return None
+        intent = parse_result.get("intent", "unknown")
+        rule = self.intents.get(intent)
+        if rule is None:
+            self._count("not_configured")
+            return None
+        if parse_result.get("confidence", 0.0) < rule.get("min_confidence", 1.0):
+            self._count("low_confidence")
+            return None
+
+        context = dict(self.data)
+        for label, values in (parse_result.get("entities") or {}).items():
+            context[label] = ", ".join(values) if isinstance(values, list) else values
+
+        candidates = [t for t in rule.get("templates", []) if self._renderable(t, context)]
+        if not candidates:
+            self._count("missing_entities")
+            return None
+
+        answer = random.choice(candidates).format(**context)
+        with self._lock:
+            self._counters["answered"] += 1
+            self._answered[intent] += 1
+        return answer
+
+    @staticmethod
+    def _renderable(template: str, context: Dict[str, Any]) -> bool:
+        fields: List[str] = [name for _, name, _, _ in string.Formatter().parse(template) if name]
+        # "hours[semaine]" / "hours.weekend" only need their root key
+        return all(field.split("[")[0].split(".")[0] in context for field in fields)
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"enabled": self.enabled, **self._counters, "by_intent": dict(self._answered)}
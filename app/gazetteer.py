@@ -0,0 +1,177 @@
+"""
+app/gazetteer.py
+Compiled gazetteer for ACTIVITY / LOCATION entities (Aho-Corasick over tokens).
+
+The catalogue (configs/gazetteer.json, optionally completed with the room names
+of the MongoDB `salle` collection) is normalized once and compiled into a token
+trie with failure links. Matching a text is then one left-to-right pass over its
+tokens, whatever the number of names, and does not need spaCy or the NER model.
+
+Normalization, applied identically to the catalogue and to the text:
+  - lowercase, accents removed ("secrétariat" == "secretariat");
+  - hyphens inside a word dropped ("basket-ball" == "basketball"),
+    apostrophes split ("l'accueil" -> "l", "accueil");
+  - plurals folded against the catalogue vocabulary: a word of the text keeps its
+    form if the catalogue has it ("paris", "prix"), otherwise it is matched as the
+    singular ("vestiaires" -> "vestiaire") or plural ("douche" -> "douches") word
+    of the catalogue.
+Overlapping matches resolve to the leftmost, then longest one ("salle de sport"
+beats "salle"). Matches carry the surface text, as spaCy entities do.
+"""
+import json
+import os
+import re
+import unicodedata
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", "gazetteer.json")
+
+_WORD = re.compile(r"\w+(?:-\w+)*")
+
+
+class Match(NamedTuple):
+    label: str      # "ACTIVITY", "LOCATION"...
+    name: str       # canonical catalogue name
+    text: str       # surface text in the input
+    start: int      # character offsets in the input
+    end: int
+
+
+def normalize_token(token: str, vocabulary: Optional[Set[str]] = None) -> str:
+    """Lowercase, accent- and hyphen-free token; with a vocabulary, plurals fold onto its words."""
+    token = unicodedata.normalize("NFKD", token.lower())
+    token = "".join(c for c in token if not unicodedata.combining(c)).replace("-", "")
+    if vocabulary is None or token in vocabulary or len(token) <= 3:
+        return token
+    if token[-1] in "sx" and token[:-1] in vocabulary:
+        return token[:-1]
+    for plural in (token + "s", token + "x"):
+        if plural in vocabulary:
+            return plural
+    return token
+
+
+def tokenize(text: str, vocabulary: Optional[Set[str]] = None) -> List[Tuple[str, int, int]]:
+    """(normalized token, start, end) for each word of text."""
+    return [(normalize_token(m.group(), vocabulary), m.start(), m.end()) for m in _WORD.finditer(text or "")]
+
+
+class Gazetteer:
+    def __init__(self, entries: Iterable[Tuple[str, str, Sequence[str]]] = ()):
+        """entries: (label, canonical name, aliases); the name itself is always a pattern."""
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, str, str]]] = [[]]  # (length in tokens, label, name)
+        self._vocabulary: Set[str] = set()  # normalized catalogue words
+        self._size = 0
+        for label, name, aliases in entries:
+            for pattern in (name, *aliases):
+                self._add(pattern, label, name)
+        self._compile()
+
+    @classmethod
+    def from_catalogue(cls, catalogue: Dict[str, List[Any]]) -> "Gazetteer":
+        """{"ACTIVITY": ["yoga", {"name": "basket-ball", "aliases": ["basket"]}], ...}"""
+        return cls(cls._entries(catalogue))
+
+    @classmethod
+    def from_config(cls, config_path: str = DEFAULT_CONFIG_PATH, mongo: Optional[bool] = None) -> "Gazetteer":
+        """Catalogue of the config file, plus the MongoDB names if its "mongo" section is enabled."""
+        with open(config_path, "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+        entries = list(cls._entries(cfg.get("catalogue", {})))
+        mongo_cfg = cfg.get("mongo", {})
+        if mongo if mongo is not None else mongo_cfg.get("enabled", False):
+            entries += load_mongo_entries(**{k: v for k, v in mongo_cfg.items() if k != "enabled"})
+        return cls(entries)
+
+    @staticmethod
+    def _entries(catalogue: Dict[str, List[Any]]) -> Iterable[Tuple[str, str, Sequence[str]]]:
+        for label, items in catalogue.items():
+            for item in items:
+                if isinstance(item, str):
+                    yield label, item, ()
+                else:
+                    yield label, item["name"], item.get("aliases", ())
+
+    # ---------- Compilation ----------
+
+    def _add(self, pattern: str, label: str, name: str) -> None:
+        tokens = [t for t, _, _ in tokenize(pattern)]
+        if not tokens:
+            return
+        self._vocabulary.update(tokens)
+        node = 0
+        for token in tokens:
+            child = self._goto[node].get(token)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][token] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = child
+        if not any(length == len(tokens) and lbl == label for length, lbl, _ in self._out[node]):
+            self._out[node].append((len(tokens), label, name))
+            self._size += 1
+
+    def _compile(self) -> None:
+        # breadth-first failure links; outputs of the suffix states are merged in
+        queue = list(self._goto[0].values())  # depth 1: failure link to the root
+        for node in queue:
+            for token, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and token not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(token, 0)
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+
+    def __len__(self) -> int:
+        return self._size
+
+    # ---------- Matching ----------
+
+    def find(self, text: str) -> List[Match]:
+        tokens = tokenize(text, self._vocabulary)
+        candidates = []  # (start token, -length, label, name)
+        node = 0
+        for i, (token, _, _) in enumerate(tokens):
+            while node and token not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(token, 0)
+            for length, label, name in self._out[node]:
+                candidates.append((i - length + 1, -length, label, name))
+
+        matches, next_free = [], 0
+        for first, neg_length, label, name in sorted(candidates):
+            if first < next_free:
+                continue
+            last = first - neg_length - 1
+            start, end = tokens[first][1], tokens[last][2]
+            matches.append(Match(label, name, text[start:end], start, end))
+            next_free = last + 1
+        return matches
+
+    def entities(self, text: str) -> Dict[str, List[str]]:
+        """Same shape as the NLU entities: {"activity": ["basket-ball"], "location": [...]}."""
+        entities: Dict[str, List[str]] = {}
+        for m in self.find(text):
+            entities.setdefault(m.label.lower(), []).append(m.text)
+        return entities
+
+
+def load_mongo_entries(collection: str = "salle", field: str = "nom",
+                       label: str = "LOCATION") -> List[Tuple[str, str, Sequence[str]]]:
+    """Names of the documents of a MongoDB collection (the rooms of `salle` by default)."""
+    try:
+        from app.DB_access import DatabaseMongo
+        db = DatabaseMongo()
+        try:
+            names = [doc.get(field) for doc in db.get_collection(collection).find({}, {field: 1})]
+        finally:
+            db.close()
+    except Exception as e:  # pymongo missing or database unreachable: config catalogue only
+        print(f"[Gazetteer] Could not load '{collection}' names from MongoDB: {e}")
+        return []
+    return [(label, name, ()) for name in names if isinstance(name, str) and name.strip()]
@@ -0,0 +1,257 @@
+"""
+app/http_transport.py
+Shared, connection-pooled HTTP transport for the LLM backends.
+
+A bare requests.post() opens a new TCP connection (plus a TLS handshake for
+OpenAI/Gemini) on every dialog turn. HTTPTransport keeps a requests.Session
+with a sized connection pool so connections stay alive between turns, and
+applies separate connect/read timeouts. With http2=True and httpx[http2]
+installed, https:// endpoints go through an HTTP/2 httpx.Client instead
+(one multiplexed connection per host); plain http:// (local Ollama, TGI)
+always uses the pooled requests session.
+
+get_transport() returns one shared instance per settings, so every LLMClient
+(and LLMManager) with the same configuration reuses the same pool.
+AsyncHTTPTransport / get_async_transport() are the asyncio counterparts, built
+on httpx.AsyncClient: a request waiting on the LLM holds no thread at all.
+"""
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+except ImportError:  # optional dependency (HTTP/2)
+    httpx = None
+
+
+class TransportError(Exception):
+    """Connection, timeout or protocol error raised by the underlying HTTP client."""
+
+
+class TransportResponse:
+    """Minimal response interface shared by the requests and httpx code paths."""
+
+    def __init__(self, raw, streamed: bool):
+        self._raw = raw
+        self._streamed = streamed
+        self.status_code = raw.status_code
+        # Without a charset, requests decodes text/* (text/event-stream included) as
+        # ISO-8859-1 and garbles accents; the LLM backends all send UTF-8.
+        if isinstance(raw, requests.Response) and "charset" not in raw.headers.get("Content-Type", "").lower():
+            raw.encoding = "utf-8"
+
+    @property
+    def text(self) -> str:
+        if self._streamed and httpx is not None and isinstance(self._raw, httpx.Response):
+            self._raw.read()
+        return self._raw.text
+
+    def json(self) -> Any:
+        return json.loads(self.text)
+
+    def iter_lines(self) -> Iterator[str]:
+        try:
+            if isinstance(self._raw, requests.Response):
+                yield from self._raw.iter_lines(decode_unicode=True)
+            else:
+                yield from self._raw.iter_lines()
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        except Exception as e:
+            if httpx is not None and isinstance(e, httpx.HTTPError):
+                raise TransportError(str(e)) from e
+            raise
+
+    def close(self) -> None:
+        self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HTTPTransport:
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 http2: bool = False, retries: int = 0):
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._session = requests.Session()
+        # max_retries only covers failed connections, never a request the server already received
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+        self._http2 = None
+        if http2:
+            try:
+                self._http2 = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                )
+            except (AttributeError, ImportError) as e:  # httpx or h2 missing
+                print(f"[HTTP] HTTP/2 unavailable ({e}), falling back to pooled HTTP/1.1")
+
+    @property
+    def http2(self) -> bool:
+        return self._http2 is not None
+
+    def _timeouts(self, timeout: Optional[float]) -> Tuple[float, float]:
+        return self.connect_timeout, timeout if timeout is not None else self.read_timeout
+
+    def request(self, method: str, url: str, *, params: Optional[Dict[str, Any]] = None, json: Any = None,
+                headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                stream: bool = False) -> TransportResponse:
+        """
+        Send a request over the shared pool. `timeout` overrides the read timeout only;
+        a streamed response must be closed (use it as a context manager) to free its connection.
+        """
+        connect_timeout, read_timeout = self._timeouts(timeout)
+        if self._http2 is not None and url.startswith("https://"):
+            try:
+                request = self._http2.build_request(method, url, params=params, json=json, headers=headers,
+                                                    timeout=httpx.Timeout(read_timeout, connect=connect_timeout))
+                return TransportResponse(self._http2.send(request, stream=stream), stream)
+            except httpx.HTTPError as e:
+                raise TransportError(str(e)) from e
+
+        try:
+            raw = self._session.request(method, url, params=params, json=json, headers=headers,
+                                        timeout=(connect_timeout, read_timeout), stream=stream)
+        except requests.RequestException as e:
+            raise TransportError(str(e)) from e
+        return TransportResponse(raw, stream)
+
+    def get(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> TransportResponse:
+        return self.request("POST", url, **kwargs)
+
+    def close(self) -> None:
+        self._session.close()
+        if self._http2 is not None:
+            self._http2.close()
+
+
+class AsyncTransportResponse:
+    """Asyncio counterpart of TransportResponse (httpx only)."""
+
+    def __init__(self, raw, streamed: bool):
+        self._raw = raw
+        self._streamed = streamed
+        self.status_code = raw.status_code
+
+    async def text(self) -> str:
+        if self._streamed:
+            await self._raw.aread()
+        return self._raw.text
+
+    async def json(self) -> Any:
+        return json.loads(await self.text())
+
+    async def iter_lines(self) -> AsyncIterator[str]:
+        try:
+            async for line in self._raw.aiter_lines():
+                yield line
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    async def close(self) -> None:
+        await self._raw.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+class AsyncHTTPTransport:
+    def __init__(self, pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 http2: bool = False, retries: int = 0):
+        if httpx is None:
+            raise ImportError("httpx is required for the async LLM path (pip install httpx)")
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # pool=None: beyond pool_size in-flight calls, requests wait for a free connection instead of failing
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout, pool=None)
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError as e:
+                print(f"[HTTP] HTTP/2 unavailable ({e}), falling back to pooled HTTP/1.1")
+                http2 = False
+        transport = httpx.AsyncHTTPTransport(http2=http2, limits=limits, retries=retries)
+        self._client = httpx.AsyncClient(transport=transport, timeout=timeout)
+
+    async def request(self, method: str, url: str, *, params: Optional[Dict[str, Any]] = None, json: Any = None,
+                      headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+                      stream: bool = False) -> AsyncTransportResponse:
+        """Same contract as HTTPTransport.request(); a streamed response must be closed (async with)."""
+        read_timeout = timeout if timeout is not None else self.read_timeout
+        request = self._client.build_request(method, url, params=params, json=json, headers=headers,
+                                             timeout=httpx.Timeout(read_timeout, connect=self.connect_timeout,
+                                                                   pool=None))
+        try:
+            return AsyncTransportResponse(await self._client.send(request, stream=stream), stream)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e)) from e
+
+    async def get(self, url: str, **kwargs) -> AsyncTransportResponse:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> AsyncTransportResponse:
+        return await self.request("POST", url, **kwargs)
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+_transports: Dict[Tuple, HTTPTransport] = {}
+_async_transports: Dict[Tuple, AsyncHTTPTransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_transport(pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                  http2: bool = False, retries: int = 0) -> HTTPTransport:
+    """Process-wide transport for these settings (created on first use)."""
+    key = (pool_size, connect_timeout, read_timeout, http2, retries)
+    with _transports_lock:
+        transport = _transports.get(key)
+        if transport is None:
+            transport = HTTPTransport(pool_size, connect_timeout, read_timeout, http2, retries)
+            _transports[key] = transport
+        return transport
+
+
+def get_async_transport(pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                        http2: bool = False, retries: int = 0) -> AsyncHTTPTransport:
+    """Process-wide async transport for these settings (to be used from the server's event loop)."""
+    key = (pool_size, connect_timeout, read_timeout, http2, retries)
+    with _transports_lock:
+        transport = _async_transports.get(key)
+        if transport is None:
+            transport = AsyncHTTPTransport(pool_size, connect_timeout, read_timeout, http2, retries)
+            _async_transports[key] = transport
+        return transport
+
+
+async def close_async_transports() -> None:
+    """Close the async pools (server shutdown)."""
+    with _transports_lock:
+        transports = list(_async_transports.values())
+        _async_transports.clear()
+    for transport in transports:
+        await transport.close()
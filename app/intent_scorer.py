@@ -0,0 +1,165 @@
+"""
+app/intent_scorer.py
+Intent scoring without spaCy, from the weights of the textcat (TextCatBOW) model.
+
+TextCatBOW is a linear model over hashed bag-of-ngrams: score(label) = bias +
+sum of the weights of the text's unigrams and bigrams, then softmax (exclusive
+classes) or logistic. export_intent_scorer() (app/nlu_train.py) reads, for every
+n-gram of the training sentences, the weights the hashed table gives it, drops the
+empty ones and writes the result to a compact file. IntentScorer loads it with
+the standard library only (json + array) and scores a sentence with a few dict
+lookups: no spaCy import, no vocab, no Doc. The only difference with spaCy is on
+n-grams never seen in training: 0 here, while in spaCy their hash may (rarely)
+land on a trained bucket.
+
+Tokenization follows spaCy's French tokenizer for the common cases (punctuation,
+elisions, "-moi"/"-vous"...); the whitespace-separated chunks of the training data
+that it would split differently are stored in the file with spaCy's own tokens.
+
+File format: b"ISC1", header length (uint32 little-endian), JSON header (labels,
+bias, features, exceptions...), then the float32 weights (little-endian), one row
+of len(labels) values per feature.
+"""
+import json
+import math
+import re
+import struct
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+MAGIC = b"ISC1"
+NGRAM_SEP = "\x1f"  # between the tokens of a n-gram feature (never part of a token)
+
+_LEADING = re.compile(r"^(?:\.\.\.|[\"'«“‘(\[{¿¡])")
+_TRAILING = re.compile(r"(?:\.\.\.|…|[\"'»”’)\]}?!.,;:%])$")
+_ELISION = re.compile(r"^(\w+['’])(\w.*)$")
+_HYPHEN_SUFFIX = re.compile(r"^(\w.*?)(-(?:t|moi|toi|nous|vous|il|elle|on|ils|elles|je|ce))$")
+_HYPHEN_INFIX = re.compile(r"(?<=\w)(-)(?=\w)")
+_NO_SPLIT = {"aujourd'hui", "aujourd’hui"}
+
+
+@lru_cache(maxsize=8192)
+def _split_chunk(chunk: str) -> Tuple[str, ...]:
+    """Default tokens of one whitespace-free chunk (prefixes, suffixes, elisions, hyphens)."""
+    prefix, suffix = [], []
+    while True:
+        m = _LEADING.match(chunk)
+        if not m or m.end() == len(chunk):
+            break
+        prefix.append(m.group())
+        chunk = chunk[m.end():]
+    while True:
+        m = _TRAILING.search(chunk)
+        if not m or m.start() == 0:
+            break
+        suffix.insert(0, m.group())
+        chunk = chunk[:m.start()]
+    middle = []
+    while chunk not in _NO_SPLIT:
+        m = _ELISION.match(chunk)
+        if not m:
+            break
+        middle.append(m.group(1))
+        chunk = m.group(2)
+    tail = []
+    while True:
+        m = _HYPHEN_SUFFIX.match(chunk)
+        if not m:
+            break
+        tail.insert(0, m.group(2))
+        chunk = m.group(1)
+    # "vas-tu", "basket-ball": the remaining hyphens are tokens of their own
+    middle += [part for part in _HYPHEN_INFIX.split(chunk) if part]
+    return tuple(prefix + middle + tail + suffix)
+
+
+class IntentScorer:
+    def __init__(self, labels: Sequence[str], bias: Sequence[float], features: Sequence[str],
+                 weights: Sequence[float], exceptions: Optional[Dict[str, List[str]]] = None,
+                 ngram_size: int = 2, exclusive: bool = True):
+        if len(weights) != len(features) * len(labels):
+            raise ValueError(f"{len(weights)} weights for {len(features)} features x {len(labels)} labels")
+        self.labels = list(labels)
+        self.bias = [float(b) for b in bias]
+        self.features = list(features)
+        self.weights = weights if isinstance(weights, array) else array("f", weights)
+        self.exceptions = dict(exceptions or {})
+        self.ngram_size = ngram_size
+        self.exclusive = exclusive
+        n = len(self.labels)
+        self._rows = {feature: tuple(self.weights[i * n:(i + 1) * n]) for i, feature in enumerate(self.features)}
+
+    # ---------- File ----------
+
+    def save(self, path: str) -> None:
+        header = json.dumps({
+            "labels": self.labels, "bias": self.bias, "features": self.features,
+            "exceptions": self.exceptions, "ngram_size": self.ngram_size, "exclusive": self.exclusive,
+        }, ensure_ascii=False).encode("utf-8")
+        weights = array("f", self.weights)
+        if sys.byteorder != "little":
+            weights.byteswap()
+        with open(path, "wb") as f:
+            f.write(MAGIC + struct.pack("<I", len(header)) + header)
+            weights.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> "IntentScorer":
+        with open(path, "rb") as f:
+            data = f.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f"{path} is not an intent scorer file")
+        (size,) = struct.unpack_from("<I", data, 4)
+        header = json.loads(data[8:8 + size].decode("utf-8"))
+        weights = array("f")
+        weights.frombytes(data[8 + size:])
+        if sys.byteorder != "little":
+            weights.byteswap()
+        return cls(header["labels"], header["bias"], header["features"], weights, header["exceptions"],
+                   header["ngram_size"], header["exclusive"])
+
+    # ---------- Scoring ----------
+
+    def tokenize(self, text: str) -> List[str]:
+        tokens: List[str] = []
+        spaces = 0
+        for chunk in text.split(" "):
+            if not chunk:
+                spaces += 1  # like spaCy, extra spaces make a whitespace token
+                continue
+            if spaces:
+                tokens.append(" " * spaces)
+                spaces = 0
+            tokens.extend(self.exceptions.get(chunk) or _split_chunk(chunk))
+        return tokens
+
+    def ngrams(self, tokens: List[str]) -> List[str]:
+        grams = list(tokens)
+        for n in range(2, self.ngram_size + 1):
+            grams += [NGRAM_SEP.join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+        return grams
+
+    def scores(self, text: str) -> Dict[str, float]:
+        """Same as the textcat's doc.cats for this text: {label: probability}."""
+        tokens = self.tokenize(text)
+        if not tokens:
+            return {label: 0.0 for label in self.labels}  # spaCy scores an empty Doc 0 everywhere
+        scores = self.bias
+        rows = self._rows
+        for gram in self.ngrams(tokens):
+            row = rows.get(gram)
+            if row is not None:
+                scores = [s + w for s, w in zip(scores, row)]
+        if self.exclusive:
+            top = max(scores)
+            exps = [math.exp(s - top) for s in scores]
+            total = sum(exps)
+            probs = [e / total for e in exps]
+        else:
+            probs = [1.0 / (1.0 + math.exp(-s)) for s in scores]
+        return dict(zip(self.labels, probs))
+
+    def __len__(self) -> int:
+        return len(self.features)
@@ -1,20 +1,33 @@
 # -*- coding: utf-8 -*-
-import requests
 import time
 import json
 import sys
 
+if sys.version_info[0] >= 3:
+    try:
+        from app.http_transport import get_transport
+    except ImportError:  # lancé directement : python app/llama_local_llm.py
+        from http_transport import get_transport
+else:  # Python 2.7 : http_transport est en Python 3, simple session keep-alive
+    import requests
+
+    def get_transport(**kwargs):
+        return requests.Session()
+
 class LLMManager:
     def __init__(self, model_name="phi3.5:latest"):
         self.base_url = "http://localhost:11434"
         self.model_name = model_name
+        # Connexions keep-alive : mêmes réglages que LLMClient par défaut (timeout 30 s),
+        # donc le même pool quand les deux tournent dans le même processus
+        self.transport = get_transport(read_timeout=30)
 
     def is_ready(self):
         """ Vérifie si Ollama tourne et charge le modèle """
         try:
-            requests.get(self.base_url, timeout=2)
+            self.transport.get(self.base_url, timeout=2)
             print(u"[LLM] Chargement de {0}...".format(self.model_name))
-            r = requests.post(
+            r = self.transport.post(
                 "{0}/api/generate".format(self.base_url),
                 json={"model": self.model_name, "prompt": "", "keep_alive": "1h"},
                 timeout=5
@@ -27,7 +40,7 @@ class LLMManager:
     def check_gpu_usage(self):
         """ Vérifie si le modèle utilise le GPU (VRAM) """
         try:
-            r = requests.get("{0}/api/ps".format(self.base_url))
+            r = self.transport.get("{0}/api/ps".format(self.base_url))
             if r.status_code == 200:
                 data = r.json()
                 for model in data.get("models", []):
@@ -53,7 +66,7 @@ class LLMManager:
         }
         
         try:
-            r = requests.post(url, json=payload, timeout=30)
+            r = self.transport.post(url, json=payload, timeout=30)
             if r.status_code == 200:
                 content = r.json()["choices"][0]["message"]["content"]
                 if not content or content.strip() == "":
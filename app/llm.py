@@ -5,25 +5,72 @@ LLM client wrapper with support for:
  - OpenAI officiel (https://api.openai.com/v1/chat/completions)
  - HuggingFace Text-Generation-Inference (TGI) /generate endpoint
  - Google Gemini REST API (v1beta/models/*:generateContent)
+ - Ollama native API (/api/chat), with "keep_alive" so the model and its KV cache stay loaded
+ - llama.cpp server (llama-server, OpenAI-compatible route) with "cache_prompt" and one
+   slot pinned per session, so each turn only evaluates the tokens after the cached prefix
+
+Every backend can also stream: generate_chat_stream() yields text deltas as they
+arrive (OpenAI-style SSE, TGI /generate_stream, Gemini streamGenerateContent,
+Ollama NDJSON).
+
+Identical concurrent calls (same fully built request) share one upstream
+generation: see app/single_flight.py ("single_flight": false to disable).
+
+Prompts are built deterministically from (system prompt, history): the same
+history always gives byte-identical requests, which is what the prefix caches of
+Ollama and llama.cpp need to skip re-evaluating the system prompt and old turns.
 
 Configure which backend to use in configs/llm_config.json.
 """
 
-import requests
-from typing import List, Dict, Any
+from collections import OrderedDict
+from typing import List, Dict, Any, AsyncIterator, Iterator, Optional
+import hashlib
 import json
 import os
+import threading
 from dotenv import load_dotenv
 
+from app.http_transport import TransportError, get_async_transport, get_transport
+from app.single_flight import AsyncSingleFlight, SingleFlight
+
 load_dotenv()
-llm_openai = "llm_openai_config.json"
-DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", llm_openai)
+# Ollama's native API, same server as llm_openai_config.json: the prompt prefix stays cached between turns
+llm_ollama = "llm_ollama_config.json"
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", llm_ollama)
 
 
 class LLMError(Exception):
     pass
 
 
+class SlotPinner:
+    """Sticky session -> llama.cpp slot assignment; the least recently used session loses its slot."""
+
+    def __init__(self, slots: int):
+        self.slots = slots
+        self._sessions = OrderedDict()  # session_id -> slot
+        self._lock = threading.Lock()
+
+    def slot(self, session_id: Optional[str]) -> int:
+        """Slot id for this session, -1 (any idle slot) without a session."""
+        if session_id is None or self.slots < 1:
+            return -1
+        with self._lock:
+            slot = self._sessions.get(session_id)
+            if slot is None:
+                if len(self._sessions) >= self.slots:
+                    _, slot = self._sessions.popitem(last=False)
+                else:
+                    slot = min(set(range(self.slots)) - set(self._sessions.values()))
+                self._sessions[session_id] = slot
+            self._sessions.move_to_end(session_id)
+            return slot
+
+
+_SSE_DONE = object()  # "data: [DONE]" marker of OpenAI-style streams
+
+
 class LLMClient:
     def __init__(self, config_path: str = DEFAULT_CONFIG_PATH):
         with open(config_path, "r", encoding="utf-8") as f:
@@ -33,6 +80,23 @@ class LLMClient:
         self.endpoint = cfg.get("endpoint", "http://localhost:8000")
         self.model = cfg.get("model", "")
         self.timeout = cfg.get("timeout", 30)
+        # Shared keep-alive connection pool: "timeout" is the read timeout, the TCP connect fails fast.
+        # "http2" only applies to https:// endpoints (OpenAI, Gemini) and needs httpx[http2].
+        self._transport_settings = dict(
+            pool_size=cfg.get("pool_size", 10),
+            connect_timeout=cfg.get("connect_timeout", 3.05),
+            read_timeout=self.timeout,
+            http2=cfg.get("http2", False),
+        )
+        self.transport = get_transport(**self._transport_settings)
+        # Prefix caching of local servers: how long Ollama keeps the model (and its KV cache) loaded,
+        # its context size, and the number of llama-server slots (--parallel) pinned to sessions
+        self.keep_alive = cfg.get("keep_alive", "30m")
+        self.num_ctx = cfg.get("num_ctx")
+        self.slots = SlotPinner(cfg.get("slots", 1))
+        # Concurrent duplicates (lobby bursts, client retries) wait for the call already in flight
+        self.single_flight = SingleFlight() if cfg.get("single_flight", True) else None
+        self.async_single_flight = AsyncSingleFlight() if cfg.get("single_flight", True) else None
         # optional headers (api keys, etc.). For Gemini, we pass the key in query param, but headers can still be used.
         self.headers = cfg.get("headers", {})
         
@@ -45,31 +109,194 @@ class LLMClient:
             self.headers["x-goog-api-key"] = env_key
         else:
             self.api_key = cfg.get("api_key")
-    # ---------- Backends type chat-completions (OpenAI-like) ----------
+    # ---------- Request builders (shared by blocking and streaming calls) ----------
 
-    def _DEBUG_call_chat_completions(self, messages):
-        import time
-        import requests
-        
+    @staticmethod
+    def _chat_messages(system_prompt: str, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        for msg in history:
+            messages.append({"role": msg["role"], "content": msg["content"]})
+        return messages
+
+    def _chat_completions_request(self, messages: List[Dict[str, str]], stream: bool = False):
+        # Si ton endpoint est déjà http://localhost:11434/v1, vérifie la concaténation
+        url = "{0}/chat/completions".format(self.endpoint.rstrip('/'))
         payload = {
             "model": self.model,
             "messages": messages,
-            "stream": False,
+            "stream": stream,
             "options": {
                 "temperature": 0.3
             }
         }
+        return url, payload
+
+    def _ollama_request(self, messages: List[Dict[str, str]], stream: bool = False):
+        url = self.endpoint.rstrip("/") + "/api/chat"
+        options = {"temperature": 0.3}
+        if self.num_ctx:
+            options["num_ctx"] = self.num_ctx
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": options,
+        }
+        return url, payload
+
+    def _llamacpp_request(self, messages: List[Dict[str, str]], stream: bool = False,
+                          session_id: Optional[str] = None):
+        url = self.endpoint.rstrip("/") + "/chat/completions"
+        payload = {
+            "model": self.model,
+            "messages": messages,
+            "stream": stream,
+            "temperature": 0.3,
+            # reuse the KV cache of the slot for the common prefix (previous turns of this session)
+            "cache_prompt": True,
+            "id_slot": self.slots.slot(session_id),
+        }
+        return url, payload
+
+    @staticmethod
+    def _tgi_prompt(system_prompt: str, history: List[Dict[str, str]]) -> str:
+        parts = []
+        if system_prompt:
+            parts.append("System: " + system_prompt.strip())
+        for msg in history:
+            role = msg["role"].capitalize()
+            parts.append(f"{role}: {msg['content'].strip()}")
+        parts.append("Assistant:")
+        return "\n".join(parts)
+
+    def _tgi_request(self, prompt: str, stream: bool = False):
+        url = self.endpoint.rstrip("/") + ("/generate_stream" if stream else "/generate")
+        payload = {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": 512,
+                "temperature": 0.2,
+            },
+        }
+        return url, payload
+
+    def _gemini_request(self, system_prompt: str, history: List[Dict[str, str]], stream: bool = False):
+        base_url = self.endpoint.rstrip("/")
+        model_name = self.model  # e.g., "gemini-1.5-flash"
+        method = "streamGenerateContent" if stream else "generateContent"
+        url = f"{base_url}/v1beta/models/{model_name}:{method}"
+
+        # Determine API key location
+        api_key = self.api_key or self.headers.get("x-goog-api-key")
+        if not api_key:
+            raise LLMError("Gemini API key not provided. Set 'api_key' or 'headers.x-goog-api-key' in llm_config.json.")
+
+        params = {"key": api_key}
+        if stream:
+            params["alt"] = "sse"
+
+        # Build contents:
+        # We create one content with multiple parts for system + messages
+        parts = []
+        if system_prompt:
+            parts.append({"text": f"SYSTEM: {system_prompt.strip()}"})
+        for msg in history:
+            role = msg.get("role", "user")
+            content_text = msg.get("content", "").strip()
+            parts.append({"text": f"{role.upper()}: {content_text}"})
+
+        body = {
+            "contents": [
+                {
+                    "parts": parts
+                }
+            ],
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": 2048
+            }
+        }
+        return url, params, body
+
+    def _request(self, system_prompt: str, history: List[Dict[str, str]], stream: bool = False,
+                 session_id: Optional[str] = None):
+        """(url, params, payload) of the configured backend."""
+        if self.backend in ("fastchat", "openai"):
+            url, payload = self._chat_completions_request(self._chat_messages(system_prompt, history), stream)
+            return url, None, payload
+        if self.backend == "ollama":
+            url, payload = self._ollama_request(self._chat_messages(system_prompt, history), stream)
+            return url, None, payload
+        if self.backend == "llamacpp":
+            url, payload = self._llamacpp_request(self._chat_messages(system_prompt, history), stream, session_id)
+            return url, None, payload
+        if self.backend == "hf_tgi":
+            url, payload = self._tgi_request(self._tgi_prompt(system_prompt, history), stream)
+            return url, None, payload
+        if self.backend == "gemini":
+            return self._gemini_request(system_prompt, history, stream)
+        raise LLMError(f"Unsupported backend: {self.backend}")
+
+    # ---------- Response parsers (shared by sync and async calls) ----------
+
+    @staticmethod
+    def _chat_completions_content(data: Dict[str, Any]) -> str:
+        # On essaie d'extraire le contenu selon le format standard OpenAI/Ollama
+        choices = data.get("choices", [])
+        if choices:
+            return choices[0].get("message", {}).get("content", "")
+        # Fallback si Ollama répond au format direct /api/chat au lieu de /v1
+        return data.get("message", {}).get("content", "")
+
+    @staticmethod
+    def _tgi_content(data: Any) -> str:
+        try:
+            if isinstance(data, list):
+                return data[0].get("generated_text", "")
+            return data.get("generated_text", "")
+        except Exception as e:
+            raise LLMError(f"Unexpected HF-TGI response format: {e} - {data}")
+
+    @staticmethod
+    def _gemini_content(data: Dict[str, Any]) -> str:
+        try:
+            # Typical Gemini response: candidates[0].content.parts[0].text
+            candidates = data.get("candidates", [])
+            if not candidates:
+                raise LLMError(f"No candidates in Gemini response: {data}")
+            content = candidates[0].get("content", {})
+            parts_out = content.get("parts", [])
+            if not parts_out:
+                raise LLMError(f"No parts in Gemini candidate: {data}")
+            text = parts_out[0].get("text", "")
+            return text
+        except Exception as e:
+            raise LLMError(f"Unexpected Gemini response format: {e} - {data}")
+
+    def _content(self, data: Any) -> str:
+        if self.backend in ("fastchat", "openai", "ollama", "llamacpp"):
+            return self._chat_completions_content(data)
+        if self.backend == "hf_tgi":
+            return self._tgi_content(data)
+        return self._gemini_content(data)
+
+    # ---------- Backends type chat-completions (OpenAI-like) ----------
+
+    def _DEBUG_call_chat_completions(self, messages):
+        import time
         
         # Correction : on utilise self.endpoint et on s'assure du chemin complet
-        # Si ton endpoint est déjà http://localhost:11434/v1, vérifie la concaténation
-        url = "{0}/chat/completions".format(self.endpoint.rstrip('/'))
+        url, payload = self._chat_completions_request(messages)
         
         print("\n--- [DEBUG OLLAMA START] ---")
         print("URL cible: {0}".format(url))
         
         start_time = time.time()
         try:
-            r = requests.post(url, json=payload, headers=self.headers, timeout=self.timeout)
+            r = self.transport.post(url, json=payload, headers=self.headers)
             duration = time.time() - start_time
             
             print("Status Code: {0} | Time: {1:.2f}s".format(r.status_code, duration))
@@ -79,13 +306,7 @@ class LLMClient:
                 return ""
 
             data = r.json()
-            # On essaie d'extraire le contenu selon le format standard OpenAI/Ollama
-            choices = data.get("choices", [])
-            if choices:
-                content = choices[0].get("message", {}).get("content", "")
-            else:
-                # Fallback si Ollama répond au format direct /api/chat au lieu de /v1
-                content = data.get("message", {}).get("content", "")
+            content = self._chat_completions_content(data)
                 
             print("Done Reason: {0}".format(data.get("choices", [{}])[0].get("finish_reason", "unknown")))
             print("Content: '{0}'".format(content))
@@ -112,7 +333,10 @@ class LLMClient:
             "temperature": 0.2,
             "max_tokens": 150
         }
-        r = requests.post(url, json=payload, headers=self.headers, timeout=self.timeout)
+        try:
+            r = self.transport.post(url, json=payload, headers=self.headers)
+        except TransportError as e:
+            raise LLMError(f"Chat-completions call failed: {e}")
         if r.status_code != 200:
             raise LLMError(f"Chat-completions call failed: {r.status_code} {r.text}")
         data = r.json()
@@ -129,24 +353,14 @@ class LLMClient:
         Endpoint example: http://localhost:8080
         Payload example: {"inputs": prompt, "parameters": {"max_new_tokens": 512}}
         """
-        url = self.endpoint.rstrip("/") + "/generate"
-        payload = {
-            "inputs": prompt,
-            "parameters": {
-                "max_new_tokens": 512,
-                "temperature": 0.2,
-            },
-        }
-        r = requests.post(url, json=payload, headers=self.headers, timeout=self.timeout)
+        url, payload = self._tgi_request(prompt)
+        try:
+            r = self.transport.post(url, json=payload, headers=self.headers)
+        except TransportError as e:
+            raise LLMError(f"HuggingFace TGI call failed: {e}")
         if r.status_code != 200:
             raise LLMError(f"HuggingFace TGI call failed: {r.status_code} {r.text}")
-        data = r.json()
-        try:
-            if isinstance(data, list):
-                return data[0].get("generated_text", "")
-            return data.get("generated_text", "")
-        except Exception as e:
-            raise LLMError(f"Unexpected HF-TGI response format: {e} - {data}")
+        return self._tgi_content(r.json())
 
     # ---------- Gemini REST API ----------
 
@@ -162,72 +376,65 @@ class LLMClient:
 
         We convert (system + history) into 'contents' as required by Gemini.
         """
+        url, params, body = self._gemini_request(system_prompt, history)
+        try:
+            r = self.transport.post(url, params=params, json=body, headers=self.headers)
+        except TransportError as e:
+            raise LLMError(f"Gemini call failed: {e}")
+        if r.status_code != 200:
+            raise LLMError(f"Gemini call failed: {r.status_code} {r.text}")
+        return self._gemini_content(r.json())
 
-        base_url = self.endpoint.rstrip("/")
-        model_name = self.model  # e.g., "gemini-1.5-flash"
-        url = f"{base_url}/v1beta/models/{model_name}:generateContent"
-
-        # Determine API key location
-        api_key = self.api_key or self.headers.get("x-goog-api-key")
-        if not api_key:
-            raise LLMError("Gemini API key not provided. Set 'api_key' or 'headers.x-goog-api-key' in llm_config.json.")
-
-        params = {"key": api_key}
+    # ---------- Local servers with prefix caching (Ollama native, llama.cpp) ----------
 
-        # Build contents:
-        # We create one content with multiple parts for system + messages
-        parts = []
-        if system_prompt:
-            parts.append({"text": f"SYSTEM: {system_prompt.strip()}"})
-        for msg in history:
-            role = msg.get("role", "user")
-            content_text = msg.get("content", "").strip()
-            parts.append({"text": f"{role.upper()}: {content_text}"})
+    def _call_local(self, system_prompt: str, history: List[Dict[str, str]], session_id: Optional[str]) -> str:
+        url, params, payload = self._request(system_prompt, history, session_id=session_id)
+        try:
+            r = self.transport.post(url, params=params, json=payload, headers=self.headers)
+        except TransportError as e:
+            raise LLMError(f"{self.backend} call failed: {e}")
+        if r.status_code != 200:
+            raise LLMError(f"{self.backend} call failed: {r.status_code} {r.text}")
+        try:
+            return self._content(r.json())
+        except ValueError as e:
+            raise LLMError(f"{self.backend} returned invalid JSON: {e}")
 
-        body = {
-            "contents": [
-                {
-                    "parts": parts
-                }
-            ],
-            "generationConfig": {
-                "temperature": 0.2,
-                "maxOutputTokens": 2048
-            }
-        }
+    # ---------- Single flight ----------
 
-        r = requests.post(url, params=params, json=body, headers=self.headers, timeout=self.timeout)
-        if r.status_code != 200:
-            raise LLMError(f"Gemini call failed: {r.status_code} {r.text}")
+    @staticmethod
+    def _flight_key(url: str, params: Optional[Dict[str, Any]], payload: Dict[str, Any]) -> str:
+        """
+        Hash of the fully built request. The llama.cpp slot is part of it: callers pinned to
+        different slots each need their own call, or the other slot would miss the turn in its cache.
+        """
+        raw = json.dumps([url, params, payload], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
-        data = r.json()
-        try:
-            # Typical Gemini response: candidates[0].content.parts[0].text
-            candidates = data.get("candidates", [])
-            if not candidates:
-                raise LLMError(f"No candidates in Gemini response: {data}")
-            content = candidates[0].get("content", {})
-            parts_out = content.get("parts", [])
-            if not parts_out:
-                raise LLMError(f"No parts in Gemini candidate: {data}")
-            text = parts_out[0].get("text", "")
-            return text
-        except Exception as e:
-            raise LLMError(f"Unexpected Gemini response format: {e} - {data}")
+    def flight_stats(self) -> Dict[str, Any]:
+        if self.single_flight is None:
+            return {"enabled": False}
+        return {"enabled": True, "sync": self.single_flight.stats(), "async": self.async_single_flight.stats()}
 
     # ---------- Public API ----------
 
-    def generate_chat(self, system_prompt: str, history: List[Dict[str, str]]) -> str:
+    def generate_chat(self, system_prompt: str, history: List[Dict[str, str]],
+                      session_id: Optional[str] = None) -> str:
         """
         Build an LLM request from system prompt and history and return assistant text.
+        `session_id` pins the conversation to a llama.cpp slot (ignored by the other backends).
+        Identical requests already in flight are not sent again: their answer is shared.
         """
+        if self.single_flight is None:
+            return self._generate_chat(system_prompt, history, session_id)
+        key = self._flight_key(*self._request(system_prompt, history, session_id=session_id))
+        return self.single_flight.do(key, self._generate_chat, system_prompt, history, session_id)
+
+    def _generate_chat(self, system_prompt: str, history: List[Dict[str, str]],
+                       session_id: Optional[str] = None) -> str:
         # Backends type chat completions (messages[])
         if self.backend in ("fastchat", "openai"):
-            messages = []
-            if system_prompt:
-                messages.append({"role": "system", "content": system_prompt})
-            for msg in history:
-                messages.append({"role": msg["role"], "content": msg["content"]})
+            messages = self._chat_messages(system_prompt, history)
             
             # --- DEBUG 1: CE QUE NOUS ENVOYONS ---
             print(f"\n[LLM DEBUG] Prompt envoyé au backend {self.backend}:")
@@ -246,21 +453,178 @@ class LLMClient:
                 print(f"[LLM ERROR] Crash pendant l'appel LLM: {str(e)}")
                 raise
 
+        # Serveurs locaux avec cache de préfixe
+        elif self.backend in ("ollama", "llamacpp"):
+            return self._call_local(system_prompt, history, session_id)
+
         # Backend TGI (prompt concaténé)
         elif self.backend == "hf_tgi":
-            parts = []
-            if system_prompt:
-                parts.append("System: " + system_prompt.strip())
-            for msg in history:
-                role = msg["role"].capitalize()
-                parts.append(f"{role}: {msg['content'].strip()}")
-            parts.append("Assistant:")
-            prompt = "\n".join(parts)
-            return self._call_hf_tgi(prompt)
+            return self._call_hf_tgi(self._tgi_prompt(system_prompt, history))
 
         # Backend Gemini (REST)
         elif self.backend == "gemini":
             return self._call_gemini(system_prompt, history)
 
         else:
-            raise LLMError(f"Unsupported backend: {self.backend}")
\ No newline at end of file
+            raise LLMError(f"Unsupported backend: {self.backend}")
+
+    def generate_chat_stream(self, system_prompt: str, history: List[Dict[str, str]],
+                             session_id: Optional[str] = None) -> Iterator[str]:
+        """
+        Same request as generate_chat(), but streamed: yields text deltas as the backend produces them.
+        Raises LLMError if the call fails before or during the stream.
+        """
+        extract = self._stream_parser()
+        for event in self.stream_events(system_prompt, history, session_id=session_id):
+            delta = extract(event)
+            if delta:
+                yield delta
+
+    def stream_events(self, system_prompt: str, history: List[Dict[str, str]],
+                      session_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Raw JSON events of a streamed call, including the ones without text (Ollama's final
+        "done" event with its eval counters, llama.cpp "timings"); delta() extracts the text.
+        """
+        url, params, payload = self._request(system_prompt, history, stream=True, session_id=session_id)
+        try:
+            r = self.transport.post(url, params=params, json=payload, headers=self.headers, stream=True)
+        except TransportError as e:
+            raise LLMError(f"{self.backend} streaming call failed: {e}")
+
+        with r:
+            if r.status_code != 200:
+                raise LLMError(f"{self.backend} streaming call failed: {r.status_code} {r.text}")
+            try:
+                yield from self._iter_events(r)
+            except TransportError as e:
+                raise LLMError(f"{self.backend} stream interrupted: {e}")
+
+    def delta(self, event: Dict[str, Any]) -> str:
+        """Text carried by one stream event of this backend ("" for bookkeeping events)."""
+        return self._stream_parser()(event)
+
+    # ---------- Async API (server event loop) ----------
+
+    async def agenerate_chat(self, system_prompt: str, history: List[Dict[str, str]],
+                             session_id: Optional[str] = None) -> str:
+        """
+        Asyncio variant of generate_chat(): same request, but waiting on the LLM holds no thread.
+        Raises LLMError on transport errors, non-200 answers or unexpected payloads.
+        """
+        url, params, payload = self._request(system_prompt, history, session_id=session_id)
+        if self.async_single_flight is None:
+            return await self._agenerate_chat(url, params, payload)
+        return await self.async_single_flight.do(self._flight_key(url, params, payload),
+                                                 self._agenerate_chat, url, params, payload)
+
+    async def _agenerate_chat(self, url: str, params: Optional[Dict[str, Any]], payload: Dict[str, Any]) -> str:
+        transport = get_async_transport(**self._transport_settings)
+        try:
+            r = await transport.post(url, params=params, json=payload, headers=self.headers)
+            if r.status_code != 200:
+                raise LLMError(f"{self.backend} call failed: {r.status_code} {await r.text()}")
+            data = await r.json()
+        except TransportError as e:
+            raise LLMError(f"{self.backend} call failed: {e}")
+        except ValueError as e:
+            raise LLMError(f"{self.backend} returned invalid JSON: {e}")
+        return self._content(data)
+
+    async def agenerate_chat_stream(self, system_prompt: str, history: List[Dict[str, str]],
+                                    session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Asyncio variant of generate_chat_stream()."""
+        url, params, payload = self._request(system_prompt, history, stream=True, session_id=session_id)
+        extract = self._stream_parser()
+        transport = get_async_transport(**self._transport_settings)
+        try:
+            r = await transport.post(url, params=params, json=payload, headers=self.headers, stream=True)
+        except TransportError as e:
+            raise LLMError(f"{self.backend} streaming call failed: {e}")
+
+        async with r:
+            if r.status_code != 200:
+                raise LLMError(f"{self.backend} streaming call failed: {r.status_code} {await r.text()}")
+            try:
+                async for line in r.iter_lines():
+                    event = self._parse_stream_line(line)
+                    if event is _SSE_DONE:
+                        return
+                    if event is not None:
+                        delta = extract(event)
+                        if delta:
+                            yield delta
+            except TransportError as e:
+                raise LLMError(f"{self.backend} stream interrupted: {e}")
+
+    # ---------- Streaming helpers ----------
+
+    def _stream_parser(self):
+        if self.backend in ("fastchat", "openai", "llamacpp"):
+            return self._chat_completions_delta
+        if self.backend == "ollama":
+            return self._ollama_delta
+        if self.backend == "hf_tgi":
+            return self._tgi_delta
+        return self._gemini_delta
+
+    def _iter_events(self, response) -> Iterator[Dict[str, Any]]:
+        """Decode a streamed body (SSE, or NDJSON for Ollama) into the JSON payload of each event."""
+        for line in response.iter_lines():
+            event = self._parse_stream_line(line)
+            if event is _SSE_DONE:
+                return
+            if event is not None:
+                yield event
+
+    def _parse_stream_line(self, line: str):
+        if self.backend != "ollama":
+            return self._parse_sse_line(line)
+        # Ollama streams one JSON object per line, the last one with "done": true
+        if not line or not line.strip():
+            return None
+        try:
+            return json.loads(line)
+        except ValueError as e:
+            raise LLMError(f"Malformed stream event: {e} - {line}")
+
+    @staticmethod
+    def _parse_sse_line(line: str):
+        """JSON payload of a `data:` line, _SSE_DONE for the OpenAI terminator, None for anything else."""
+        if not line or not line.startswith("data:"):
+            return None
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return _SSE_DONE
+        try:
+            return json.loads(data)
+        except ValueError as e:
+            raise LLMError(f"Malformed stream event: {e} - {data}")
+
+    @staticmethod
+    def _chat_completions_delta(event: Dict[str, Any]) -> str:
+        if "error" in event:
+            raise LLMError(f"Chat-completions stream error: {event['error']}")
+        choices = event.get("choices") or [{}]
+        return (choices[0].get("delta") or {}).get("content") or ""
+
+    @staticmethod
+    def _ollama_delta(event: Dict[str, Any]) -> str:
+        if "error" in event:
+            raise LLMError(f"Ollama stream error: {event['error']}")
+        return (event.get("message") or {}).get("content") or ""
+
+    @staticmethod
+    def _tgi_delta(event: Dict[str, Any]) -> str:
+        if "error" in event:
+            raise LLMError(f"HuggingFace TGI stream error: {event['error']}")
+        token = event.get("token") or {}
+        return "" if token.get("special") else token.get("text", "")
+
+    @staticmethod
+    def _gemini_delta(event: Dict[str, Any]) -> str:
+        if "error" in event:
+            raise LLMError(f"Gemini stream error: {event['error']}")
+        candidates = event.get("candidates") or [{}]
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(p.get("text", "") for p in parts)
\ No newline at end of file
@@ -0,0 +1,365 @@
+"""
+app/llm_router.py
+Ordered list of LLM backends with health tracking, circuit breaker and hedged requests.
+
+LLMRouter has the same interface as LLMClient (generate_chat, generate_chat_stream
+and their async variants), so DialogManager uses it transparently when its LLM
+config lists "backends" (see configs/llm_router.json). For each turn:
+  - backends are tried in the configured order (e.g. local Ollama, then Gemini);
+    when all of them fail, LLMError reaches DialogManager, which answers from RULES;
+  - a backend that failed `failure_threshold` times in a row is skipped for
+    `cooldown` seconds (circuit open), then gets one trial request (half-open):
+    an outage costs a few timeouts, not one per turn;
+  - with "hedge": true, if the current backend has not answered after its own
+    p95 latency (x `hedge_factor`, bounded by `hedge_min_delay`), the next backend is
+    called in parallel and the first answer wins. Streams are not hedged: they fail
+    over to the next backend only until the first delta has been yielded.
+
+The hedge delay counts from the moment a request starts running, not from when it
+was queued on the router's executor. A losing async request is cancelled. A losing
+blocking request is cancelled if it has not started yet; one that already runs
+cannot be interrupted (requests has no cancellation): it completes in the
+background, holding an executor thread until it answers or hits its read timeout,
+and its result is still recorded in the backend's health.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
+
+from app.llm import LLMClient, LLMError
+
+DEFAULT_CONFIG = {
+    "failure_threshold": 3,
+    "cooldown": 30.0,
+    "hedge": True,
+    "hedge_percentile": 95,
+    "hedge_factor": 1.0,
+    "hedge_min_delay": 0.5,
+    "hedge_default_delay": 3.0,
+    "latency_window": 100,
+}
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class _CallStart:
+    """Set by a blocking call once an executor thread actually runs it."""
+
+    def __init__(self):
+        self.at = None
+        self._event = threading.Event()
+
+    def set(self) -> None:
+        self.at = time.monotonic()
+        self._event.set()
+
+    def wait(self) -> float:
+        self._event.wait()
+        return self.at
+
+
+class BackendHealth:
+    """Circuit breaker and latency window of one backend."""
+
+    def __init__(self, name: str, failure_threshold: int = 3, cooldown: float = 30.0, latency_window: int = 100):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.latencies = deque(maxlen=latency_window)
+        self._trial_started = None  # half-open trial in flight (monotonic start)
+        self._lock = threading.Lock()
+        self._counters = {"calls": 0, "errors": 0, "skipped": 0, "hedged": 0, "wins": 0}
+
+    def allow(self) -> bool:
+        """Whether a request may go to this backend now (takes the half-open trial slot if so)."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                now = time.monotonic()
+                # a trial abandoned without result (closed stream) is retried after another cooldown
+                if self._trial_started is None or now - self._trial_started >= self.cooldown:
+                    self._trial_started = now
+                    return True
+            self._counters["skipped"] += 1
+            return False
+
+    def success(self, latency: float) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            self.latencies.append(latency)
+            self.consecutive_failures = 0
+            self.state = CLOSED
+            self._trial_started = None
+
+    def failure(self) -> None:
+        with self._lock:
+            self._counters["calls"] += 1
+            self._counters["errors"] += 1
+            self.consecutive_failures += 1
+            self._trial_started = None
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"[LLMRouter] {self.name}: circuit opened after {self.consecutive_failures} failure(s)")
+                self.state = OPEN
+                self.opened_at = time.monotonic()
+
+    def count(self, counter: str) -> None:
+        with self._lock:
+            self._counters[counter] += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self.latencies)
+        if len(samples) < 10:  # not enough data for a meaningful tail
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(50), self.percentile(95)
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                **self._counters,
+                "p50_ms": None if p50 is None else round(p50 * 1000, 1),
+                "p95_ms": None if p95 is None else round(p95 * 1000, 1),
+            }
+
+
+class LLMRouter:
+    def __init__(self, clients: List[LLMClient], failure_threshold: int = 3, cooldown: float = 30.0,
+                 hedge: bool = True, hedge_percentile: float = 95, hedge_factor: float = 1.0,
+                 hedge_min_delay: float = 0.5, hedge_default_delay: float = 3.0, latency_window: int = 100):
+        if not clients:
+            raise ValueError("LLMRouter needs at least one backend")
+        self.clients = clients
+        self.health = [BackendHealth(f"{c.backend}/{c.model}", failure_threshold, cooldown, latency_window)
+                       for c in clients]
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_factor = hedge_factor
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_default_delay = hedge_default_delay
+        # LLMClient-like identity: budgets follow the primary backend, the cache namespace all of them
+        self.backend = clients[0].backend
+        self.model = "|".join(f"{c.backend}/{c.model}" for c in clients)
+        self._executor = ThreadPoolExecutor(max_workers=2 * len(clients), thread_name_prefix="llm-router")
+
+    @classmethod
+    def from_config(cls, config_path: str) -> "LLMRouter":
+        """"backends" lists LLMClient config files, relative to the router config's directory."""
+        with open(config_path, "r", encoding="utf-8") as f:
+            cfg = dict(DEFAULT_CONFIG, **json.load(f))
+        base_dir = os.path.dirname(os.path.abspath(config_path))
+        clients = [LLMClient(path if os.path.isabs(path) else os.path.join(base_dir, path))
+                   for path in cfg["backends"]]
+        return cls(clients, **{key: cfg[key] for key in DEFAULT_CONFIG})
+
+    def _available(self) -> Iterator[int]:
+        """Backends in order, skipping open circuits; checked lazily so unused backends keep their trial."""
+        return (i for i, health in enumerate(self.health) if health.allow())
+
+    def _hedge_delay(self, index: int) -> float:
+        p = self.health[index].percentile(self.hedge_percentile)
+        if p is None:
+            return self.hedge_default_delay
+        return max(self.hedge_min_delay, p * self.hedge_factor)
+
+    def _label(self, index: int) -> str:
+        return self.health[index].name
+
+    def _all_failed(self, errors: List[str]) -> LLMError:
+        return LLMError("All LLM backends failed or unavailable: " + ("; ".join(errors) or "circuits open"))
+
+    # ---------- Blocking API ----------
+
+    def _timed_call(self, index: int, system_prompt: str, history: List[Dict[str, str]],
+                    session_id: Optional[str], started: Optional[_CallStart] = None) -> str:
+        start = time.monotonic()
+        if started is not None:
+            started.set()
+        try:
+            text = self.clients[index].generate_chat(system_prompt, history, session_id=session_id)
+            if not text or not text.strip():
+                raise LLMError("empty response")
+        except Exception:
+            self.health[index].failure()
+            raise
+        self.health[index].success(time.monotonic() - start)
+        return text
+
+    def generate_chat(self, system_prompt: str, history: List[Dict[str, str]],
+                      session_id: Optional[str] = None) -> str:
+        """
+        First answer of the available backends, in order, hedged if the current one is slow.
+        Losing requests that have not started are cancelled; running ones finish in the background.
+        """
+        candidates = self._available()
+        pending, starts, errors = {}, {}, []
+
+        def launch(hedged: bool = False) -> bool:
+            index = next(candidates, None)
+            if index is None:
+                return False
+            if hedged:
+                self.health[index].count("hedged")
+            started = _CallStart()
+            future = self._executor.submit(self._timed_call, index, system_prompt, history, session_id, started)
+            pending[future], starts[future] = index, started
+            return True
+
+        can_hedge = launch() and self.hedge
+        try:
+            while pending:
+                timeout = None
+                if can_hedge and len(pending) == 1:
+                    future, index = next(iter(pending.items()))
+                    # time spent queued on the executor does not count towards the hedge delay
+                    elapsed = time.monotonic() - starts[future].wait()
+                    timeout = max(0.0, self._hedge_delay(index) - elapsed)
+                done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+                if not done:
+                    # too slow: the next backend races it (if there is none left, just keep waiting)
+                    can_hedge = launch(hedged=True)
+                    continue
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        text = future.result()
+                    except Exception as e:
+                        errors.append(f"{self._label(index)}: {e}")
+                        continue
+                    self.health[index].count("wins")
+                    return text
+                if not pending:
+                    launch()
+        finally:
+            for future in pending:
+                future.cancel()
+        raise self._all_failed(errors)
+
+    def generate_chat_stream(self, system_prompt: str, history: List[Dict[str, str]],
+                             session_id: Optional[str] = None) -> Iterator[str]:
+        errors = []
+        for index in self._available():
+            start, started = time.monotonic(), False
+            try:
+                for delta in self.clients[index].generate_chat_stream(system_prompt, history, session_id=session_id):
+                    started = True
+                    yield delta
+            except LLMError as e:
+                self.health[index].failure()
+                if started:
+                    raise
+                errors.append(f"{self._label(index)}: {e}")
+                continue
+            if started:
+                self.health[index].success(time.monotonic() - start)
+                self.health[index].count("wins")
+                return
+            self.health[index].failure()
+            errors.append(f"{self._label(index)}: empty stream")
+        raise self._all_failed(errors)
+
+    # ---------- Async API ----------
+
+    async def _atimed_call(self, index: int, system_prompt: str, history: List[Dict[str, str]],
+                           session_id: Optional[str]) -> str:
+        start = time.monotonic()
+        try:
+            text = await self.clients[index].agenerate_chat(system_prompt, history, session_id=session_id)
+            if not text or not text.strip():
+                raise LLMError("empty response")
+        except asyncio.CancelledError:
+            raise  # lost a hedge race: neither a success nor a failure
+        except Exception:
+            self.health[index].failure()
+            raise
+        self.health[index].success(time.monotonic() - start)
+        return text
+
+    async def agenerate_chat(self, system_prompt: str, history: List[Dict[str, str]],
+                             session_id: Optional[str] = None) -> str:
+        """Asyncio variant of generate_chat(); the losing request of a hedge is cancelled."""
+        candidates = self._available()
+        pending, errors = {}, []
+
+        def launch(hedged: bool = False) -> bool:
+            index = next(candidates, None)
+            if index is None:
+                return False
+            if hedged:
+                self.health[index].count("hedged")
+            task = asyncio.ensure_future(self._atimed_call(index, system_prompt, history, session_id))
+            pending[task] = index
+            return True
+
+        can_hedge = launch() and self.hedge
+        try:
+            while pending:
+                timeout = None
+                if can_hedge and len(pending) == 1:
+                    timeout = self._hedge_delay(next(iter(pending.values())))
+                done, _ = await asyncio.wait(list(pending), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    can_hedge = launch(hedged=True)
+                    continue
+                for task in done:
+                    index = pending.pop(task)
+                    try:
+                        text = task.result()
+                    except Exception as e:
+                        errors.append(f"{self._label(index)}: {e}")
+                        continue
+                    self.health[index].count("wins")
+                    return text
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+        raise self._all_failed(errors)
+
+    async def agenerate_chat_stream(self, system_prompt: str, history: List[Dict[str, str]],
+                                    session_id: Optional[str] = None) -> AsyncIterator[str]:
+        """Asyncio variant of generate_chat_stream()."""
+        errors = []
+        for index in self._available():
+            start, started = time.monotonic(), False
+            try:
+                async for delta in self.clients[index].agenerate_chat_stream(system_prompt, history,
+                                                                             session_id=session_id):
+                    started = True
+                    yield delta
+            except LLMError as e:
+                self.health[index].failure()
+                if started:
+                    raise
+                errors.append(f"{self._label(index)}: {e}")
+                continue
+            if started:
+                self.health[index].success(time.monotonic() - start)
+                self.health[index].count("wins")
+                return
+            self.health[index].failure()
+            errors.append(f"{self._label(index)}: empty stream")
+        raise self._all_failed(errors)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "hedge": self.hedge,
+            "backends": [{"backend": self._label(i), "hedge_delay_ms": round(self._hedge_delay(i) * 1000, 1),
+                          **health.stats(), "single_flight": self.clients[i].flight_stats()}
+                         for i, health in enumerate(self.health)],
+        }
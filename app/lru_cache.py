@@ -0,0 +1,85 @@
+"""
+app/lru_cache.py
+Cache LRU thread-safe en mémoire, avec expiration optionnelle (TTL) et compteurs.
+
+Utilisé pour les résultats de veille par chunk audio et l'état des flux de veille
+(app/rolling.py) et pour le cache de réponses du LLM (app/response_cache.py) ;
+`ttl=None` garde les entrées jusqu'à leur éviction.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data = OrderedDict()  # clé -> (valeur, date d'expiration ou None)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[1] is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                self._counters["expired"] += 1
+                entry = _MISSING
+            if entry is _MISSING:
+                self._counters["misses"] += 1
+                return default
+            self._data.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """ `ttl` remplace la durée de vie par défaut du cache pour cette entrée """
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def snapshot(self) -> List[Tuple[Hashable, Any, Optional[float]]]:
+        """ (clé, valeur, durée de vie restante en s ou None) des entrées valides, de la plus ancienne à la plus récente """
+        now = time.monotonic()
+        with self._lock:
+            return [(key, value, None if expires is None else expires - now)
+                    for key, (value, expires) in self._data.items() if expires is None or expires > now]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            return entry is not _MISSING and (entry[1] is None or entry[1] > time.monotonic())
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._data)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            "size": size,
+            "maxsize": self.maxsize,
+            **counters,
+            "hit_rate": round(counters["hits"] / lookups, 3) if lookups else 0.0,
+        }
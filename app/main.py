@@ -1,24 +1,181 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uvicorn
-import shutil
+import asyncio
+import io
+import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-from app.nlu import NLU
-from app.dialog_manager import DialogManager
 from app.sessions import SessionStore
-from app.speech import ASRModule
-
-from app.reservation import reserver_salle
+from app.asr_stream import StreamingTranscriber
+from app.audio_utils import SAMPLE_RATE, AudioDecodeError, is_wav, load_audio
+from app.asr_pool import ASRWorkerPool, ASRQueueFull, ASRPoolClosed
+from app.asr_batching import ASRBatcher
+from app.rolling import RollingTranscriber
+from app.startup import ComponentRegistry, ComponentNotReady
+from app.http_transport import close_async_transports
 
 
 app = FastAPI(title="Serveur de dialogue - Robot d'accueil")
 
-nlu = NLU()
 sessions = SessionStore()
-dialog = DialogManager(sessions)
-asr  = ASRModule(model_size="small")
+
+# Dimensionnement ASR : ASR_WORKERS décodages en parallèle, ASR_CPU_THREADS threads chacun
+ASR_WORKERS = int(os.getenv("ASR_WORKERS", "2"))
+ASR_CPU_THREADS = int(os.getenv("ASR_CPU_THREADS", str(max(1, (os.cpu_count() or 1) // ASR_WORKERS))))
+ASR_MAX_QUEUE = int(os.getenv("ASR_MAX_QUEUE", "8"))
+# Micro-batching : clips regroupés pendant ASR_BATCH_WINDOW_MS, ASR_BATCH_MAX par lot (1 = désactivé)
+ASR_BATCH_MAX = int(os.getenv("ASR_BATCH_MAX", "8"))
+ASR_BATCH_WINDOW_MS = float(os.getenv("ASR_BATCH_WINDOW_MS", "30"))
+# VAD avant Whisper : "energy" (défaut), "webrtc", "silero" ou "off"
+ASR_VAD = os.getenv("ASR_VAD", "energy")
+# Profil de décodage par défaut ("fast" ou "accurate") et confiance requise pour épingler la langue
+ASR_PROFILE = os.getenv("ASR_PROFILE", "accurate")
+ASR_LANGUAGE_LOCK_PROB = float(os.getenv("ASR_LANGUAGE_LOCK_PROB", "0.8"))
+# Veille : petit modèle dédié, greedy, sur WAKE_WORKERS threads séparés du pool de conversation
+WAKE_MODEL = os.getenv("WAKE_MODEL", "tiny")
+WAKE_WORDS = [w.strip() for w in os.getenv("WAKE_WORDS", "pepper,bonjour").split(",") if w.strip()]
+WAKE_WORKERS = int(os.getenv("WAKE_WORKERS", "1"))
+# NLU (spaCy, CPU) dans un pool dédié : /v1/respond reste asynchrone de bout en bout
+NLU_WORKERS = int(os.getenv("NLU_WORKERS", "2"))
+# Config LLM du dialogue (défaut : configs/llm_ollama_config.json) ; configs/llm_router.json pour enchaîner
+# plusieurs backends avec disjoncteur et requêtes doublées
+LLM_CONFIG = os.getenv("LLM_CONFIG")
+# Chargement des modèles : "background" (tous en parallèle au démarrage) ou "lazy" (à la première requête)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "background")
+
+
+# Les modules lourds (spaCy, faster-whisper, client LLM) ne sont importés que dans les fabriques :
+# le serveur répond dès l'import, /ready indique quand chaque composant est utilisable.
+def _load_nlu():
+    from app.nlu import NLU
+    return NLU()
+
+
+def _load_dialog():
+    from app.dialog_manager import DialogManager
+    return DialogManager(sessions, LLM_CONFIG)
+
+
+def _load_asr():
+    from app.speech import ASRModule
+    return ASRModule(model_size="small", num_workers=ASR_WORKERS, cpu_threads=ASR_CPU_THREADS, vad=ASR_VAD,
+                     default_profile=ASR_PROFILE)
+
+
+def _load_wake():
+    from app.wake import WakeWordDetector
+    return WakeWordDetector(wake_words=WAKE_WORDS, model_size=WAKE_MODEL, vad=ASR_VAD)
+
+
+components = ComponentRegistry(STARTUP_MODE)
+components.register("nlu", _load_nlu)
+components.register("dialog", _load_dialog)
+components.register("asr", _load_asr)
+components.register("wake", _load_wake)
+
+asr_pool = ASRWorkerPool(workers=ASR_WORKERS, max_queue=ASR_MAX_QUEUE)
+asr_batcher = ASRBatcher(asr_pool, max_batch=ASR_BATCH_MAX, window_ms=ASR_BATCH_WINDOW_MS) if ASR_BATCH_MAX > 1 else None
+wake_pool = ASRWorkerPool(workers=WAKE_WORKERS, max_queue=ASR_MAX_QUEUE, name="wake")
+wake_streams = RollingTranscriber()
+nlu_executor = ThreadPoolExecutor(max_workers=NLU_WORKERS, thread_name_prefix="nlu")
+
+
+@app.on_event("startup")
+def start_asr_pool():
+    components.start()
+    asr_pool.start()
+    wake_pool.start()
+    if asr_batcher:
+        asr_batcher.start()
+
+
+@app.on_event("shutdown")
+def stop_asr_pool():
+    if asr_batcher:
+        asr_batcher.stop()
+    asr_pool.stop()
+    wake_pool.stop()
+
+
+@app.on_event("shutdown")
+async def close_llm_connections():
+    await close_async_transports()
+    nlu_executor.shutdown(wait=False)
+    dialog = components.get_if_ready("dialog")
+    if dialog is not None:
+        dialog.cache.save()
+        dialog.context.close()
+
+
+async def _parse_text(nlu, text: str) -> Dict[str, Any]:
+    """ NLU hors de la boucle asyncio (spaCy est CPU) """
+    return await asyncio.get_running_loop().run_in_executor(nlu_executor, nlu.parse, text)
+
+
+async def _run_asr(asr, audio, sample_rate, profile=None, language=None):
+    """
+    WAV et PCM sont décodés ici (AudioDecodeError -> 422) puis passent par le micro-batching ;
+    les autres conteneurs sont décodés par faster-whisper
+    """
+    if not isinstance(audio, bytes):
+        return await asr_pool.run(asr.process_audio, audio, sample_rate=sample_rate,
+                                  profile=profile, language=language)
+    samples = load_audio(audio, sample_rate)
+    if asr_batcher is None:
+        return await asr_pool.run(asr.process_audio, samples, profile=profile, language=language)
+    return await asr_batcher.run(asr.process_batch, samples, profile=profile, language=language)
+
+
+def _asr_session_settings(asr, session_id: Optional[str], profile: Optional[str]):
+    """
+    Profil et langue de décodage d'une requête ASR. Un profil passé avec un session_id
+    est mémorisé pour les tours suivants ; la langue épinglée évite la détection.
+    """
+    if profile is not None:
+        try:
+            asr.decode_options(profile)
+        except ValueError as e:
+            raise HTTPException(status_code=422, detail=str(e))
+    if not session_id:
+        return profile, None
+
+    session = sessions.get(session_id)
+    if profile is not None and session.get("asr_profile") != profile:
+        session["asr_profile"] = profile
+        sessions.update(session_id, session)
+    return session.get("asr_profile"), session.get("asr_language")
+
+
+def _pin_session_language(session_id: Optional[str], pinned: Optional[str], result: Dict[str, Any]) -> None:
+    """ Fixe la langue de la session dès qu'une détection est fiable et suffisamment sûre """
+    if not session_id or pinned or not result.get("is_reliable"):
+        return
+    if result.get("language_probability", 0.0) >= ASR_LANGUAGE_LOCK_PROB:
+        session = sessions.get(session_id)
+        session["asr_language"] = result["language"]
+        sessions.update(session_id, session)
+        print(f"[ASR] Langue '{result['language']}' épinglée pour la session {session_id}")
+
+
+@app.exception_handler(ASRQueueFull)
+async def asr_queue_full_handler(request: Request, exc: ASRQueueFull):
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
+@app.exception_handler(ASRPoolClosed)
+async def asr_pool_closed_handler(request: Request, exc: ASRPoolClosed):
+    return JSONResponse(status_code=503, content={"detail": str(exc)})
+
+
+@app.exception_handler(ComponentNotReady)
+async def component_not_ready_handler(request: Request, exc: ComponentNotReady):
+    return JSONResponse(status_code=503, content={"detail": str(exc), "component": exc.name, "state": exc.state},
+                        headers={"Retry-After": "5"})
+
 class ParseRequest(BaseModel):
     text: str
     lang: Optional[str] = "fr"
@@ -29,10 +186,19 @@ class ParseResponse(BaseModel):
     confidence: float
     entities: Dict[str, Any]
 
+class ParseBatchRequest(BaseModel):
+    texts: List[str]
+    lang: Optional[str] = "fr"
+    # None : valeurs par défaut de la NLU (NLU_BATCH_SIZE, NLU_N_PROCESS)
+    batch_size: Optional[int] = None
+    n_process: Optional[int] = None
+
 class RespondRequest(BaseModel):
     text: str
     lang: Optional[str] = "fr"
     session_id: Optional[str] = None
+    # False : réponse toujours générée par le LLM (contexte personnel), jamais lue ni écrite dans le cache
+    cache: bool = True
 
 class RespondResponse(BaseModel):
     text: str
@@ -49,69 +215,284 @@ class ReservationRequest(BaseModel):
     salle: str
     creneau: Creneau
 
-@app.post("/v1/asr")
-async def transcribe_audio(file: UploadFile = File(...)):
-    """ Endpoint pour envoyer l'audio Pepper et renvoyer le texte transcrit """
-    temp_path = f"temp_{file.filename}"
-    print(f"\n[DEBUG] Requête ASR reçue. Fichier: {file.filename}")
+async def _read_audio(request: Request, sample_rate: int, label: str):
+    """
+    Lit l'audio d'une requête : upload multipart (champ `file`) ou corps
+    application/octet-stream en PCM int16 mono brut à `sample_rate` Hz. Tout reste en mémoire.
+    """
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=422, detail="Champ 'file' manquant")
+        print(f"\n[DEBUG] Requête {label} reçue. Fichier: {upload.filename}")
+        data = await upload.read()
+        # Un conteneur autre que WAV (mp3, ogg...) est décodé par faster-whisper depuis la mémoire
+        audio = data if is_wav(data) else io.BytesIO(data)
+    else:
+        print(f"\n[DEBUG] Requête {label} reçue. PCM brut ({content_type or 'sans type'}) à {sample_rate} Hz")
+        data = await request.body()
+        audio = data
 
-    try :
-        #1 Sauvegarde temporaire du flix audio reçu
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    print(f"[DEBUG] Audio reçu en mémoire | Taille: {len(data)} octets")
+    if len(data) < 100:
+        print("[WARNING] Fichier reçu extrêmement petit, risque de corruption.")
+    return audio
 
-        # Vérification de la taille après écriture
-        file_size = os.path.getsize(temp_path)
-        print(f"[DEBUG] Fichier sauvegardé: {temp_path} | Taille: {file_size} octets")
 
-        if file_size < 100:
-            print("[WARNING] Fichier reçu extrêmement petit, risque de corruption.")
+@app.post("/v1/asr")
+async def transcribe_audio(request: Request, sample_rate: int = SAMPLE_RATE,
+                           profile: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    Endpoint pour envoyer l'audio Pepper et renvoyer le texte transcrit.
+    Accepte un upload multipart (champ `file`) ou un corps application/octet-stream
+    en PCM int16 mono brut à `sample_rate` Hz. Tout est traité en mémoire.
+    `profile` ("fast" ou "accurate") choisit le décodage ; avec `session_id`, le profil
+    et la langue détectée sont mémorisés pour les tours suivants.
+    """
+    try :
+        asr = components.get("asr")
+        profile, language = _asr_session_settings(asr, session_id, profile)
+        audio = await _read_audio(request, sample_rate, "ASR")
 
-        #Transcription via Faster-Whisper (GPU)
-        result = asr.process_audio(temp_path)
+        #Transcription via Faster-Whisper, dans le pool (la boucle asyncio reste libre)
+        result = await _run_asr(asr, audio, sample_rate, profile=profile, language=language)
 
         if "error" in result:
             print(f"[ERROR] Erreur retournée par asr.process_audio: {result['error']}")
             raise HTTPException(status_code=500, detail=result["error"])
 
+        _pin_session_language(session_id, language, result)
         return result
 
+    except (HTTPException, ASRQueueFull, ASRPoolClosed, ComponentNotReady):
+        raise
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Audio invalide: {e}")
     except Exception as e:
         print(f"[CRITICAL] Crash serveur ASR: {str(e)}")
         import traceback
         traceback.print_exc() # Affiche la stacktrace complète dans le terminal
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+
+
+@app.post("/v1/wake")
+async def detect_wake_word(request: Request, sample_rate: int = SAMPLE_RATE,
+                           stream_id: Optional[str] = None, seq: Optional[int] = None):
+    """
+    Détection des mots de réveil pour la veille : mêmes entrées que /v1/asr,
+    renvoie {detected, score, keyword, text, language, processing_time}.
+    Tourne sur un modèle et un pool séparés pour ne pas concurrencer les conversations.
+    Avec `stream_id`, le client n'envoie que son dernier chunk : le serveur garde la
+    fenêtre glissante du flux et ne décode que le nouvel audio (`seq` : numéro du chunk).
+    """
+    try:
+        wake = components.get("wake")
+        audio = await _read_audio(request, sample_rate, "WAKE")
+        if stream_id:
+            return await wake_pool.run(wake_streams.feed, wake, stream_id, audio,
+                                       sample_rate=sample_rate, seq=seq)
+        return await wake_pool.run(wake.detect, audio, sample_rate=sample_rate)
+
+    except (HTTPException, ASRQueueFull, ASRPoolClosed, ComponentNotReady):
+        raise
+    except AudioDecodeError as e:
+        raise HTTPException(status_code=422, detail=f"Audio invalide: {e}")
+    except Exception as e:
+        print(f"[CRITICAL] Crash détection de réveil: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _is_end_event(text: str) -> bool:
+    """ Fin de flux : "end" ou {"event": "end"} """
+    if text.strip().lower() == "end":
+        return True
+    try:
+        payload = json.loads(text)
+    except ValueError:
+        return False
+    return isinstance(payload, dict) and payload.get("event") == "end"
+
+
+@app.websocket("/v1/asr/stream")
+async def transcribe_stream(websocket: WebSocket):
+    """
+    Transcription en continu : le client envoie des trames binaires PCM 16 kHz mono int16
+    au fil de la capture, puis "end". Le serveur renvoie des messages {"type": "partial"}
+    pendant l'écoute et un dernier {"type": "final", ...} au format de /v1/asr.
+    Paramètre optionnel ?session_id= pour réutiliser la langue épinglée de la session.
+    """
+    await websocket.accept()
+    try:
+        asr = components.get("asr")
+    except ComponentNotReady as e:
+        await websocket.send_json({"type": "error", "detail": str(e)})
+        await websocket.close(code=1013)
+        return
+    session_id = websocket.query_params.get("session_id")
+    _, language = _asr_session_settings(asr, session_id, None)
+    stream = StreamingTranscriber(asr, language=language)
+    print("[DEBUG] Flux ASR ouvert")
+
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                print("[DEBUG] Flux ASR fermé par le client")
+                return
+
+            if message.get("bytes") is not None:
+                if stream.feed(message["bytes"]):
+                    try:
+                        await websocket.send_json(await asr_pool.run(stream.partial))
+                    except ASRQueueFull:
+                        # Serveur chargé : on saute ce partiel, l'audio reste dans la fenêtre
+                        pass
+            elif message.get("text") is not None and _is_end_event(message["text"]):
+                try:
+                    result = await asr_pool.run(stream.final)
+                    _pin_session_language(session_id, language, result)
+                    await websocket.send_json(result)
+                except (ASRQueueFull, ASRPoolClosed) as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    await websocket.close(code=1013)
+                    return
+                await websocket.close()
+                return
+
+    except WebSocketDisconnect:
+        print("[DEBUG] Flux ASR interrompu")
+    except Exception as e:
+        print(f"[CRITICAL] Crash flux ASR: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        await websocket.close(code=1011)
+
+
+@app.get("/v1/asr/stats")
+def asr_stats():
+    """ Profondeur de file, workers occupés et temps d'attente/exécution (ms) du pool ASR """
+    stats = asr_pool.stats()
+    if asr_batcher:
+        stats["batching"] = asr_batcher.stats()
+    stats["wake"] = wake_pool.stats()
+    stats["wake"]["streams"] = wake_streams.stats()
+    return stats
+
+
+@app.get("/health")
+def health():
+    """ Liveness : le processus répond, même si les modèles sont encore en chargement """
+    return {"status": "ok"}
+
+
+@app.get("/ready")
+def ready():
+    """ Readiness : état de chaque composant ; 503 tant qu'un composant n'est pas prêt """
+    readiness = components.readiness()
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
 
 
 @app.post("/v1/parse", response_model=ParseResponse)
 def parse(req: ParseRequest):
+    nlu = components.get("nlu")
     # result = nlu.parse(req.text, req.lang)
     result = nlu.parse(req.text)
     return ParseResponse(intent=result["intent"], confidence=result["confidence"], entities=result["entities"])
+
+@app.post("/v1/parse_batch")
+def parse_batch(req: ParseBatchRequest):
+    """ Étiquetage en lot (nlp.pipe) : mêmes résultats que /v1/parse, dans l'ordre des textes """
+    nlu = components.get("nlu")
+    if (req.batch_size is not None and req.batch_size < 1) or (req.n_process is not None and req.n_process < 1):
+        raise HTTPException(status_code=422, detail="batch_size et n_process doivent être >= 1")
+    results = nlu.parse_batch(req.texts, batch_size=req.batch_size, n_process=req.n_process)
+    return {"results": results}
+
+@app.get("/v1/parse/cache/stats")
+def parse_cache_stats():
+    """ Résultats NLU mémorisés par texte normalisé : taille, hits/misses, taux de succès """
+    return components.get("nlu").cache_stats()
+
+@app.post("/v1/nlu/reload")
+def reload_nlu():
+    """ Recharge les modèles NLU depuis le disque (après réentraînement) ; vide le cache des résultats """
+    nlu = components.get("nlu")
+    nlu.reload()
+    return {"reloaded": True, "unified": nlu.unified, **nlu.cache_stats()}
+
 @app.post("/v1/parse_all_inents", response_model=Dict[str, Any])
 def parse_all_intents(req: ParseRequest):
+    nlu = components.get("nlu")
     result = nlu.parse_intents_confidences(req.text)
     return result
 
 @app.post("/v1/respond", response_model=RespondResponse)
-def respond(req: RespondRequest):
+async def respond(req: RespondRequest):
+    # Asynchrone : pendant l'attente du LLM, la requête n'occupe aucun thread du serveur
+    nlu = components.get("nlu")
+    dialog = components.get("dialog")
     # ensure session
     print(f"[DEBUG] Session ID recue du client: {req.session_id}")
     session_id = req.session_id or sessions.create_session()
     print(f"[DEBUG] Session ID utilisee: {session_id}")
     # parse_result = nlu.parse(req.text, req.lang)
-    parse_result = nlu.parse(req.text)
+    parse_result = await _parse_text(nlu, req.text)
     
     try:
-        response_text, actions = dialog.handle(session_id, parse_result)
+        response_text, actions = await dialog.ahandle(session_id, parse_result, use_cache=req.cache)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     return RespondResponse(text=response_text, actions=actions, session_id=session_id)
 
+@app.post("/v1/respond/stream")
+async def respond_stream(req: RespondRequest):
+    """
+    Comme /v1/respond, mais la réponse arrive phrase par phrase (NDJSON, une ligne JSON par événement) :
+    {"type": "sentence", "text", "index"} dès qu'une phrase est complète, puis
+    {"type": "end", "text", "actions", "session_id"} avec la réponse entière, enregistrée dans l'historique.
+    """
+    nlu = components.get("nlu")
+    dialog = components.get("dialog")
+    session_id = req.session_id or sessions.create_session()
+    parse_result = await _parse_text(nlu, req.text)
+
+    async def events():
+        try:
+            async for event in dialog.ahandle_stream(session_id, parse_result, use_cache=req.cache):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            print(f"[CRITICAL] Crash flux dialogue: {str(e)}")
+            yield json.dumps({"type": "error", "detail": str(e), "session_id": session_id}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/v1/respond/fast_path/stats")
+def fast_path_stats():
+    """ Réponses servies sans LLM (par intention) et tours renvoyés au LLM, par motif """
+    return components.get("dialog").fast_path.stats()
+
+@app.get("/v1/respond/llm/stats")
+def llm_stats():
+    """ État des backends LLM (circuit, latences p50/p95, requêtes doublées) quand LLM_CONFIG est un routeur """
+    llm = components.get("dialog").llm
+    if not hasattr(llm, "stats"):
+        return {"router": False, "backend": llm.backend, "model": llm.model, "single_flight": llm.flight_stats()}
+    return {"router": True, **llm.stats()}
+
+@app.get("/v1/respond/context/stats")
+def context_stats():
+    """ Budget de tokens du prompt, résumés d'historique effectués et tours tronqués """
+    return components.get("dialog").context.stats()
+
+@app.get("/v1/respond/cache/stats")
+def response_cache_stats():
+    """ Taille, hits/misses, évictions et expirations du cache de réponses du LLM """
+    return components.get("dialog").cache.stats()
+
 @app.get("/v1/session/{session_id}/reset")
 def reset_session(session_id: str):
     ok = sessions.reset(session_id)
@@ -121,6 +502,8 @@ def reset_session(session_id: str):
 
 @app.post("/v1/reserver_salle")
 def reserver_salle_endpoint(req: ReservationRequest):
+    # pymongo n'est importé qu'à la première réservation
+    from app.reservation import reserver_salle
     try:
         reservation_id = reserver_salle(req.model_dump())
         return {"status": "success", "reservation_id": str(reservation_id)}
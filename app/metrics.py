@@ -0,0 +1,32 @@
+"""
+app/metrics.py
+Petits outils statistiques partagés (percentiles de latence, résumés).
+"""
+from typing import Dict, Iterable, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """ Percentile par interpolation linéaire, q dans [0, 100] """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * q / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+
+
+def summarize(values: Iterable[float], scale: float = 1.0, digits: int = 2) -> Dict[str, float]:
+    """ {count, avg, p50, p95, max} ; `scale` permet par exemple de passer des secondes aux ms """
+    values = [v * scale for v in values]
+    if not values:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p95": 0.0, "max": 0.0}
+    return {
+        "count": len(values),
+        "avg": round(sum(values) / len(values), digits),
+        "p50": round(percentile(values, 50), digits),
+        "p95": round(percentile(values, 95), digits),
+        "max": round(max(values), digits),
+    }
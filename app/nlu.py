@@ -1,7 +1,37 @@
 import os
+import threading
 from pathlib import Path
-from typing import Dict, Any
-import spacy
+from itertools import repeat
+from typing import Dict, Any, Iterable, List, NamedTuple, Optional
+
+from app.gazetteer import DEFAULT_CONFIG_PATH as GAZETTEER_CONFIG_PATH, Gazetteer
+from app.intent_scorer import IntentScorer
+from app.lru_cache import LRUCache
+
+ENTITY_BACKENDS = ("model", "gazetteer", "both")
+
+
+# Models in use and the generation they belong to, swapped as one object by reload():
+# a reader takes a single reference and never pairs a generation with other models.
+class _Pipelines(NamedTuple):
+    generation: int
+    unified: bool
+    intent_nlp: Any                 # spaCy pipeline with the textcat, None when the IntentScorer replaces it
+    entity_nlp: Any                 # spaCy pipeline with the NER, None when entities come from the gazetteer only
+    intent_only_disable: List[str]  # pipes skipped when only the textcat is needed
+    entity_disable: List[str]       # pipes skipped when only the entities are needed
+    gazetteer: Optional[Gazetteer]
+    scorer: Optional[IntentScorer]
+
+    @property
+    def shared(self) -> bool:
+        """Intents and entities from the same Doc (unified pipeline, textcat and NER both used)."""
+        return self.intent_nlp is not None and self.intent_nlp is self.entity_nlp
+
+
+def _spacy_load(path: Path):
+    import spacy  # only when a spaCy model is actually needed (IntentScorer + gazetteer need none)
+    return spacy.load(str(path))
 
 
 class NLU:
@@ -13,17 +43,27 @@ class NLU:
         self,
         intent_model_path: str | None = None,
         entity_model_path: str | None = None,
+        model_path: str | None = None,
         threshold: float | None = None,
         debug: bool | None = None,
+        entity_backend: str | None = None,
+        intent_scorer_path: str | None = None,
     ):
         base_dir = Path(__file__).resolve().parent
 
         intent_path = Path(intent_model_path) if intent_model_path else (base_dir / "intent_model")
         entity_path = Path(entity_model_path) if entity_model_path else (base_dir / "entity_model")
+        unified_path = Path(model_path) if model_path else (base_dir / "nlu_model")
+        scorer_path = Path(intent_scorer_path) if intent_scorer_path else (base_dir / "intent_scorer.bin")
 
         # Allow override via env vars
         intent_path = Path(os.getenv("INTENT_MODEL_PATH", str(intent_path)))
         entity_path = Path(os.getenv("ENTITY_MODEL_PATH", str(entity_path)))
+        unified_path = Path(os.getenv("NLU_MODEL_PATH", str(unified_path)))
+        # compiled textcat (app/nlu_train.py export_intent_scorer); NLU_INTENT_SCORER="" keeps the spaCy textcat
+        scorer_env = os.getenv("NLU_INTENT_SCORER")
+        if scorer_env is not None:
+            scorer_path = Path(scorer_env) if scorer_env else None
 
         thr_env = os.getenv("NLU_INTENT_THRESHOLD")
         self.threshold = threshold if threshold is not None else (float(thr_env) if thr_env else 0.3)
@@ -31,18 +71,105 @@ class NLU:
         dbg_env = os.getenv("NLU_DEBUG")
         self.debug = debug if debug is not None else (dbg_env == "1")
 
-        self.intent_nlp = spacy.load(str(intent_path))
-        self.entity_nlp = spacy.load(str(entity_path))
+        # Entities: "model" (default, NER + entity_ruler), "gazetteer" (compiled catalogue, the NER is not loaded/run)
+        # or "both" (merged, longest span wins)
+        self.entity_backend = (entity_backend or os.getenv("NLU_ENTITIES", "model")).lower()
+        if self.entity_backend not in ENTITY_BACKENDS:
+            raise ValueError(f"NLU_ENTITIES must be one of {ENTITY_BACKENDS}, got {self.entity_backend!r}")
+        self._gazetteer_path = os.getenv("NLU_GAZETTEER_PATH", GAZETTEER_CONFIG_PATH)
+
+        # parse_batch defaults: texts per nlp.pipe batch and worker processes (1 = in-process)
+        self.batch_size = int(os.getenv("NLU_BATCH_SIZE", "64"))
+        self.n_process = int(os.getenv("NLU_N_PROCESS", "1"))
+
+        # Memo of results per normalized text (ASR output for the core intents is very repetitive).
+        # Keys carry the model generation, so a reload() never serves results of the previous models.
+        cache_size = int(os.getenv("NLU_CACHE_SIZE", "1024"))
+        self._memo = LRUCache(cache_size) if cache_size > 0 else None
+        self._reload_lock = threading.Lock()
+
+        self._paths = (intent_path, entity_path, unified_path, scorer_path)
+        self._load_models()
+
+    def _load_models(self, generation: int = 0) -> None:
+        intent_path, entity_path, unified_path, scorer_path = self._paths
+        # Intents: the compiled IntentScorer if exported, no spaCy needed; otherwise the textcat.
+        scorer = IntentScorer.load(str(scorer_path)) if scorer_path and scorer_path.exists() else None
+        use_textcat = scorer is None
+        use_ner = self.entity_backend != "gazetteer"
+        # Unified pipeline (app/nlu_train.py export_unified): one vocab, one tokenization, one Doc per text.
+        # Otherwise the two separate models, each tokenizing the text again.
+        unified = (unified_path / "config.cfg").exists() and (use_textcat or use_ner)
+        intent_only_disable: List[str] = []
+        entity_disable: List[str] = []
+        if unified:
+            nlp = _spacy_load(unified_path)
+            intent_nlp = nlp if use_textcat else None
+            entity_nlp = nlp if use_ner else None
+            # parse_intents_confidences only needs the textcat, the entities only the NER / entity_ruler
+            intent_only_disable = [p for p in nlp.pipe_names if p != "textcat"]
+            entity_disable = [] if use_textcat else [p for p in nlp.pipe_names if p == "textcat"]
+        else:
+            intent_nlp = _spacy_load(intent_path) if use_textcat else None
+            entity_nlp = _spacy_load(entity_path) if use_ner else None
+        gazetteer = self._load_gazetteer() if self.entity_backend != "model" else None
+        if self.debug:
+            print("[NLU] unified pipeline:", unified, "| intents:", "scorer" if scorer else "textcat",
+                  "| entities:", self.entity_backend)
+
+        if entity_nlp is not None:
+            self._ensure_entity_ruler_patterns(entity_nlp)
+        # swap only once the new models are ready: parses in flight keep using the old ones
+        self.unified = unified
+        self.intent_nlp, self.entity_nlp = intent_nlp, entity_nlp
+        self.gazetteer, self.scorer = gazetteer, scorer
+        self._pipelines = _Pipelines(generation, unified, intent_nlp, entity_nlp, intent_only_disable,
+                                     entity_disable, gazetteer, scorer)
+
+    def _load_gazetteer(self) -> Gazetteer:
+        try:
+            gazetteer = Gazetteer.from_config(self._gazetteer_path)
+        except FileNotFoundError:
+            print(f"[NLU] {self._gazetteer_path} not found, gazetteer built from the default lists")
+            gazetteer = Gazetteer.from_catalogue({"ACTIVITY": self._DEFAULT_ACTIVITIES,
+                                                  "LOCATION": self._DEFAULT_LOCATIONS})
+        if self.debug:
+            print(f"[NLU] gazetteer: {len(gazetteer)} patterns")
+        return gazetteer
 
-        self._ensure_entity_ruler_patterns()
+    def reload(self) -> None:
+        """Reload the models, scorer and gazetteer (after retraining / catalogue edits) and invalidate the memo."""
+        with self._reload_lock:
+            self._load_models(self._pipelines.generation + 1)
+            if self._memo is not None:
+                self._memo.clear()
 
-    def _ensure_entity_ruler_patterns(self) -> None:
-        if "entity_ruler" not in getattr(self.entity_nlp, "pipe_names", []):
+    def cache_stats(self) -> Dict[str, Any]:
+        if self._memo is None:
+            return {"enabled": False}
+        return {"enabled": True, "generation": self._pipelines.generation, **self._memo.stats()}
+
+    def _memo_get(self, kind: str, text_in: str, generation: int):
+        if self._memo is None:
+            return None
+        return self._memo.get((generation, kind, text_in))
+
+    def _memo_set(self, kind: str, text_in: str, value, generation: int) -> None:
+        if self._memo is not None:
+            self._memo.set((generation, kind, text_in), value)
+
+    @staticmethod
+    def _with_raw_text(result: Dict[str, Any], text: str) -> Dict[str, Any]:
+        # fresh dict/lists: callers may modify what they get without touching the memo
+        return {**result, "entities": {k: list(v) for k, v in result["entities"].items()}, "raw_text": text}
+
+    def _ensure_entity_ruler_patterns(self, entity_nlp) -> None:
+        if "entity_ruler" not in getattr(entity_nlp, "pipe_names", []):
             if self.debug:
                 print("[NLU] entity_model has no entity_ruler pipe")
             return
 
-        ruler = self.entity_nlp.get_pipe("entity_ruler")
+        ruler = entity_nlp.get_pipe("entity_ruler")
 
         # Some saved models end up with an empty ruler; inject defaults.
         if getattr(ruler, "patterns", None) and len(ruler.patterns) > 0:
@@ -60,7 +187,7 @@ class NLU:
 
         if self.debug:
             print("[NLU] Injected default EntityRuler patterns:", len(ruler.patterns))
-            print("[NLU] entity_model pipes:", self.entity_nlp.pipe_names)
+            print("[NLU] entity_model pipes:", entity_nlp.pipe_names)
 
     def __normalize_text(self, text: str) -> str:
         return (text or "").strip().lower()
@@ -70,24 +197,103 @@ class NLU:
         if not text_in:
             return {"intent": "unknown", "confidence": 0.0, "entities": {}, "raw_text": text}
 
+        pipelines = self._pipelines
+        cached = self._memo_get("parse", text_in, pipelines.generation)
+        if cached is not None:
+            return self._with_raw_text(cached, text)
+
+        if pipelines.shared:
+            doc = pipelines.intent_nlp(text_in)
+            result = self._result(text_in, doc.cats, doc, pipelines.gazetteer)
+        else:
+            doc_entities = (pipelines.entity_nlp(text_in, disable=pipelines.entity_disable)
+                            if pipelines.entity_nlp is not None else None)
+            result = self._result(text_in, self._cats(pipelines, text_in), doc_entities, pipelines.gazetteer)
+        self._memo_set("parse", text_in, result, pipelines.generation)
+        return self._with_raw_text(result, text)
+
+    def parse_batch(self, texts: Iterable[str], batch_size: int | None = None,
+                    n_process: int | None = None) -> List[Dict[str, Any]]:
+        """
+        Same output as [parse(t) for t in texts], in the same order, but each model runs
+        once over the whole list through nlp.pipe (batched, optionally on n_process processes).
+        """
+        texts = list(texts)
+        batch_size = batch_size or self.batch_size
+        n_process = n_process or self.n_process
+
+        results: List[Dict[str, Any]] = [
+            {"intent": "unknown", "confidence": 0.0, "entities": {}, "raw_text": t} for t in texts
+        ]
+        pipelines = self._pipelines
+        # normalized text -> indexes in `texts`; memoized texts and duplicates are not parsed again
+        todo: Dict[str, List[int]] = {}
+        for i, t in enumerate(texts):
+            text_in = self.__normalize_text(t)
+            if not text_in:
+                continue
+            cached = self._memo_get("parse", text_in, pipelines.generation)
+            if cached is not None:
+                results[i] = self._with_raw_text(cached, t)
+            else:
+                todo.setdefault(text_in, []).append(i)
+        if not todo:
+            return results
+
+        inputs = list(todo)
+        if pipelines.shared:
+            docs = list(pipelines.intent_nlp.pipe(inputs, batch_size=batch_size, n_process=n_process))
+            cats, docs_entities = [doc.cats for doc in docs], docs
+        else:
+            if pipelines.scorer is not None:
+                cats = [pipelines.scorer.scores(text_in) for text_in in inputs]
+            else:
+                cats = [doc.cats for doc in pipelines.intent_nlp.pipe(
+                    inputs, batch_size=batch_size, n_process=n_process, disable=pipelines.intent_only_disable)]
+            docs_entities = (pipelines.entity_nlp.pipe(inputs, batch_size=batch_size, n_process=n_process,
+                                                       disable=pipelines.entity_disable)
+                             if pipelines.entity_nlp is not None else repeat(None))
+        for text_in, text_cats, doc_entities in zip(inputs, cats, docs_entities):
+            result = self._result(text_in, text_cats, doc_entities, pipelines.gazetteer)
+            self._memo_set("parse", text_in, result, pipelines.generation)
+            for i in todo[text_in]:
+                results[i] = self._with_raw_text(result, texts[i])
+        return results
+
+    @staticmethod
+    def _cats(pipelines: _Pipelines, text_in: str) -> Dict[str, float]:
+        if pipelines.scorer is not None:
+            return pipelines.scorer.scores(text_in)
+        return pipelines.intent_nlp(text_in, disable=pipelines.intent_only_disable).cats
+
+    def _result(self, text: str, cats: Dict[str, float], doc_entities,
+                gazetteer: Optional[Gazetteer] = None) -> Dict[str, Any]:
         # Intent
-        doc_intent = self.intent_nlp(text_in)
         intent = "unknown"
         confidence = 0.0
 
-        if getattr(doc_intent, "cats", None):
-            intent = max(doc_intent.cats, key=doc_intent.cats.get)
-            confidence = float(doc_intent.cats.get(intent, 0.0))
+        if cats:
+            intent = max(cats, key=cats.get)
+            confidence = float(cats.get(intent, 0.0))
 
         if confidence < self.threshold:
             intent = "unknown"
 
-        # Entities
-        doc_entities = self.entity_nlp(text_in)
-        entities: Dict[str, list[str]] = {}
+        # Entities (character spans of the normalized text, from the NER and/or the gazetteer)
+        spans = []
+        if doc_entities is not None:
+            spans += [(ent.start_char, ent.end_char, ent.label_, ent.text) for ent in doc_entities.ents]
+        if gazetteer is not None:
+            spans += [(m.start, m.end, m.label, m.text) for m in gazetteer.find(text)]
 
-        for ent in doc_entities.ents:
-            entities.setdefault(ent.label_.lower(), []).append(ent.text)
+        entities: Dict[str, list[str]] = {}
+        next_free = 0
+        # leftmost, then longest: "salle de sport" (gazetteer) wins over "salle" (NER)
+        for start, end, label, ent_text in sorted(spans, key=lambda s: (s[0], s[0] - s[1])):
+            if start < next_free:
+                continue
+            entities.setdefault(label.lower(), []).append(ent_text)
+            next_free = end
 
         return {
             "intent": intent,
@@ -101,11 +307,14 @@ class NLU:
         if not text_in:
             return {}
 
-        doc_intent = self.intent_nlp(text_in)
-        intents_confidences: Dict[str, float] = {}
+        pipelines = self._pipelines
+        cached = self._memo_get("cats", text_in, pipelines.generation)
+        if cached is not None:
+            return dict(cached)
 
-        if getattr(doc_intent, "cats", None):
-            for intent, conf in doc_intent.cats.items():
-                intents_confidences[intent] = round(float(conf), 2)
+        intents_confidences: Dict[str, float] = {}
+        for intent, conf in self._cats(pipelines, text_in).items():
+            intents_confidences[intent] = round(float(conf), 2)
 
-        return intents_confidences
\ No newline at end of file
+        self._memo_set("cats", text_in, intents_confidences, pipelines.generation)
+        return dict(intents_confidences)
\ No newline at end of file
@@ -1,11 +1,21 @@
 import random
 from pathlib import Path
 
+import numpy as np
 import spacy
+from spacy.attrs import ORTH
 from spacy.training.example import Example
 
+from app.intent_scorer import NGRAM_SEP, IntentScorer, _split_chunk
 from configs.intents import RAW_TRAIN_DATA
 
+# Modèles dans app/, là où NLU les cherche, quel que soit le répertoire courant :
+#   python -m app.nlu_train   (depuis la racine du dépôt)
+APP_DIR = Path(__file__).resolve().parent
+
+# Composants repris dans le pipeline unifié : textcat du modèle d'intentions, tout le modèle d'entités
+UNIFIED_INTENT_PIPES = ["textcat"]
+
 
 def _to_exclusive_cats(data: list[tuple[str, str]], labels: list[str]):
     out = []
@@ -16,7 +26,7 @@ def _to_exclusive_cats(data: list[tuple[str, str]], labels: list[str]):
     return out
 
 
-def train(output_dir: str = "intent_model", n_iter: int = 30, dev_ratio: float = 0.2, seed: int = 42):
+def train(output_dir: str = str(APP_DIR / "intent_model"), n_iter: int = 30, dev_ratio: float = 0.2, seed: int = 42):
     random.seed(seed)
 
     labels = sorted({lab for _, lab in RAW_TRAIN_DATA})
@@ -87,5 +97,113 @@ def train(output_dir: str = "intent_model", n_iter: int = 30, dev_ratio: float =
     print(f"✅ Modèle intent sauvegardé dans : {output_dir}")
 
 
+def export_unified(intent_dir: str = str(APP_DIR / "intent_model"), entity_dir: str = str(APP_DIR / "entity_model"),
+                   output_dir: str = str(APP_DIR / "nlu_model"), check_texts: list[str] | None = None) -> int:
+    """
+    Assemble un seul pipeline (tokenizer, textcat, entity_ruler, ner) à partir des deux modèles
+    entraînés : un seul vocabulaire et un seul Doc par phrase au lieu de deux tokenisations.
+    NLU le charge à la place des deux modèles s'il existe (app/nlu_model ou NLU_MODEL_PATH).
+    Vérifie sur `check_texts` (défaut : les phrases d'entraînement) que les intentions, les scores et
+    les entités sont ceux des deux modèles séparés ; renvoie le nombre de différences.
+    """
+    intent_nlp = spacy.load(intent_dir)
+    entity_nlp = spacy.load(entity_dir)
+
+    nlp = spacy.blank(entity_nlp.lang)
+    for name in UNIFIED_INTENT_PIPES:
+        nlp.add_pipe(name, source=intent_nlp)
+    # même ordre que le modèle d'entités : le résultat de entity_ruler/ner reste identique
+    for name in entity_nlp.pipe_names:
+        nlp.add_pipe(name, source=entity_nlp)
+
+    texts = check_texts if check_texts is not None else [text.lower() for text, _ in RAW_TRAIN_DATA]
+    mismatches = 0
+    for text, doc in zip(texts, nlp.pipe(texts)):
+        expected_cats = intent_nlp(text).cats
+        expected_ents = [(e.text, e.label_) for e in entity_nlp(text).ents]
+        same_cats = expected_cats.keys() == doc.cats.keys() and all(
+            abs(expected_cats[label] - doc.cats[label]) < 1e-5 for label in expected_cats)
+        if not same_cats or expected_ents != [(e.text, e.label_) for e in doc.ents]:
+            mismatches += 1
+            print(f"⚠️  Différence sur '{text}'")
+
+    nlp.to_disk(Path(output_dir))
+    print(f"✅ Pipeline unifié {nlp.pipe_names} sauvegardé dans : {output_dir}"
+          f" ({len(texts) - mismatches}/{len(texts)} phrases identiques aux deux modèles)")
+    return mismatches
+
+
+def export_intent_scorer(intent_dir: str = str(APP_DIR / "intent_model"),
+                         output_path: str = str(APP_DIR / "intent_scorer.bin"),
+                         check_texts: list[str] | None = None) -> int:
+    """
+    Compile le textcat (TextCatBOW) du modèle d'intentions en un IntentScorer (app/intent_scorer.py) :
+    les poids de chaque n-gramme des phrases d'entraînement, lus dans la table hachée, sans spaCy au
+    chargement. NLU l'utilise à la place du textcat s'il existe (app/intent_scorer.bin ou NLU_INTENT_SCORER).
+    Vérifie sur `check_texts` (défaut : les phrases d'entraînement) que l'intention retenue et les scores
+    sont ceux du modèle spaCy ; renvoie le nombre de différences.
+    """
+    nlp = spacy.load(intent_dir)
+    model_cfg = nlp.config["components"]["textcat"]["model"]
+    if not model_cfg["@architectures"].startswith("spacy.TextCatBOW") or model_cfg.get("no_output_layer"):
+        raise ValueError(f"Architecture non compilable : {model_cfg['@architectures']}")
+    textcat = nlp.get_pipe("textcat")
+    linear = textcat.model.get_ref("output_layer")  # SparseLinear : biais + table de poids hachée
+    ngram_size = model_cfg["ngram_size"]
+
+    texts = check_texts if check_texts is not None else [text.lower() for text, _ in RAW_TRAIN_DATA]
+    # n-grammes vus à l'entraînement (casse d'origine) et à l'exécution (texte normalisé)
+    corpus = [text for text, _ in RAW_TRAIN_DATA] + texts
+
+    features, keys, exceptions = {}, [], {}
+    for text in corpus:
+        for chunk in filter(None, text.split(" ")):
+            tokens = [t.text for t in nlp.make_doc(chunk)]
+            if tokens != list(_split_chunk(chunk)):
+                exceptions[chunk] = tokens
+        doc = nlp.make_doc(text)
+        tokens = [t.text for t in doc]
+        unigrams = np.ascontiguousarray(doc.to_array([ORTH]), dtype="uint64")
+        for n in range(1, ngram_size + 1):
+            # mêmes clés que spacy.ml.extract_ngrams
+            ngram_keys = unigrams if n == 1 else linear.ops.ngrams(n, unigrams)
+            for i, key in enumerate(ngram_keys):
+                name = NGRAM_SEP.join(tokens[i:i + n])
+                if name not in features:
+                    features[name] = len(keys)
+                    keys.append(int(key))
+
+    # poids de chaque clé = sortie de la couche pour cette clé seule, biais à zéro
+    bias = linear.get_param("b").copy()
+    linear.set_param("b", linear.ops.alloc1f(bias.shape[0]))
+    try:
+        rows = linear.predict((np.asarray(keys, dtype="uint64"), np.ones(len(keys), dtype="f"),
+                               np.ones(len(keys), dtype="int32")))
+    finally:
+        linear.set_param("b", bias)
+    kept = [(name, rows[i]) for name, i in features.items() if np.any(rows[i])]
+
+    scorer = IntentScorer(list(textcat.labels), bias.tolist(), [name for name, _ in kept],
+                          np.concatenate([row for _, row in kept]).astype("f").tolist() if kept else [],
+                          exceptions, ngram_size, not textcat.model.attrs["multi_label"])
+
+    mismatches = 0
+    for text, doc in zip(texts, nlp.pipe(texts)):
+        expected, got = doc.cats, scorer.scores(text)
+        same = max(expected, key=expected.get) == max(got, key=got.get) and all(
+            abs(expected[label] - got[label]) < 1e-4 for label in expected)
+        if not same or scorer.tokenize(text) != [t.text for t in doc]:
+            mismatches += 1
+            print(f"⚠️  Différence sur '{text}'")
+
+    scorer.save(output_path)
+    print(f"✅ Scorer d'intentions ({len(kept)} n-grammes, {len(exceptions)} exceptions de tokenisation)"
+          f" sauvegardé dans : {output_path} ({len(texts) - mismatches}/{len(texts)} phrases identiques au modèle)")
+    return mismatches
+
+
 if __name__ == "__main__":
     train()
+    export_intent_scorer()
+    if (APP_DIR / "entity_model").exists():
+        export_unified()
@@ -4,6 +4,8 @@ from pathlib import Path
 import spacy
 from spacy.training.example import Example
 
+from app.nlu_train import APP_DIR, export_unified
+
 # More varied training data
 TRAIN_DATA_ENTITIES = [
     ("je veux faire du football", {"entities": [(16, 20, "ACTIVITY")]}),
@@ -26,7 +28,7 @@ ACTIVITIES = ["yoga", "fitness", "basket", "basketball", "tennis", "futsal", "na
 LOCATIONS = ["salle", "salle de sport", "vestiaire", "terrain", "accueil", "secrétariat"]
 
 
-def train(output_dir: str = "entity_model", n_iter: int = 40, seed: int = 42):
+def train(output_dir: str = str(APP_DIR / "entity_model"), n_iter: int = 40, seed: int = 42):
     random.seed(seed)
     nlp = spacy.blank("fr")
     
@@ -89,5 +91,8 @@ def train(output_dir: str = "entity_model", n_iter: int = 40, seed: int = 42):
     print(f"   - NER entraîné pour apprendre des patterns")
     print(f"   - Entity Ruler ajouté pour couvrir les cas connus")
 
+# python -m app.nlu_train_entites   (depuis la racine du dépôt)
 if __name__ == "__main__":
     train()
+    if (APP_DIR / "intent_model").exists():
+        export_unified()
@@ -0,0 +1,154 @@
+"""
+app/response_cache.py
+Cache of LLM replies for FAQ-style turns ("bonjour", "quels sont vos horaires ?").
+
+Entries are keyed on the LLM backend/model, the system prompt as sent (including
+the summary of folded turns, see app/context_window.py), the NLU intent and the
+last `history_window` messages of the conversation (normalized: case, accents,
+spacing and trailing punctuation do not matter). A fresh session asking a common
+question therefore hits the cache, while the same words later in a conversation
+are keyed with their context. Eviction is LRU, expiry is per intent (a TTL of 0
+disables caching for that intent), and the cache can be persisted to disk so it
+survives restarts.
+
+Configuration: configs/response_cache.json (see DEFAULT_CONFIG for the keys).
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+from app.lru_cache import LRUCache
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "configs", "response_cache.json")
+DEFAULT_CONFIG = {
+    "enabled": True,
+    "max_entries": 512,
+    "default_ttl": 3600,
+    "history_window": 3,
+    "persist_path": None,
+    "intent_ttls": {},
+}
+
+
+def normalize_text(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?…")
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 512, default_ttl: float = 3600, history_window: int = 3,
+                 intent_ttls: Optional[Dict[str, float]] = None, persist_path: Optional[str] = None,
+                 enabled: bool = True):
+        self.enabled = enabled
+        self.default_ttl = default_ttl
+        self.history_window = max(1, history_window)
+        self.intent_ttls = dict(intent_ttls or {})
+        self.persist_path = persist_path
+        self._cache = LRUCache(max_entries, ttl=default_ttl)
+        self._lock = threading.Lock()
+        self._counters = {"stores": 0, "skipped": 0, "uncacheable": 0}
+        if self.enabled and self.persist_path:
+            self.load()
+
+    @classmethod
+    def from_config(cls, config_path: str = DEFAULT_CONFIG_PATH) -> "ResponseCache":
+        """Build from a JSON config file; missing file or keys fall back to DEFAULT_CONFIG."""
+        cfg = dict(DEFAULT_CONFIG)
+        try:
+            with open(config_path, "r", encoding="utf-8") as f:
+                cfg.update(json.load(f))
+        except FileNotFoundError:
+            pass
+        persist_path = cfg.get("persist_path")
+        if persist_path and not os.path.isabs(persist_path):
+            persist_path = os.path.join(os.path.dirname(os.path.abspath(config_path)), "..", persist_path)
+        return cls(max_entries=cfg["max_entries"], default_ttl=cfg["default_ttl"],
+                   history_window=cfg["history_window"], intent_ttls=cfg["intent_ttls"],
+                   persist_path=persist_path, enabled=cfg["enabled"])
+
+    # ---------- Keys ----------
+
+    def key(self, namespace: str, system_prompt: str, intent: str, history: List[Dict[str, str]]) -> str:
+        """`namespace` identifies the model (e.g. "openai:llama-pepper") so a model change misses."""
+        window = [[m.get("role", ""), normalize_text(m.get("content", ""))]
+                  for m in history[-self.history_window:]]
+        raw = json.dumps([namespace, system_prompt, intent, window], ensure_ascii=False)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, intent: str) -> float:
+        return self.intent_ttls.get(intent, self.default_ttl)
+
+    def cacheable(self, intent: str) -> bool:
+        return self.enabled and self.ttl_for(intent) > 0
+
+    # ---------- Lookups ----------
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def put(self, key: str, intent: str, text: str) -> None:
+        ttl = self.ttl_for(intent)
+        if not self.enabled or ttl <= 0 or not text:
+            return
+        self._cache.set(key, text, ttl=ttl)
+        with self._lock:
+            self._counters["stores"] += 1
+
+    def count(self, counter: str) -> None:
+        """Record a request that bypassed the cache ("skipped": asked by the client, "uncacheable": intent TTL 0)."""
+        with self._lock:
+            self._counters[counter] += 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    # ---------- Persistence ----------
+
+    def save(self) -> int:
+        """Write the live entries to persist_path (if set); returns the number of entries written."""
+        if not self.persist_path:
+            return 0
+        now = time.time()
+        entries = [{"key": key, "text": text, "expires_at": None if ttl is None else now + ttl}
+                   for key, text, ttl in self._cache.snapshot()]
+        os.makedirs(os.path.dirname(os.path.abspath(self.persist_path)), exist_ok=True)
+        tmp_path = self.persist_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_path, self.persist_path)
+        print(f"[ResponseCache] {len(entries)} entries saved to {self.persist_path}")
+        return len(entries)
+
+    def load(self) -> int:
+        """Reload entries saved by save(), skipping the expired ones; returns the number loaded."""
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            print(f"[ResponseCache] Could not read {self.persist_path}: {e}")
+            return 0
+
+        now = time.time()
+        loaded = 0
+        for entry in data.get("entries", []):
+            expires_at = entry.get("expires_at")
+            if expires_at is not None and expires_at <= now:
+                continue
+            self._cache.set(entry["key"], entry["text"], ttl=None if expires_at is None else expires_at - now)
+            loaded += 1
+        print(f"[ResponseCache] {loaded} entries loaded from {self.persist_path}")
+        return loaded
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+        return {"enabled": self.enabled, **self._cache.stats(), **counters}
@@ -0,0 +1,115 @@
+"""
+app/rolling.py
+Fenêtre glissante de veille par client (stream_id).
+
+Avant, le robot fusionnait ses deux derniers chunks de 2 s et renvoyait le tout
+à chaque cycle : chaque chunk était transcrit deux fois. Ici le client n'envoie
+que le nouveau chunk ; le serveur garde, par flux, la fin du chunk précédent et
+le texte des derniers chunks. Seul le nouveau chunk est décodé, précédé de
+`overlap` secondes du précédent pour ne pas couper un mot de réveil à la
+frontière.
+
+Un chunk renvoyé par le client après un échec réseau (même `seq`, même audio)
+est rejoué : le résultat précédent est renvoyé sans redécodage et sans toucher
+à la fenêtre. Les transcriptions sont mises en cache par (stream_id, seq,
+empreinte du chunk), ce qui couvre aussi le renvoi d'un chunk dont le mot de
+réveil a déjà réinitialisé le flux ; sans `seq`, par empreinte de l'audio décodé.
+"""
+import hashlib
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE
+from app.lru_cache import LRUCache
+
+
+class _StreamState:
+    __slots__ = ("texts", "tail", "seq", "last_hash", "last_decode", "last_window")
+
+    def __init__(self, window_chunks):
+        self.texts = deque(maxlen=window_chunks)
+        self.tail = np.zeros(0, dtype=np.float32)
+        self.seq = None
+        # dernier chunk accepté, pour rejouer un renvoi à l'identique
+        self.last_hash = None
+        self.last_decode = None
+        self.last_window = ""
+
+
+class RollingTranscriber:
+    def __init__(self, window_chunks: int = 2, overlap: float = 0.5, cache_size: int = 256,
+                 max_streams: int = 64, stream_ttl: float = 30.0):
+        self.window_chunks = max(1, window_chunks)
+        self.overlap = int(overlap * SAMPLE_RATE)
+        self._chunks = LRUCache(cache_size)
+        # Un flux sans nouveau chunk pendant `stream_ttl` s repart de zéro
+        self._streams = LRUCache(max_streams, ttl=stream_ttl)
+        self._lock = threading.Lock()
+
+    def feed(self, detector, stream_id: str, audio, sample_rate=None, seq=None):
+        """
+        Ajoute un chunk au flux `stream_id` et renvoie le résultat de détection au format
+        de WakeWordDetector.detect, `text` couvrant toute la fenêtre. `seq` (numéro de chunk
+        côté client) permet de détecter un trou : la fenêtre est alors réinitialisée ; un chunk
+        renvoyé avec le même `seq` est rejoué sans redécodage.
+        """
+        start_time = time.time()
+        samples = detector.load(audio, sample_rate)
+        chunk_hash = hashlib.sha1(samples.tobytes()).hexdigest()
+
+        with self._lock:
+            state = self._streams.get(stream_id)
+            replay = (state is not None and seq is not None and seq == state.seq
+                      and chunk_hash == state.last_hash)
+            if replay:
+                text, no_speech_prob = state.last_decode
+                window_text = state.last_window
+            else:
+                if state is None or (seq is not None and state.seq is not None and seq != state.seq + 1):
+                    state = _StreamState(self.window_chunks)
+                state.seq = seq
+                self._streams.set(stream_id, state)
+                lead_in = state.tail
+
+        if replay:
+            detected, score, keyword = detector.score(text, no_speech_prob)
+            result = detector.build_result(detected, score, keyword, window_text, start_time)
+            result["stream_id"] = stream_id
+            return result
+
+        clip = np.concatenate([lead_in, samples]) if len(lead_in) else samples
+        # avec seq : le chunk lui-même (son lead-in a pu changer depuis le premier envoi)
+        key = (stream_id, seq, chunk_hash) if seq is not None else hashlib.sha1(clip.tobytes()).hexdigest()
+        cached = self._chunks.get(key)
+        if cached is None:
+            cached = detector.transcribe(clip)
+            self._chunks.set(key, cached)
+        text, no_speech_prob = cached
+
+        detected, score, keyword = detector.score(text, no_speech_prob)
+        with self._lock:
+            state.texts.append(text)
+            state.tail = samples[-self.overlap:] if self.overlap else state.tail[:0]
+            window_text = " ".join(t for t in state.texts if t)
+            state.last_hash, state.last_decode, state.last_window = chunk_hash, cached, window_text
+            if detected:
+                # Le robot passe en conversation : le flux de veille repart de zéro
+                self._streams.pop(stream_id)
+
+        result = detector.build_result(detected, score, keyword, window_text, start_time)
+        result["stream_id"] = stream_id
+        return result
+
+    def reset(self, stream_id: str) -> None:
+        self._streams.pop(stream_id)
+
+    def stats(self) -> dict:
+        return {
+            "window_chunks": self.window_chunks,
+            "overlap_s": round(self.overlap / SAMPLE_RATE, 2),
+            "streams": len(self._streams),
+            "chunk_cache": self._chunks.stats(),
+        }
@@ -0,0 +1,80 @@
+"""
+app/sentences.py
+Groups streamed LLM text deltas into sentence-sized chunks that the robot can
+start speaking while the rest of the answer is still being generated.
+"""
+import re
+from typing import Iterable, Iterator, List
+
+# End of sentence: . ! ? … (possibly repeated, possibly followed by a closing quote/bracket)
+# then whitespace. French typography puts a space before ! and ?, which this also covers.
+_BOUNDARY = re.compile(r"[.!?…]+[\"'»)\]]*\s+")
+# Fallback cut points for long sentences without a full stop yet
+_SOFT_BOUNDARY = re.compile(r"[,;:]\s+|\n+")
+# Short tokens ending with a dot that do not end a sentence
+_ABBREVIATIONS = {"m", "mm", "mme", "mmes", "mlle", "dr", "pr", "st", "ste", "etc", "ex", "cf", "env", "n°", "no"}
+
+
+class SentenceChunker:
+    """Accumulates text deltas and releases complete sentences.
+
+    `min_chars` avoids emitting tiny fragments ("Oui." is merged with what follows
+    unless it is the first sentence, which is released as soon as possible to cut
+    time-to-first-audio). `max_chars` forces a cut on a comma/colon when a sentence
+    grows too long without a full stop.
+    """
+
+    def __init__(self, min_chars: int = 20, max_chars: int = 200):
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self._buffer = ""
+        self._emitted = 0
+
+    def feed(self, delta: str) -> List[str]:
+        self._buffer += delta
+        sentences = []
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            sentence = self._buffer[:cut].strip()
+            self._buffer = self._buffer[cut:]
+            if sentence:
+                sentences.append(sentence)
+                self._emitted += 1
+        return sentences
+
+    def flush(self) -> List[str]:
+        rest = self._buffer.strip()
+        self._buffer = ""
+        if not rest:
+            return []
+        self._emitted += 1
+        return [rest]
+
+    def _find_cut(self):
+        # The first sentence goes out as soon as it is complete, later ones once long enough
+        min_chars = 1 if self._emitted == 0 else self.min_chars
+        for match in _BOUNDARY.finditer(self._buffer):
+            if match.end() < min_chars or self._is_abbreviation(match.start()):
+                continue
+            return match.end()
+
+        if len(self._buffer) > self.max_chars:
+            soft = [m.end() for m in _SOFT_BOUNDARY.finditer(self._buffer, 0, self.max_chars)]
+            return soft[-1] if soft else None
+        return None
+
+    def _is_abbreviation(self, dot: int) -> bool:
+        if self._buffer[dot] != ".":
+            return False
+        word = re.search(r"(\S+)$", self._buffer[:dot])
+        return bool(word) and word.group(1).lower() in _ABBREVIATIONS
+
+
+def iter_sentences(deltas: Iterable[str], min_chars: int = 20, max_chars: int = 200) -> Iterator[str]:
+    """Re-chunk a stream of text deltas into sentences."""
+    chunker = SentenceChunker(min_chars, max_chars)
+    for delta in deltas:
+        yield from chunker.feed(delta)
+    yield from chunker.flush()
@@ -2,7 +2,7 @@ import os
 import time
 import sys
 import site
-import wave
+from collections import namedtuple
 
 #Chargment des cudas dynamique - Code portable
 def setup_cuda_path():
@@ -28,80 +28,302 @@ if sys.platform == "win32":
     setup_cuda_path()
 
 from faster_whisper import WhisperModel
+from faster_whisper.audio import decode_audio
+from faster_whisper.transcribe import get_ctranslate2_storage
+
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE, AudioDecodeError, is_wav, load_audio
+from app.vad import VoiceActivityDetector
+
+# Whisper traite des fenêtres de 30 s : au-delà, un clip ne peut pas être décodé en lot
+MAX_BATCH_CLIP_SECONDS = 30.0
+
+# Profils de décodage, choisis par requête (?profile=) ou mémorisés dans la session
+DECODE_PROFILES = {
+    # Tours courants : greedy, langue imposée (celle de la session, sinon la langue par défaut)
+    "fast": {"beam_size": 1, "best_of": 1, "temperature": 0.0, "without_timestamps": True,
+             "condition_on_previous_text": False, "detect_language": False},
+    # Beam search et détection automatique de la langue (sauf si la session l'a déjà fixée)
+    "accurate": {"beam_size": 5, "detect_language": True},
+}
+
+# Équivalent minimal de TranscriptionInfo (décodages en lot, clips rejetés par le VAD)
+DecodeInfo = namedtuple("DecodeInfo", ["language", "language_probability"])
+
+
+class _Pending(Exception):
+    """ Le clip attend un calcul fait pour tout le lot (encodeur, langue, premier décodage) """
+
+
+class _NeedsSingleDecode(Exception):
+    """ faster-whisper demande un calcul que le lot n'a pas fait : le clip est redécodé seul """
+
+
+class _FeatureCache:
+    """ Le log-Mel d'un clip n'est calculé qu'une fois, quel que soit le nombre de passes """
+
+    def __init__(self, extractor):
+        self._extractor = extractor
+        self._features = None
+
+    def __call__(self, audio, **kwargs):
+        if self._features is None:
+            self._features = self._extractor(audio, **kwargs)
+        return self._features
+
+    def __getattr__(self, name):
+        return getattr(self._extractor, name)
+
+
+class _BatchedClip:
+    """
+    Un clip d'un lot vu comme un WhisperModel : transcribe(), generate_segments(),
+    generate_with_fallback() et get_prompt() sont ceux de faster-whisper, seuls les appels
+    au modèle CTranslate2 sont interceptés. Une première passe relève la fenêtre à encoder
+    et la requête du premier décodage ; une fois le lot calculé, la passe suivante rejoue
+    faster-whisper sur ces résultats. Tout autre appel au modèle lève _NeedsSingleDecode.
+    """
+    transcribe = WhisperModel.transcribe
+    generate_segments = WhisperModel.generate_segments
+    generate_with_fallback = WhisperModel.generate_with_fallback
+    get_prompt = WhisperModel.get_prompt
+
+    def __init__(self, whisper, audio, options):
+        self.audio = audio
+        self.options = options
+        self.logger = whisper.logger
+        self.hf_tokenizer = whisper.hf_tokenizer
+        self.feature_extractor = _FeatureCache(whisper.feature_extractor)
+        self.num_samples_per_token = whisper.num_samples_per_token
+        self.frames_per_second = whisper.frames_per_second
+        self.tokens_per_second = whisper.tokens_per_second
+        self.input_stride = whisper.input_stride
+        self.time_precision = whisper.time_precision
+        self.max_length = whisper.max_length
+        self.model = self  # remplace le modèle CTranslate2
+        self.is_multilingual = whisper.model.is_multilingual
+
+        self.window = None  # fenêtre de 30 s à encoder
+        self.language_probs = None
+        self.request = None  # (prompt, options de generate) du premier décodage
+        self.result = None
+        self._encoded = self._generated = False
+
+    def run(self):
+        """ Une passe de faster-whisper ; renvoie (segments, info), ou None s'il manque un résultat du lot """
+        self._encoded = self._generated = False
+        try:
+            segments, info = self.transcribe(self.audio, **self.options)
+            return list(segments), info
+        except _Pending:
+            return None
+
+    def encode(self, features):
+        if self._encoded:
+            raise _NeedsSingleDecode("fenêtre suivante")
+        self._encoded = True
+        if self.window is None:
+            self.window = features
+        return self  # la sortie de l'encodeur n'est lue que par les méthodes ci-dessous
+
+    def detect_language(self, encoder_output):
+        if self.language_probs is None:
+            raise _Pending()
+        return [self.language_probs]
+
+    def generate(self, encoder_output, prompts, **kwargs):
+        if self._generated:
+            raise _NeedsSingleDecode("température de repli")
+        self._generated = True
+        if self.result is None:
+            self.request = (prompts[0], kwargs)
+            raise _Pending()
+        return [self.result]
+
+    def align(self, *args, **kwargs):
+        raise _NeedsSingleDecode("alignement des mots")
+
 
 class ASRModule:
-    def __init__(self, model_size="base", logprob_threshold=-1.0, nospeech_threshold=0.6):
+    def __init__(self, model_size="base", logprob_threshold=-1.0, nospeech_threshold=0.6,
+                 num_workers=1, cpu_threads=0, vad="energy", default_language="fr", default_profile="accurate",
+                 compute_type="int8"):
         # On force l'utilisation du processeur (cpu) si vous n'avez pas de GPU NVIDIA
         print(f"[ASR] Chargement du modèle Whisper ({model_size})...")
         # "int8" permet de rendre le modèle encore plus léger
+        # num_workers : nombre de décodages simultanés acceptés par CTranslate2 (un par thread du pool)
+        # cpu_threads : threads de calcul par décodage (0 = valeur par défaut de CTranslate2)
         self.model = WhisperModel(model_size,
                                 #   device="cuda",
                                   device="cpu",
                                 #   compute_type="int8_float16")
-                                  compute_type="int8")
+                                  compute_type=compute_type,
+                                  num_workers=num_workers,
+                                  cpu_threads=cpu_threads)
         
         self.logprob_threshold = logprob_threshold # Plus bas : modèle trop incertain
         self.nospeech_threshold = nospeech_threshold # Plus haut : Plus de tolérance au bruit
+
+        # VAD en amont de Whisper : "off", "energy", "webrtc" ou "silero"
+        self.vad = VoiceActivityDetector(model=vad)
+        self.default_language = default_language # Langue du profil "fast" et des clips sans voix
+        self.default_profile = default_profile
     
-    def clean_audio_with_vad(self, file_path):
-        
-        if not os.path.exists(file_path):
-            return False
-        
-        try:
-            with wave.open(file_path, 'rb') as wf:
-                sample_rate = wf.getframerate()
-                n_channels = wf.getnchannels()
-                sampwidth = wf.getsampwidth()
-                frames = wf.readframes(wf.getnframes())
-
-            # Le VAD nécessite obligatoirement du 16-bit PCM Mono
-            if n_channels != 1 or sampwidth != 2:
-                print("[VAD] Format incompatible (doit être Mono 16-bit)")
-                return False
-
-            frame_duration_ms = 30
-            frame_size = int(sample_rate * (frame_duration_ms / 1000.0) * 2)
-
-            voiced_frames = []
-            for i in range(0, len(frames), frame_size):
-                chunk = frames[i:i + frame_size]
-                if len(chunk) < frame_size:
-                    break
-                if self.vad.is_speech(chunk, sample_rate):
-                    voiced_frames.append(chunk)
-            
-            if not voiced_frames:
-                print("[VAD] Aucun segment de voix détecté.")
-                # On ne vide pas le fichier pour éviter que Whisper crash, 
-                # mais on sait qu'il sera peu fiable.
-                return False
-
-            # On réécrit le fichier avec uniquement la voix
-            with wave.open(file_path, 'wb') as wf:
-                wf.setnchannels(n_channels)
-                wf.setsampwidth(sampwidth)
-                wf.setframerate(sample_rate)
-                wf.writeframes(b"".join(voiced_frames))
-            
-            print(f"[VAD] Nettoyage terminé. Voix extraite de {file_path}")
-            return True
-        except Exception as e:
-            print(f"[VAD] Erreur lors du nettoyage : {e}")
-            return False
-
-    def process_audio(self, audio_file_path):
-        """ Detecte la langue et transcrit le fichier audio """
-        if not os.path.exists(audio_file_path):
-            print("error : Fichier introuvable")
-            return {"error": "Fichier introuvable"}
-        
+    def load(self, audio, sample_rate=None):
+        """ Ramène n'importe quelle entrée (chemin, bytes, NumPy, objet fichier) à un signal float32 16 kHz """
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                head = f.read(12)
+            if is_wav(head):
+                with open(audio, "rb") as f:
+                    return load_audio(f.read())
+            return decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        if hasattr(audio, "read"):
+            # Autres conteneurs (mp3, ogg...) : décodage PyAV en mémoire
+            return decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        return load_audio(audio, sample_rate)
+
+    def decode_options(self, profile=None, language=None):
+        """ Paramètres faster-whisper d'un profil ; `language` (langue de session) évite la détection """
+        profile = profile or self.default_profile
+        if profile not in DECODE_PROFILES:
+            raise ValueError(f"Profil de décodage inconnu: {profile} (attendu: {', '.join(DECODE_PROFILES)})")
+        options = dict(DECODE_PROFILES[profile])
+        detect = options.pop("detect_language")
+        options["language"] = language or (None if detect else self.default_language)
+        return options
+
+    def apply_vad(self, samples):
+        """ Signal réduit à la zone de parole, ou None si le clip ne contient pas de voix """
+        speech = self.vad.trim(samples)
+        if speech is None:
+            print(f"[VAD] Aucune voix détectée ({len(samples) / SAMPLE_RATE:.2f}s), décodage Whisper évité")
+        elif len(speech) < len(samples):
+            print(f"[VAD] Silence coupé: {len(samples) / SAMPLE_RATE:.2f}s -> {len(speech) / SAMPLE_RATE:.2f}s")
+        return speech
+
+    def empty_result(self, duration=0.0):
+        """ Résultat "pas de voix", même format que build_result (is_reliable=False) """
+        return self.build_result([], DecodeInfo(self.default_language, 0.0), duration)
+
+    def process_audio(self, audio, sample_rate=None, profile=None, language=None):
+        """
+        Detecte la langue et transcrit l'audio.
+        `audio` peut être un chemin de fichier, des bytes (WAV ou PCM int16 brut à `sample_rate`),
+        un tableau NumPy, ou un objet fichier binaire (autres conteneurs, décodés par faster-whisper).
+        Les clips sans voix sont rejetés par le VAD avant d'atteindre le modèle.
+        `profile` choisit le décodage (voir DECODE_PROFILES) ; `language` fixe la langue.
+        """
+        options = self.decode_options(profile, language)
+        if isinstance(audio, str):
+            if not os.path.exists(audio):
+                print("error : Fichier introuvable")
+                return {"error": "Fichier introuvable"}
+            print(f"[ASR] Début de transcription pour: {audio}")
+
         start_time = time.time()
-        print(f"[ASR] Début de transcription pour: {audio_file_path}")
+        try:
+            samples = self.load(audio, sample_rate)
+        except (AudioDecodeError, ValueError, OSError) as e:
+            print(f"[ASR] Décodage impossible: {e}")
+            return {"error": f"Audio invalide: {e}"}
+
+        speech = self.apply_vad(samples)
+        if speech is None:
+            return self.empty_result(time.time() - start_time)
+
+        print(f"[ASR] Début de transcription en mémoire ({len(speech) / SAMPLE_RATE:.2f}s)")
+        return self.transcribe(speech, **options)
 
-        segments_generator, info = self.model.transcribe(audio_file_path, beam_size=5)
+    def transcribe(self, audio, beam_size=5, **decode_options):
+        """ Transcrit un fichier ou un signal float32 16 kHz et renvoie le dict de résultat """
+        segments, info, duration = self.decode(audio, beam_size=beam_size, **decode_options)
+        return self.build_result(segments, info, duration)
 
+    def decode(self, audio, beam_size=5, **decode_options):
+        """ Appel brut au modèle : renvoie (segments, info, durée de calcul) """
+        start_time = time.time()
+        segments_generator, info = self.model.transcribe(audio, beam_size=beam_size, **decode_options)
         segments = list(segments_generator)
+        return segments, info, time.time() - start_time
+
+    def process_batch(self, audios, profile=None, language=None):
+        """
+        Transcrit plusieurs clips courts (float32 16 kHz, <= 30 s) en un seul passage
+        encodeur/décodeur CTranslate2. Renvoie un dict de résultat par clip, dans l'ordre.
+        Le résultat est celui de transcribe() ; les clips sans voix sont écartés par le VAD,
+        les clips trop longs, seuls dans leur lot ou que faster-whisper redécoderait
+        (voir _decode_batch) passent par transcribe().
+        """
+        options = self.decode_options(profile, language)
+        results = [None] * len(audios)
+        batch_idx = []
+        audios = [self.apply_vad(audio) for audio in audios]
+        for i, audio in enumerate(audios):
+            if audio is None:
+                results[i] = self.empty_result()
+            elif len(audio) > MAX_BATCH_CLIP_SECONDS * SAMPLE_RATE:
+                results[i] = self.transcribe(audio, **options)
+            else:
+                batch_idx.append(i)
+
+        if len(batch_idx) == 1:
+            i = batch_idx[0]
+            results[i] = self.transcribe(audios[i], **options)
+        elif batch_idx:
+            start_time = time.time()
+            decoded = self._decode_batch([audios[i] for i in batch_idx], options)
+            # Le temps de calcul est partagé : on l'impute à chaque clip du lot
+            duration = time.time() - start_time
+            for i, item in zip(batch_idx, decoded):
+                if item is None:
+                    results[i] = self.transcribe(audios[i], **options)
+                else:
+                    results[i] = self.build_result(*item, duration)
+
+        print(f"[ASR] Lot de {len(audios)} clips transcrit")
+        return results
+
+    def _decode_batch(self, audios, options):
+        """
+        Un encodage et un premier décodage CTranslate2 pour tout le lot ; le reste du
+        traitement (prompt, seuils, découpage en segments) est celui de faster-whisper,
+        rejoué clip par clip (voir _BatchedClip). Renvoie (segments, info) par clip, ou
+        None quand faster-whisper demanderait un autre décodage (température de repli,
+        fenêtre suivante) : ces clips sont redécodés seuls par transcribe().
+        """
+        clips = [_BatchedClip(self.model, audio, options) for audio in audios]
+        # Première passe : fenêtre à encoder (et requête de décodage si la langue est fixée)
+        decoded = [clip.run() for clip in clips]
+        batch = [i for i, clip in enumerate(clips) if clip.window is not None]
+        if not batch:
+            return decoded
+
+        windows = np.stack([clips[i].window for i in batch])
+        encoder_output = self.model.model.encode(get_ctranslate2_storage(windows))
+        if any(clips[i].request is None for i in batch):
+            # Détection de langue en lot, puis relevé des requêtes de décodage
+            for i, language_probs in zip(batch, self.model.model.detect_language(encoder_output)):
+                clips[i].language_probs = language_probs
+            for i in batch:
+                if clips[i].request is None:
+                    clips[i].run()
+
+        # generate() prend les options du premier clip : un clip dont la requête diffère est redécodé seul
+        kwargs = clips[batch[0]].request[1]
+        generated = self.model.model.generate(encoder_output, [clips[i].request[0] for i in batch], **kwargs)
+        for i, result in zip(batch, generated):
+            clips[i].result = result
+            try:
+                decoded[i] = clips[i].run() if clips[i].request[1] == kwargs else None
+            except _NeedsSingleDecode as e:
+                print(f"[ASR] Clip {i} du lot redécodé seul ({e})")
+                decoded[i] = None
+        return decoded
+
+    def build_result(self, segments, info, duration):
+        """ Calcule les métriques de confiance et construit la réponse de /v1/asr """
         full_text = ""
         avg_logprob = -99.0
         no_speech_prob = 1.0        
@@ -116,8 +338,6 @@ class ASRModule:
             print(f"[DEBUG ASR] Métriques: logprob={avg_logprob:.2f}, no_speech={no_speech_prob:.2f}")
         else:
             print("[DEBUG ASR] Aucun segment détecté (silence total ?)")
-        
-        duration = time.time() - start_time
 
         is_reliable = True
         if avg_logprob < self.logprob_threshold or no_speech_prob > self.nospeech_threshold:
@@ -0,0 +1,117 @@
+"""
+app/startup.py
+Chargement différé des composants lourds (modèles Whisper, pipelines spaCy, client LLM).
+
+Chaque composant est décrit par une fabrique. En mode "background" (défaut),
+tous les composants se chargent en parallèle dans des threads dès le démarrage
+du serveur ; en mode "lazy", un composant ne se charge qu'à sa première
+utilisation. Dans les deux cas, une requête qui a besoin d'un composant pas
+encore prêt reçoit immédiatement ComponentNotReady (HTTP 503) au lieu d'attendre.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class ComponentNotReady(Exception):
+    def __init__(self, name: str, state: str, error: str = None):
+        self.name = name
+        self.state = state
+        self.error = error
+        detail = f"Composant '{name}' indisponible ({state})"
+        if error:
+            detail += f": {error}"
+        super().__init__(detail)
+
+
+class LazyComponent:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.state = PENDING
+        self.error = None
+        self.load_time = None
+        self._value = None
+        self._lock = threading.Lock()
+
+    def load(self) -> None:
+        """ Charge le composant (bloquant) ; sans effet s'il est déjà chargé ou en cours """
+        with self._lock:
+            if self.state in (LOADING, READY):
+                return
+            self.state = LOADING
+            self.error = None
+
+        print(f"[STARTUP] Chargement de '{self.name}'...")
+        start = time.time()
+        try:
+            value = self.factory()
+        except Exception as e:
+            print(f"[STARTUP] Échec du chargement de '{self.name}': {e}")
+            with self._lock:
+                self.state = FAILED
+                self.error = str(e)
+            return
+
+        with self._lock:
+            self._value = value
+            self.load_time = time.time() - start
+            self.state = READY
+        print(f"[STARTUP] '{self.name}' prêt en {self.load_time:.2f}s")
+
+    def load_in_background(self) -> None:
+        if self.state in (PENDING, FAILED):
+            threading.Thread(target=self.load, name=f"load-{self.name}", daemon=True).start()
+
+    def get(self) -> Any:
+        if self.state == READY:
+            return self._value
+        # Première utilisation (mode lazy) ou nouvel essai après un échec : chargement en tâche de fond
+        self.load_in_background()
+        raise ComponentNotReady(self.name, self.state, self.error)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "load_time": round(self.load_time, 2) if self.load_time is not None else None,
+            "error": self.error,
+        }
+
+
+class ComponentRegistry:
+    def __init__(self, mode: str = "background"):
+        if mode not in ("background", "lazy"):
+            raise ValueError(f"Mode de démarrage inconnu: {mode} (attendu: background ou lazy)")
+        self.mode = mode
+        self._components: Dict[str, LazyComponent] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]) -> LazyComponent:
+        component = LazyComponent(name, factory)
+        self._components[name] = component
+        return component
+
+    def start(self) -> None:
+        """ À appeler au démarrage du serveur : lance les chargements en mode background """
+        if self.mode == "background":
+            for component in self._components.values():
+                component.load_in_background()
+
+    def get(self, name: str) -> Any:
+        return self._components[name].get()
+
+    def get_if_ready(self, name: str) -> Any:
+        """ Le composant s'il est déjà chargé, sinon None (sans déclencher de chargement) """
+        component = self._components[name]
+        return component._value if component.state == READY else None
+
+    def is_ready(self) -> bool:
+        return all(c.state == READY for c in self._components.values())
+
+    def readiness(self) -> Dict[str, Any]:
+        return {
+            "ready": self.is_ready(),
+            "mode": self.mode,
+            "components": {name: c.status() for name, c in self._components.items()},
+        }
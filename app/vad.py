@@ -0,0 +1,113 @@
+"""
+app/vad.py
+Détection d'activité vocale (VAD) sur un signal float32 16 kHz en mémoire.
+
+1. Énergie par trame (NumPy, vectorisé) avec un seuil qui s'adapte au bruit de
+   fond du clip : rejette le silence et le bruit stationnaire sans aucun modèle.
+2. Optionnel : un modèle confirme les trames retenues, soit webrtcvad (si installé),
+   soit Silero VAD (fourni avec faster-whisper, via onnxruntime).
+
+Le résultat sert à couper le silence en début et fin de clip, et à ne pas
+lancer Whisper du tout quand il n'y a pas de voix.
+"""
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE
+
+try:
+    import webrtcvad
+except ImportError:  # dépendance optionnelle
+    webrtcvad = None
+
+VAD_MODELS = ("off", "energy", "webrtc", "silero")
+
+
+class VoiceActivityDetector:
+    def __init__(self, model="energy", frame_ms=30, energy_floor_db=-45.0, noise_margin_db=8.0,
+                 min_speech_ms=200, padding_ms=250, webrtc_aggressiveness=2, sample_rate=SAMPLE_RATE):
+        if model not in VAD_MODELS:
+            raise ValueError(f"Modèle VAD inconnu: {model} (attendu: {', '.join(VAD_MODELS)})")
+        if model == "webrtc" and webrtcvad is None:
+            print("[VAD] webrtcvad non installé, repli sur le seuil d'énergie seul")
+            model = "energy"
+
+        self.model = model
+        self.sample_rate = sample_rate
+        self.frame_size = int(sample_rate * frame_ms / 1000)
+        self.energy_floor_db = energy_floor_db  # en dessous : silence, quel que soit le clip
+        self.noise_margin_db = noise_margin_db  # marge au-dessus du bruit de fond estimé
+        self.min_speech_frames = max(1, int(min_speech_ms / frame_ms))
+        self.padding = int(sample_rate * padding_ms / 1000)
+
+        self._webrtc = webrtcvad.Vad(webrtc_aggressiveness) if model == "webrtc" else None
+
+    @property
+    def enabled(self) -> bool:
+        return self.model != "off"
+
+    def frame_energy_db(self, audio: np.ndarray) -> np.ndarray:
+        """ Énergie RMS (dBFS) de chaque trame complète """
+        n_frames = len(audio) // self.frame_size
+        if n_frames == 0:
+            return np.zeros(0, dtype=np.float32)
+        frames = audio[:n_frames * self.frame_size].reshape(n_frames, self.frame_size)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        return 20.0 * np.log10(rms + 1e-10)
+
+    def speech_mask(self, audio: np.ndarray) -> np.ndarray:
+        """ Booléen par trame : True si la trame contient (probablement) de la voix """
+        energy = self.frame_energy_db(audio)
+        if len(energy) == 0:
+            return np.zeros(0, dtype=bool)
+
+        # Le 10e percentile approxime le bruit de fond du clip
+        noise_floor = np.percentile(energy, 10)
+        threshold = max(self.energy_floor_db, noise_floor + self.noise_margin_db)
+        mask = energy > threshold
+
+        if mask.any() and self.model == "webrtc":
+            mask &= self._webrtc_mask(audio, mask)
+        elif mask.any() and self.model == "silero":
+            mask &= self._silero_mask(audio, len(mask))
+        return mask
+
+    def detect(self, audio: np.ndarray):
+        """ Bornes (début, fin) en échantillons de la zone de parole, ou None si aucune voix """
+        if not self.enabled:
+            return 0, len(audio)
+
+        mask = self.speech_mask(audio)
+        if mask.sum() < self.min_speech_frames:
+            return None
+
+        voiced = np.flatnonzero(mask)
+        start = max(0, int(voiced[0]) * self.frame_size - self.padding)
+        end = min(len(audio), (int(voiced[-1]) + 1) * self.frame_size + self.padding)
+        return start, end
+
+    def trim(self, audio: np.ndarray):
+        """ Signal sans silence de début/fin, ou None si le clip ne contient pas de voix """
+        bounds = self.detect(audio)
+        if bounds is None:
+            return None
+        return audio[bounds[0]:bounds[1]]
+
+    def _webrtc_mask(self, audio: np.ndarray, candidates: np.ndarray) -> np.ndarray:
+        pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2")
+        confirmed = np.zeros(len(candidates), dtype=bool)
+        # webrtcvad n'est appelé que sur les trames déjà retenues par l'énergie
+        for i in np.flatnonzero(candidates):
+            frame = pcm[i * self.frame_size:(i + 1) * self.frame_size].tobytes()
+            confirmed[i] = self._webrtc.is_speech(frame, self.sample_rate)
+        return confirmed
+
+    def _silero_mask(self, audio: np.ndarray, n_frames: int) -> np.ndarray:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps
+
+        chunks = get_speech_timestamps(audio, VadOptions(min_silence_duration_ms=300, speech_pad_ms=0))
+        confirmed = np.zeros(n_frames, dtype=bool)
+        for chunk in chunks:
+            first = chunk["start"] // self.frame_size
+            last = -(-chunk["end"] // self.frame_size)  # arrondi supérieur
+            confirmed[first:last] = True
+        return confirmed
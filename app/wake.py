@@ -0,0 +1,113 @@
+"""
+app/wake.py
+Détection des mots de réveil ("pepper", "bonjour") pour la veille du robot.
+
+Beaucoup moins coûteux que /v1/asr : VAD d'abord (la plupart des clips de veille
+ne sont que du bruit), puis un Whisper "tiny" en décodage greedy, langue fixée,
+sans timestamps, limité à quelques tokens et orienté par un prompt contenant les
+mots attendus. Le texte obtenu est comparé aux mots de réveil avec une
+tolérance orthographique ("peppeur", "bonjours"...).
+"""
+import difflib
+import re
+import time
+import unicodedata
+
+from faster_whisper import WhisperModel
+from faster_whisper.audio import decode_audio
+
+from app.audio_utils import SAMPLE_RATE, load_audio
+from app.vad import VoiceActivityDetector
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text).strip()
+
+
+class WakeWordDetector:
+    def __init__(self, wake_words=("pepper", "bonjour"), model_size="tiny", language="fr",
+                 threshold=0.7, cpu_threads=1, vad="energy", max_new_tokens=16):
+        print(f"[WAKE] Chargement du modèle Whisper ({model_size}) pour la veille...")
+        self.model = WhisperModel(model_size, device="cpu", compute_type="int8", cpu_threads=cpu_threads)
+        self.vad = VoiceActivityDetector(model=vad)
+
+        self.wake_words = [_normalize(w) for w in wake_words]
+        self.language = language
+        self.threshold = threshold
+        self.max_new_tokens = max_new_tokens
+        # Le prompt oriente le petit modèle vers l'orthographe attendue des mots de réveil
+        self.prompt = ", ".join(w.capitalize() for w in wake_words) + "."
+
+    def detect(self, audio, sample_rate=None):
+        """ Renvoie {detected, score, keyword, text, processing_time} """
+        start_time = time.time()
+        text, no_speech_prob = self.transcribe(self.load(audio, sample_rate))
+        detected, score, keyword = self.score(text, no_speech_prob)
+        return self.build_result(detected, score, keyword, text, start_time)
+
+    def load(self, audio, sample_rate=None):
+        """ Signal float32 16 kHz depuis un chemin, un fichier ouvert ou des octets WAV/PCM """
+        if isinstance(audio, str):
+            with open(audio, "rb") as f:
+                audio = f.read()
+        if hasattr(audio, "read"):
+            return decode_audio(audio, sampling_rate=SAMPLE_RATE)
+        return load_audio(audio, sample_rate)
+
+    def transcribe(self, samples):
+        """ (texte, no_speech_prob) d'un clip ; ("", 1.0) sans décodage si le VAD n'y trouve pas de voix """
+        speech = self.vad.trim(samples)
+        if speech is None:
+            return "", 1.0
+
+        segments, _ = self.model.transcribe(
+            speech,
+            language=self.language,
+            beam_size=1,
+            best_of=1,
+            temperature=0.0,
+            without_timestamps=True,
+            condition_on_previous_text=False,
+            initial_prompt=self.prompt,
+            max_new_tokens=self.max_new_tokens,
+        )
+        segments = list(segments)
+        if not segments:
+            return "", 1.0
+        text = " ".join(s.text for s in segments).strip()
+        return text, sum(s.no_speech_prob for s in segments) / len(segments)
+
+    def score(self, text, no_speech_prob):
+        """ (détecté, score, mot de réveil) pour un texte transcrit """
+        if not text:
+            return False, 0.0, None
+        keyword, similarity = self.match(text)
+        score = similarity * (1.0 - no_speech_prob)
+
+        detected = score >= self.threshold
+        if detected:
+            print(f"[WAKE] '{keyword}' détecté dans '{text}' (score={score:.2f})")
+        return detected, score, keyword
+
+    def match(self, text):
+        """ Meilleur mot de réveil trouvé dans le texte et sa similarité (0 à 1) """
+        words = _normalize(text).split()
+        best_keyword, best_score = None, 0.0
+        for keyword in self.wake_words:
+            for word in words:
+                score = difflib.SequenceMatcher(None, keyword, word).ratio()
+                if score > best_score:
+                    best_keyword, best_score = keyword, score
+        return best_keyword, best_score
+
+    def build_result(self, detected, score, keyword, text, start_time):
+        return {
+            "detected": detected,
+            "score": round(score, 2),
+            "keyword": keyword if detected else None,
+            "text": text,
+            "language": self.language,
+            "processing_time": round(time.time() - start_time, 3),
+        }
@@ -6,9 +6,9 @@ Envoie la transcription au serveur FastAPI et récupère la réponse du DialogMa
 
 import threading
 import Queue
-import collections
 import time
 import os
+import uuid
 
 
 from network_client import NetworkClient
@@ -45,9 +45,11 @@ class PepperOrchestrator:
         self.last_interaction = 0
 
         self.audio_queue = Queue.Queue()
-        self.buffer_size = 2
-        self.buffer_files = collections.deque(maxlen=self.buffer_size)
         self.is_running = True
+
+        # Veille : le serveur garde la fenêtre glissante de ce flux, on n'envoie chaque chunk qu'une fois
+        self.wake_stream_id = "pepper-{0}".format(uuid.uuid4().hex[:8])
+        self.wake_seq = 0
     
     def clear_audio_files(self):
         count = 0
@@ -109,7 +111,7 @@ class PepperOrchestrator:
                 conv_file = "conversation_input.wav"
                 if self.audio.record_until_silence(conv_file, 400, 3, 10):
                     print(u"[INFO] Silence détecté.".encode('utf-8'))
-                    result_asr = self.net.send_asr_file(conv_file)
+                    result_asr = self.net.send_asr_file(conv_file, session_id=self.session_id)
                     
                     if result_asr:
                         text = result_asr.get("text", "")
@@ -134,17 +136,18 @@ class PepperOrchestrator:
                 # MODE VEILLE
                 try:
                     new_chunk = self.audio_queue.get(timeout=1)
-                    self.buffer_files.append(new_chunk)
-
-                    if len(self.buffer_files) == self.buffer_size:
-                        merged = self.audio.merge_wavs(list(self.buffer_files), "analysis_buffer.wav")
-                        if merged and not self.audio.is_silent(merged):
-                            result_asr = self.net.send_asr_file(merged)
-                            if result_asr and self.contains_wake_words(result_asr.get("text", "")):
-                                print(u"===> [LOG] Réveil détecté !".encode('utf-8'))
-                                self.is_engaged = True
-                                self.last_interaction = time.time()
-                                self.handle_dialog(result_asr.get("text"), lang=result_asr.get("language", "fr"))
+                    self.wake_seq += 1
+
+                    # Un chunk silencieux n'est pas envoyé : le trou dans seq réinitialise la fenêtre côté serveur
+                    if not self.audio.is_silent(new_chunk):
+                        result_wake = self.net.send_wake_file(new_chunk, stream_id=self.wake_stream_id,
+                                                              seq=self.wake_seq)
+                        if result_wake and result_wake.get("detected"):
+                            print(u"===> [LOG] Réveil détecté ! ({0}, score {1})".format(
+                                result_wake.get("keyword"), result_wake.get("score")).encode('utf-8'))
+                            self.is_engaged = True
+                            self.last_interaction = time.time()
+                            self.handle_dialog(result_wake.get("text"), lang=result_wake.get("language", "fr"))
                     
                     self.audio_queue.task_done()
                 except Queue.Empty:
@@ -158,20 +161,19 @@ class PepperOrchestrator:
         else:
             msg_for_llm = text
 
-        response = self.net.send_dialog_text(msg_for_llm, session_id=self.session_id, lang=lang)
-        if response:
-            self.session_id = response.get("session_id")
-            print("Robot: " + response["text"].encode('utf-8'))
-            # self.robot.say(response["text"]) # Activer plus tard
+        # Réponse en flux : chaque phrase est dite dès qu'elle arrive, sans attendre la fin de la génération
+        response = None
+        for event in self.net.stream_dialog_text(msg_for_llm, session_id=self.session_id, lang=lang):
+            if event.get("type") == "sentence":
+                print("Robot: " + event["text"].encode('utf-8'))
+                # self.robot.say(event["text"]) # Activer plus tard
+            elif event.get("type") == "end":
+                response = event
 
         if response:
             self.session_id = response.get("session_id")
-            print("Robot: " + response["text"].encode('utf-8'))
-            
-            # self.robot.say(response["text"])
 
             # Nettoyage
-            self.buffer_files.clear()
             while not self.audio_queue.empty():
                 try: self.audio_queue.get_nowait()
                 except: pass
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import requests
+import json
 import os
 
 class NetworkClient:
@@ -7,20 +8,65 @@ class NetworkClient:
         self.server = server_url
         self.timeout = timeout
 
-    def send_asr_file(self, file_path):
-        """ Envoie le fichier WAV au serveur ASR """
+    def send_asr_file(self, file_path, session_id=None, profile=None):
+        """ Envoie le fichier WAV au serveur ASR (la session mémorise profil et langue) """
         print(u' Envoi du fichier au serveur ASR...').encode('utf-8')
         url = "{0}/v1/asr".format(self.server)
+        params = {}
+        if session_id:
+            params["session_id"] = session_id
+        if profile:
+            params["profile"] = profile
         try:
             with open(file_path, 'rb') as f:
                 files = {'file': (os.path.basename(file_path), f, 'audio/wav')}
-                r = requests.post(url, files=files, timeout=self.timeout)
+                r = requests.post(url, files=files, params=params, timeout=self.timeout)
             r.raise_for_status()
             return r.json()
         except Exception as e:
             print(u" Erreur ASR: {0}".format(str(e)).encode('utf-8'))
             return None
 
+    def send_wake_file(self, file_path, stream_id=None, seq=None):
+        """
+        Envoie un chunk de veille au détecteur de mots de réveil (plus léger que /v1/asr).
+        Avec stream_id, le serveur garde la fenêtre glissante : chaque chunk n'est envoyé qu'une fois.
+        """
+        url = "{0}/v1/wake".format(self.server)
+        params = {}
+        if stream_id:
+            params["stream_id"] = stream_id
+            if seq is not None:
+                params["seq"] = seq
+        try:
+            with open(file_path, 'rb') as f:
+                files = {'file': (os.path.basename(file_path), f, 'audio/wav')}
+                r = requests.post(url, files=files, params=params, timeout=self.timeout)
+            r.raise_for_status()
+            return r.json()
+        except Exception as e:
+            print(u" Erreur WAKE: {0}".format(str(e)).encode('utf-8'))
+            return None
+
+    def stream_dialog_text(self, text, session_id=None, lang="fr"):
+        """
+        Comme send_dialog_text, mais via /v1/respond/stream : génère les événements
+        {"type": "sentence", ...} au fil de la génération, puis {"type": "end", ...}.
+        """
+        url = "{0}/v1/respond/stream".format(self.server)
+        payload = {"text": text, "lang": lang}
+        if session_id:
+            payload["session_id"] = session_id
+
+        try:
+            r = requests.post(url, json=payload, timeout=self.timeout, stream=True)
+            r.raise_for_status()
+            for line in r.iter_lines():
+                if line:
+                    yield json.loads(line.decode('utf-8'))
+        except Exception as e:
+            print("Erreur Dialog: {0}".format(str(e)))
+
     def send_dialog_text(self, text, session_id=None, lang="fr"):
         """ Envoie le texte reconnu au DialogManager """
         url = "{0}/v1/respond".format(self.server)
@@ -29,7 +29,8 @@ tests = [
     "peux-tu me raconter une blague",
 ]
 
-for t in tests:
+# une seule passe nlp.pipe pour toute la liste (mêmes résultats que nlu.parse(t) un par un)
+for t, result in zip(tests, nlu.parse_batch(tests)):
     print("=" * 50)
     print(t)
-    print(nlu.parse(t))
+    print(result)
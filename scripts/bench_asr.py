@@ -0,0 +1,325 @@
+"""
+scripts/bench_asr.py
+Banc de mesure ASR : facteur temps réel (RTF), latences p50/p95 et RSS par étape.
+
+Corpus : les WAV enregistrés (--corpus) et des clips synthétiques de durées et de
+rapports signal/bruit variés, construits à partir du premier enregistrement (ou d'un
+signal voisé artificiel à défaut), plus un clip de bruit seul pour le VAD.
+
+Balayage : toutes les combinaisons de --models, --compute-types, --beam-sizes,
+--cpu-threads et --vad. Chaque configuration tourne dans un processus séparé pour
+que le pic de RSS mesuré soit le sien. Par étape, la RSS courante est relevée avant
+et après chaque clip : RSS maximale après l'étape et plus forte hausse pendant
+l'étape (le pic ru_maxrss, cumulatif, n'est donné que pour toute la configuration).
+Étapes mesurées par clip :
+    decode      WAV -> float32 16 kHz (audio_utils.load_audio)
+    vad         ASRModule.apply_vad
+    transcribe  décodage Whisper du signal retenu par le VAD (RTF rapporté à sa durée)
+
+Exemples :
+    python -m scripts.bench_asr --models tiny,small --beam-sizes 1,5 --output bench.json
+    python -m scripts.bench_asr --models small --compare bench.json --threshold 0.1
+"""
+import argparse
+import contextlib
+import glob
+import io
+import itertools
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import numpy as np
+
+from app.audio_utils import SAMPLE_RATE, load_audio
+from app.metrics import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS = [os.path.join(ROOT, "client", "*.wav"), os.path.join(ROOT, "app", "Audio_tests", "*.wav")]
+STAGES = ("decode", "vad", "transcribe")
+
+
+def _csv(cast=str):
+    return lambda value: [cast(v) for v in value.split(",") if v.strip()]
+
+
+def peak_rss_mb() -> float:
+    """ Pic de mémoire résidente du processus depuis son démarrage (ru_maxrss : Ko sous Linux, octets sous macOS) """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb():
+    """ Mémoire résidente actuelle (/proc/self/statm, sinon psutil) ; None si indisponible """
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+class _StageRSS:
+    """ RSS maximale après une étape et plus forte hausse pendant celle-ci """
+
+    def __init__(self):
+        self.after = None
+        self.growth = None
+
+    def record(self, before, after):
+        if before is None or after is None:
+            return
+        self.after = after if self.after is None else max(self.after, after)
+        self.growth = after - before if self.growth is None else max(self.growth, after - before)
+
+    def summary(self):
+        return {"rss_mb": None if self.after is None else round(self.after, 1),
+                "rss_growth_mb": None if self.growth is None else round(self.growth, 1)}
+
+
+def to_wav_bytes(samples: np.ndarray) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(pcm.tobytes())
+    return buffer.getvalue()
+
+
+def synthetic_voice(seconds: float, seed: int = 0) -> np.ndarray:
+    """ Signal voisé artificiel : harmoniques d'un fondamental qui varie, modulé au rythme des syllabes """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    voice = sum(np.sin(k * phase) / k for k in range(1, 8))
+    syllables = np.clip(np.sin(2 * np.pi * 4.0 * t + rng.uniform(0, np.pi)), 0, None)
+    return (0.3 * voice * syllables / np.max(np.abs(voice))).astype(np.float32)
+
+
+def add_noise(samples: np.ndarray, snr_db, seed: int = 0) -> np.ndarray:
+    if snr_db is None:
+        return samples
+    rng = np.random.default_rng(seed)
+    power = np.mean(np.square(samples)) or 1e-8
+    noise = rng.normal(0.0, np.sqrt(power / 10 ** (snr_db / 10)), len(samples))
+    return np.clip(samples + noise, -1.0, 1.0).astype(np.float32)
+
+
+def build_corpus(patterns, lengths, snrs):
+    """ Liste de {name, kind, duration, snr_db, wav} ; `wav` : octets WAV 16 kHz mono """
+    corpus = []
+    recorded = sorted({path for pattern in patterns for path in glob.glob(pattern)})
+    for path in recorded:
+        with open(path, "rb") as f:
+            samples = load_audio(f.read())
+        corpus.append({"name": os.path.relpath(path, ROOT), "kind": "recorded", "samples": samples, "snr_db": None})
+
+    base = corpus[0]["samples"] if corpus else synthetic_voice(max(lengths))
+    for seconds, snr in itertools.product(lengths, snrs):
+        n = int(seconds * SAMPLE_RATE)
+        clip = np.resize(base, n)  # répète l'enregistrement pour atteindre la durée voulue
+        label = "clean" if snr is None else f"{snr:g}dB"
+        corpus.append({"name": f"synthetic_{seconds:g}s_{label}", "kind": "synthetic",
+                       "samples": add_noise(clip, snr, seed=n), "snr_db": snr})
+    corpus.append({"name": "noise_only_5s", "kind": "noise",
+                   "samples": add_noise(np.zeros(5 * SAMPLE_RATE, dtype=np.float32) + 1e-3, 0.0), "snr_db": None})
+
+    for clip in corpus:
+        clip["duration"] = round(len(clip["samples"]) / SAMPLE_RATE, 2)
+        clip["wav"] = to_wav_bytes(clip.pop("samples"))
+    return corpus
+
+
+def run_config(config, corpus, repeat, warmup):
+    """ Exécuté dans un processus dédié : charge le modèle puis mesure chaque étape sur le corpus """
+    # Les traces de chargement ne doivent pas se mêler au JSON écrit sur stdout
+    with contextlib.redirect_stdout(sys.stderr):
+        return _measure(config, corpus, repeat, warmup)
+
+
+def _measure(config, corpus, repeat, warmup):
+    from app.speech import ASRModule
+
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    asr = ASRModule(model_size=config["model"], compute_type=config["compute_type"],
+                    cpu_threads=config["cpu_threads"], vad=config["vad"])
+    load_time = time.perf_counter() - start
+    rss_loaded = peak_rss_mb()
+
+    times = {stage: [] for stage in STAGES}
+    audio_seconds = {stage: 0.0 for stage in STAGES}
+    rss = {stage: _StageRSS() for stage in STAGES}
+    for iteration in range(warmup + repeat):
+        measured = iteration >= warmup
+        for clip in corpus:
+            m0 = current_rss_mb()
+            t0 = time.perf_counter()
+            samples = load_audio(clip["wav"])
+            t1 = time.perf_counter()
+            m1 = current_rss_mb()
+            speech = asr.apply_vad(samples)
+            t2 = time.perf_counter()
+            m2 = current_rss_mb()
+            if measured:
+                times["decode"].append(t1 - t0)
+                times["vad"].append(t2 - t1)
+                audio_seconds["decode"] += clip["duration"]
+                audio_seconds["vad"] += clip["duration"]
+                rss["decode"].record(m0, m1)
+                rss["vad"].record(m1, m2)
+            if speech is None:
+                continue
+
+            t3 = time.perf_counter()
+            asr.decode(speech, beam_size=config["beam_size"])
+            if measured:
+                times["transcribe"].append(time.perf_counter() - t3)
+                audio_seconds["transcribe"] += len(speech) / SAMPLE_RATE
+                rss["transcribe"].record(m2, current_rss_mb())
+
+    stages = {}
+    for stage in STAGES:
+        total = sum(times[stage])
+        stages[stage] = {
+            "rtf": round(total / audio_seconds[stage], 4) if audio_seconds[stage] else None,
+            "audio_s": round(audio_seconds[stage], 2),
+            "latency_ms": summarize(times[stage], scale=1000.0),
+            **rss[stage].summary(),
+        }
+    return {
+        "config": config,
+        "load_time_s": round(load_time, 2),
+        "rss_mb": {"before_load": rss_before, "after_load": rss_loaded, "peak": peak_rss_mb()},
+        "stages": stages,
+    }
+
+
+def config_key(config) -> str:
+    return "{model}/{compute_type}/beam{beam_size}/threads{cpu_threads}/vad-{vad}".format(**config)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline, threshold):
+    """ Affiche l'écart de RTF et de p95 par configuration et par étape ; renvoie les régressions """
+    previous = {config_key(r["config"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\nComparaison avec {baseline['meta'].get('commit') or 'la référence'} (seuil {threshold:.0%})")
+    for result in report["results"]:
+        key = config_key(result["config"])
+        old = previous.get(key)
+        if old is None:
+            print(f"  {key}: absente de la référence")
+            continue
+        for stage in STAGES:
+            new_s, old_s = result["stages"][stage], old["stages"][stage]
+            if not new_s["rtf"] or not old_s["rtf"]:
+                continue
+            delta_rtf = new_s["rtf"] / old_s["rtf"] - 1.0
+            old_p95, new_p95 = old_s["latency_ms"]["p95"], new_s["latency_ms"]["p95"]
+            delta_p95 = new_p95 / old_p95 - 1.0 if old_p95 else 0.0
+            flag = ""
+            if delta_rtf > threshold or delta_p95 > threshold:
+                flag = "  <-- régression"
+                regressions.append({"config": key, "stage": stage, "rtf": delta_rtf, "p95": delta_p95})
+            print(f"  {key:45s} {stage:10s} RTF {old_s['rtf']:.4f} -> {new_s['rtf']:.4f} ({delta_rtf:+.1%})"
+                  f"  p95 {old_p95:.1f} -> {new_p95:.1f} ms ({delta_p95:+.1%}){flag}")
+    return regressions
+
+
+def print_summary(report):
+    for result in report["results"]:
+        print(f"\n{config_key(result['config'])}  (chargement {result['load_time_s']} s,"
+              f" RSS pic cumulé {result['rss_mb']['peak']} Mo)")
+        for stage, s in result["stages"].items():
+            rtf = f"{s['rtf']:.4f}" if s["rtf"] is not None else "-"
+            lat = s["latency_ms"]
+            growth = f"{s['rss_growth_mb']:+.1f}" if s["rss_growth_mb"] is not None else "-"
+            print(f"  {stage:10s} RTF {rtf:>8s}  p50 {lat['p50']:8.1f} ms  p95 {lat['p95']:8.1f} ms"
+                  f"  RSS {s['rss_mb']} Mo (hausse max {growth} Mo)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure ASR (RTF, latences, mémoire)")
+    parser.add_argument("--corpus", type=_csv(), default=DEFAULT_CORPUS, help="motifs glob de WAV enregistrés")
+    parser.add_argument("--lengths", type=_csv(float), default=[2.0, 5.0, 15.0], help="durées synthétiques (s)")
+    parser.add_argument("--snrs", type=_csv(lambda v: None if v == "clean" else float(v)),
+                        default=[None, 20.0, 5.0], help="SNR synthétiques en dB ('clean' sans bruit)")
+    parser.add_argument("--models", type=_csv(), default=["tiny", "small"])
+    parser.add_argument("--compute-types", type=_csv(), default=["int8"])
+    parser.add_argument("--beam-sizes", type=_csv(int), default=[1, 5])
+    parser.add_argument("--cpu-threads", type=_csv(int), default=[0])
+    parser.add_argument("--vad", type=_csv(), default=["energy", "off"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", help="fichier JSON du rapport (stdout si absent)")
+    parser.add_argument("--compare", help="rapport JSON de référence (autre commit)")
+    parser.add_argument("--threshold", type=float, default=0.10, help="régression tolérée (0.10 = +10 %%)")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.corpus, args.lengths, args.snrs)
+    print(f"[BENCH] {len(corpus)} clips, {sum(c['duration'] for c in corpus):.1f} s d'audio", file=sys.stderr)
+
+    configs = [dict(zip(("model", "compute_type", "beam_size", "cpu_threads", "vad"), values))
+               for values in itertools.product(args.models, args.compute_types, args.beam_sizes,
+                                               args.cpu_threads, args.vad)]
+    results = []
+    for config in configs:
+        print(f"[BENCH] {config_key(config)}...", file=sys.stderr)
+        # Un processus neuf par configuration : pic de RSS et caches CTranslate2 indépendants
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            results.append(executor.submit(run_config, config, corpus, args.repeat, args.warmup).result())
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": args.repeat,
+            "warmup": args.warmup,
+        },
+        "corpus": [{k: v for k, v in clip.items() if k != "wav"} for clip in corpus],
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print_summary(report)
+    else:
+        print(payload)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
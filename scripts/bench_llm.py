@@ -0,0 +1,306 @@
+"""
+scripts/bench_llm.py
+Banc de mesure LLM : temps jusqu'au premier token (TTFT), tokens/s, temps d'évaluation
+du prompt, latences p50/p95 et mémoire du modèle, par backend, modèle et concurrence.
+
+Chaque cible est une config LLMClient (--configs) et éventuellement un modèle qui
+remplace le sien (--models, ex. les modèles créés depuis ollama_models/). Les
+conversations françaises multi-tours de CONVERSATIONS (ou --conversations, un JSON
+[[tour, ...], ...]) sont rejouées en streaming : à chaque tour la réponse du modèle
+est ajoutée à l'historique, comme dans DialogManager. Pour chaque niveau de
+--concurrency, N conversations tournent en parallèle (une session chacune).
+
+Par tour : TTFT (premier fragment de texte reçu), latence totale, et depuis les
+compteurs du serveur quand il les fournit (Ollama /api/chat, llama.cpp "timings") :
+tokens du prompt, temps d'évaluation du prompt et tokens/s de génération ; à défaut
+les tokens/s sont estimés à un fragment = un token ("tokens_source": "deltas").
+Mémoire : taille totale et part en VRAM du modèle d'après /api/ps d'Ollama
+(comme LLMManager.check_gpu_usage).
+
+Exemples :
+    python -m scripts.bench_llm --configs configs/llm_ollama_config.json \\
+        --models PhiPepper,LLamaPepper,pepper-pro --concurrency 1,2,4 --output bench_llm.json
+    python -m scripts.bench_llm --configs configs/llm_ollama_config.json,configs/llm_config.json
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.dialog_manager import DEFAULT_SYSTEM_PROMPT
+from app.http_transport import TransportError
+from app.llm import LLMClient, LLMError
+from app.metrics import summarize
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONVERSATIONS = [
+    [
+        "Bonjour !",
+        "Quels sont vos horaires le weekend ?",
+        "Et est-ce que la piscine est ouverte le dimanche matin ?",
+        "D'accord, merci beaucoup.",
+    ],
+    [
+        "Bonjour, je voudrais réserver un cours de yoga.",
+        "Samedi à 10h si possible.",
+        "C'est pour deux personnes, moi et ma fille de douze ans.",
+        "Il faut apporter un tapis ?",
+    ],
+    [
+        "Où se trouvent les vestiaires des femmes ?",
+        "Et la salle de musculation, c'est à quel étage ?",
+        "Est-ce qu'il y a un ascenseur ? Je suis avec une poussette.",
+    ],
+    [
+        "Qu'est-ce que vous proposez comme activités pour les enfants ?",
+        "Combien coûte l'inscription au basket pour l'année ?",
+        "Il y a des réductions pour les familles nombreuses ?",
+        "Comment je fais pour m'inscrire ?",
+        "Très bien, je reviendrai avec les papiers. Au revoir !",
+    ],
+]
+
+
+def _csv(cast=str):
+    return lambda value: [cast(v) for v in value.split(",") if v.strip()]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_client(config_path, model=None):
+    client = LLMClient(config_path)
+    if model:
+        client.model = model
+    with open(config_path, "r", encoding="utf-8") as f:
+        system_prompt = json.load(f).get("system_prompt", DEFAULT_SYSTEM_PROMPT)
+    return client, system_prompt
+
+
+def server_counters(event):
+    """ Compteurs de fin de réponse : Ollama ("done": true) ou llama.cpp ("timings") """
+    if event.get("done") and "eval_count" in event:
+        return {
+            "prompt_tokens": event.get("prompt_eval_count"),
+            "prompt_eval_ms": event.get("prompt_eval_duration", 0) / 1e6,
+            "completion_tokens": event.get("eval_count"),
+            "eval_s": event.get("eval_duration", 0) / 1e9,
+        }
+    timings = event.get("timings")
+    if timings:
+        return {
+            "prompt_tokens": timings.get("prompt_n"),
+            "prompt_eval_ms": timings.get("prompt_ms"),
+            "completion_tokens": timings.get("predicted_n"),
+            "eval_s": timings.get("predicted_ms", 0) / 1000.0,
+        }
+    return {}
+
+
+def timed_turn(client, system_prompt, history, session_id):
+    """ Un tour en streaming ; renvoie (texte de la réponse, mesures) """
+    counters, parts = {}, []
+    start = time.perf_counter()
+    first = None
+    for event in client.stream_events(system_prompt, history, session_id=session_id):
+        delta = client.delta(event)
+        if delta:
+            if first is None:
+                first = time.perf_counter()
+            parts.append(delta)
+        counters.update(server_counters(event))
+    end = time.perf_counter()
+    if first is None:
+        raise LLMError("empty response")
+
+    sample = {"ttft_s": first - start, "latency_s": end - start,
+              "prompt_tokens": counters.get("prompt_tokens"), "prompt_eval_ms": counters.get("prompt_eval_ms")}
+    if counters.get("completion_tokens") and counters.get("eval_s"):
+        sample["tokens_per_s"] = counters["completion_tokens"] / counters["eval_s"]
+        sample["completion_tokens"] = counters["completion_tokens"]
+        sample["tokens_source"] = "server"
+    else:
+        sample["completion_tokens"] = len(parts)
+        sample["tokens_per_s"] = len(parts) / (end - first) if end > first else None
+        sample["tokens_source"] = "deltas"
+    return "".join(parts).strip(), sample
+
+
+def replay(client, system_prompt, conversation, session_id):
+    history, samples, errors = [], [], []
+    for turn, user_text in enumerate(conversation):
+        history.append({"role": "user", "content": user_text})
+        try:
+            reply, sample = timed_turn(client, system_prompt, history, session_id)
+        except (LLMError, TransportError) as e:
+            errors.append(f"tour {turn}: {e}")
+            break
+        sample["turn"] = turn
+        samples.append(sample)
+        history.append({"role": "assistant", "content": reply})
+    return samples, errors
+
+
+def ollama_memory(client):
+    """ Mémoire du modèle chargé d'après /api/ps (taille totale, part en VRAM), None hors Ollama """
+    base = client.endpoint.rstrip("/")
+    if base.endswith("/v1"):
+        base = base[:-len("/v1")]
+    try:
+        r = client.transport.get(base + "/api/ps", timeout=5)
+        if r.status_code != 200:
+            return None
+        models = r.json().get("models", [])
+    except (TransportError, ValueError):
+        return None
+    for model in models:
+        if model.get("name", "").split(":")[0] == client.model.split(":")[0]:
+            size, vram = model.get("size", 0), model.get("size_vram", 0)
+            return {
+                "size_mb": round(size / 2 ** 20, 1),
+                "vram_mb": round(vram / 2 ** 20, 1),
+                "gpu_share": round(vram / size, 3) if size else 0.0,
+                "processor": "GPU" if vram >= size and size else ("CPU" if not vram else "CPU/GPU"),
+            }
+    return None
+
+
+def run_level(client, system_prompt, conversations, concurrency, rounds):
+    """ `concurrency` conversations en parallèle, chacune rejouée `rounds` fois """
+    jobs = [conversations[i % len(conversations)] for i in range(concurrency * rounds)]
+    samples, errors = [], []
+    lock = threading.Lock()
+
+    def worker(slot):
+        # Une session par worker : ses conversations passent l'une après l'autre,
+        # deux tours en vol ne partagent jamais la même session (ni le même slot llama.cpp)
+        session_id = f"bench-{concurrency}-{slot}"
+        for conversation in jobs[slot::concurrency]:
+            s, e = replay(client, system_prompt, conversation, session_id)
+            with lock:
+                samples.extend(s)
+                errors.extend(e)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(worker, range(concurrency)))
+    wall = time.perf_counter() - start
+
+    generated = sum(s["completion_tokens"] or 0 for s in samples)
+    prompt_eval = [s["prompt_eval_ms"] for s in samples if s["prompt_eval_ms"] is not None]
+    prompt_tokens = [s["prompt_tokens"] for s in samples if s["prompt_tokens"] is not None]
+    sources = {s["tokens_source"] for s in samples}
+    return {
+        "concurrency": concurrency,
+        "turns": len(samples),
+        "errors": errors,
+        "wall_s": round(wall, 2),
+        "throughput_tokens_s": round(generated / wall, 2) if wall else None,
+        "ttft_ms": summarize([s["ttft_s"] for s in samples], scale=1000.0),
+        "latency_ms": summarize([s["latency_s"] for s in samples], scale=1000.0),
+        "tokens_per_s": summarize([s["tokens_per_s"] for s in samples if s["tokens_per_s"]]),
+        "prompt_eval_ms": summarize(prompt_eval) if prompt_eval else None,
+        "prompt_tokens": summarize(prompt_tokens) if prompt_tokens else None,
+        "tokens_source": sources.pop() if len(sources) == 1 else sorted(sources),
+    }
+
+
+def bench_target(config_path, model, conversations, levels, rounds):
+    client, system_prompt = make_client(config_path, model)
+    target = {"config": os.path.relpath(config_path, ROOT), "backend": client.backend, "model": client.model}
+
+    # Premier appel hors mesure : chargement du modèle (et de son cache) côté serveur
+    start = time.perf_counter()
+    try:
+        timed_turn(client, system_prompt, [{"role": "user", "content": "Bonjour"}], None)
+    except (LLMError, TransportError) as e:
+        return {"target": target, "error": str(e)}
+    load_time = time.perf_counter() - start
+
+    results = []
+    for concurrency in levels:
+        print(f"[BENCH] {client.backend}/{client.model} x{concurrency}...", file=sys.stderr)
+        results.append(run_level(client, system_prompt, conversations, concurrency, rounds))
+    return {
+        "target": target,
+        "first_call_s": round(load_time, 2),
+        "memory": ollama_memory(client),
+        "levels": results,
+    }
+
+
+def print_summary(report):
+    for result in report["results"]:
+        target = result["target"]
+        print(f"\n{target['backend']}/{target['model']}  ({target['config']})")
+        if "error" in result:
+            print(f"  indisponible : {result['error']}")
+            continue
+        memory = result["memory"]
+        if memory:
+            print(f"  mémoire {memory['size_mb']} Mo dont VRAM {memory['vram_mb']} Mo ({memory['processor']})")
+        for level in result["levels"]:
+            ttft, lat, tps = level["ttft_ms"], level["latency_ms"], level["tokens_per_s"]
+            prompt = level["prompt_eval_ms"]
+            print(f"  x{level['concurrency']:<3d} TTFT p50 {ttft['p50']:7.1f} p95 {ttft['p95']:7.1f} ms"
+                  f"  total p50 {lat['p50']:7.1f} p95 {lat['p95']:7.1f} ms  {tps['avg']:6.1f} tok/s"
+                  f"  prompt {prompt['avg'] if prompt else '-':>7} ms  débit {level['throughput_tokens_s']} tok/s"
+                  f"  erreurs {len(level['errors'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc de mesure LLM (TTFT, tokens/s, évaluation du prompt)")
+    parser.add_argument("--configs", type=_csv(), default=[os.path.join(ROOT, "configs", "llm_ollama_config.json")],
+                        help="configs LLMClient à comparer")
+    parser.add_argument("--models", type=_csv(), default=[None],
+                        help="modèles à essayer avec chaque config (défaut : celui de la config)")
+    parser.add_argument("--concurrency", type=_csv(int), default=[1, 2, 4])
+    parser.add_argument("--rounds", type=int, default=1, help="passages du jeu de conversations par worker")
+    parser.add_argument("--conversations", help="JSON [[tour, ...], ...] remplaçant les conversations intégrées")
+    parser.add_argument("--output", help="fichier JSON du rapport (stdout si absent)")
+    args = parser.parse_args(argv)
+
+    conversations = CONVERSATIONS
+    if args.conversations:
+        with open(args.conversations, encoding="utf-8") as f:
+            conversations = json.load(f)
+
+    results = [bench_target(os.path.abspath(config), model, conversations, args.concurrency, args.rounds)
+               for config, model in itertools.product(args.configs, args.models)]
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "rounds": args.rounds,
+            "conversations": len(conversations),
+            "turns": sum(len(c) for c in conversations),
+        },
+        "results": results,
+    }
+
+    payload = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(payload)
+        print_summary(report)
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
-from flask import Flask, request, jsonify
+import json
+import time
+
+from flask import Flask, Response, request, jsonify
 
 app = Flask(__name__)
 
@@ -9,6 +12,17 @@ def fastchat_mock():
     for m in data.get("messages", []):
         if m.get("role") == "user":
             user_msg = m.get("content", user_msg)
+    content = f"Mock FastChat: j'ai reçu -> {user_msg}"
+    if data.get("stream"):
+        # SSE façon OpenAI : un delta par mot, puis [DONE]
+        def events():
+            for word in content.split(" "):
+                chunk = {"id": "mock-1", "object": "chat.completion.chunk",
+                         "choices": [{"index": 0, "delta": {"content": word + " "}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                time.sleep(0.05)
+            yield "data: [DONE]\n\n"
+        return Response(events(), mimetype="text/event-stream")
     resp = {
         "id": "mock-1",
         "object": "chat.completion",
@@ -17,7 +31,7 @@ def fastchat_mock():
                 "index": 0,
                 "message": {
                     "role": "assistant",
-                    "content": f"Mock FastChat: j'ai reçu -> {user_msg}"
+                    "content": content
                 }
             }
         ]
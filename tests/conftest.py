@@ -0,0 +1,108 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import LLMError
+
+
+class FakeLLM:
+    """LLMClient stand-in: scripted replies, optional latency, counts its calls."""
+
+    def __init__(self, reply="Réponse du modèle.", delay=0.0, fail=False, backend="fake", model="fake"):
+        self.reply = reply
+        self.delay = delay
+        self.fail = fail
+        self.backend = backend
+        self.model = model
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _answer(self, system_prompt, history):
+        with self._lock:
+            self.calls.append((system_prompt, [dict(m) for m in history]))
+        if self.fail:
+            raise LLMError(f"{self.model} down")
+        return self.reply(system_prompt, history) if callable(self.reply) else self.reply
+
+    def generate_chat(self, system_prompt, history, session_id=None):
+        time.sleep(self.delay)
+        return self._answer(system_prompt, history)
+
+    async def agenerate_chat(self, system_prompt, history, session_id=None):
+        await asyncio.sleep(self.delay)
+        return self._answer(system_prompt, history)
+
+    def generate_chat_stream(self, system_prompt, history, session_id=None):
+        yield self.generate_chat(system_prompt, history, session_id)
+
+    async def agenerate_chat_stream(self, system_prompt, history, session_id=None):
+        yield await self.agenerate_chat(system_prompt, history, session_id)
+
+    def flight_stats(self):
+        return {}
+
+
+@pytest.fixture
+def make_dialog(tmp_path):
+    """DialogManager on a FakeLLM, with test configs for the cache, fast path and context window."""
+    from app.dialog_manager import DialogManager
+    from app.sessions import SessionStore
+
+    def _write(name, data):
+        path = tmp_path / name
+        path.write_text(json.dumps(data), encoding="utf-8")
+        return str(path)
+
+    def make(llm=None, cache=None, fast_path=None, context=None):
+        llm_path = _write("llm.json", {"backend": "fastchat", "endpoint": "http://127.0.0.1:9", "model": "fake"})
+        cache_cfg = {"persist_path": None, "intent_ttls": {"book_activity": 0}, **(cache or {})}
+        dm = DialogManager(
+            SessionStore(),
+            llm_config_path=llm_path,
+            cache_config_path=_write("cache.json", cache_cfg),
+            fast_path_config_path=_write("fast_path.json", fast_path) if fast_path else str(tmp_path / "none.json"),
+            context_config_path=_write("context.json", context) if context else str(tmp_path / "none.json"),
+        )
+        dm.llm = dm.context.llm = llm or FakeLLM()
+        return dm
+
+    return make
+
+
+@pytest.fixture
+def server():
+    """
+    app.main sans modèles : les composants sont remplacés par des faux (server.install),
+    les pools tournent, les événements de démarrage ne sont pas déclenchés.
+    server.request(...) envoie une requête HTTP à l'application via httpx (ASGI, sans réseau).
+    """
+    import httpx
+
+    from app import main
+
+    saved = dict(main.components._components)
+    pools = [main.asr_pool, main.wake_pool] + ([main.asr_batcher] if main.asr_batcher else [])
+    for pool in pools:
+        pool.start()
+
+    def install(name, value):
+        main.components.register(name, lambda: value).load()
+        return value
+
+    def request(method, url, **kwargs):
+        async def send():
+            transport = httpx.ASGITransport(app=main.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.request(method, url, **kwargs)
+        return asyncio.run(send())
+
+    yield SimpleNamespace(main=main, install=install, request=request)
+
+    for pool in reversed(pools):
+        pool.stop()
+    main.components._components.clear()
+    main.components._components.update(saved)
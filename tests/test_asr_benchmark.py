@@ -0,0 +1,59 @@
+import os
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from app.audio_utils import SAMPLE_RATE, load_audio
+from app.vad import VoiceActivityDetector
+from scripts.bench_asr import add_noise, synthetic_voice, to_wav_bytes
+
+# Bancs de mesure (pytest-benchmark) : pytest tests/test_asr_benchmark.py --benchmark-json=bench.json
+# puis --benchmark-compare pour comparer deux commits. Modèle Whisper : ASR_BENCH_MODEL (tiny par défaut).
+MODEL = os.getenv("ASR_BENCH_MODEL", "tiny")
+LENGTHS = [2.0, 5.0, 15.0]
+SNRS = [None, 5.0]
+
+
+def _clip(seconds, snr):
+    return add_noise(synthetic_voice(seconds), snr, seed=int(seconds))
+
+
+@pytest.fixture(scope="module")
+def asr():
+    pytest.importorskip("faster_whisper")
+    from app.speech import ASRModule
+    try:
+        return ASRModule(model_size=MODEL)
+    except Exception as e:  # modèle absent du cache et pas de réseau
+        pytest.skip(f"Modèle Whisper '{MODEL}' indisponible: {e}")
+
+
+@pytest.mark.parametrize("seconds", LENGTHS)
+def test_bench_decode(benchmark, seconds):
+    wav = to_wav_bytes(_clip(seconds, None))
+    samples = benchmark(load_audio, wav)
+    assert len(samples) == int(seconds * SAMPLE_RATE)
+    if benchmark.stats:  # None sous --benchmark-disable
+        benchmark.extra_info["rtf"] = benchmark.stats.stats.median / seconds
+
+
+@pytest.mark.parametrize("snr", SNRS)
+@pytest.mark.parametrize("seconds", LENGTHS)
+@pytest.mark.parametrize("model", ["energy", "silero"])
+def test_bench_vad(benchmark, model, seconds, snr):
+    if model == "silero":
+        pytest.importorskip("faster_whisper")
+    vad = VoiceActivityDetector(model=model)
+    benchmark(vad.detect, _clip(seconds, snr))
+    if benchmark.stats:  # None sous --benchmark-disable
+        benchmark.extra_info["rtf"] = benchmark.stats.stats.median / seconds
+
+
+@pytest.mark.parametrize("beam_size", [1, 5])
+@pytest.mark.parametrize("seconds", LENGTHS)
+def test_bench_transcribe(benchmark, asr, seconds, beam_size):
+    speech = _clip(seconds, 20.0)
+    benchmark.pedantic(asr.decode, args=(speech,), kwargs={"beam_size": beam_size}, rounds=3, warmup_rounds=1)
+    if benchmark.stats:  # None sous --benchmark-disable
+        benchmark.extra_info["rtf"] = benchmark.stats.stats.median / seconds
@@ -0,0 +1,69 @@
+import struct
+
+import pytest
+
+
+class FakeASR:
+    """ ASRModule factice : enregistre le profil et la langue reçus par chaque décodage """
+
+    def __init__(self, language="en", probability=0.95):
+        self.language = language
+        self.probability = probability
+        self.calls = []
+
+    def decode_options(self, profile=None, language=None):
+        if profile not in (None, "fast", "accurate"):
+            raise ValueError(f"Profil de décodage inconnu: {profile}")
+        return {}
+
+    def process_audio(self, audio, sample_rate=None, profile=None, language=None):
+        self.calls.append({"profile": profile, "language": language})
+        return {
+            "text": "hello",
+            "language": language or self.language,
+            "language_probability": 1.0 if language else self.probability,
+            "is_reliable": True,
+        }
+
+    def process_batch(self, audios, profile=None, language=None):
+        return [self.process_audio(audio, profile=profile, language=language) for audio in audios]
+
+
+@pytest.fixture
+def asr(server):
+    return server.install("asr", FakeASR())
+
+
+PCM = b"\x00\x01" * 1600
+
+
+def test_truncated_wav_is_rejected_with_422(server, asr):
+    header = b"RIFF" + struct.pack("<I", 36) + b"WAVE" + b"fmt " + struct.pack("<I", 16) + b"\x01\x00"
+    response = server.request("POST", "/v1/asr", content=header + b"\x00" * 100)
+    assert response.status_code == 422
+    assert asr.calls == []
+
+
+def test_zero_sample_rate_is_rejected_with_422(server, asr):
+    response = server.request("POST", "/v1/asr?sample_rate=0", content=PCM)
+    assert response.status_code == 422
+
+
+def test_unknown_profile_is_rejected(server, asr):
+    response = server.request("POST", "/v1/asr?profile=turbo", content=PCM)
+    assert response.status_code == 422
+
+
+def test_session_pins_language_and_remembers_profile(server, asr):
+    first = server.request("POST", "/v1/asr?session_id=s1&profile=fast", content=PCM)
+    assert first.status_code == 200 and first.json()["language"] == "en"
+
+    server.request("POST", "/v1/asr?session_id=s1", content=PCM)
+    assert asr.calls == [{"profile": "fast", "language": None}, {"profile": "fast", "language": "en"}]
+
+
+def test_unsure_detection_is_not_pinned(server, asr):
+    asr.probability = 0.5
+    server.request("POST", "/v1/asr?session_id=s2", content=PCM)
+    server.request("POST", "/v1/asr?session_id=s2", content=PCM)
+    assert [call["language"] for call in asr.calls] == [None, None]
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.asr_batching import ASRBatcher
+from app.asr_pool import ASRPoolClosed, ASRQueueFull, ASRWorkerPool
+
+
+@pytest.fixture
+def pool():
+    pool = ASRWorkerPool(workers=1, max_queue=1)
+    pool.start()
+    yield pool
+    pool.stop()
+
+
+def _occupy(pool):
+    """ Bloque l'unique worker, puis remplit la file ; renvoie l'événement qui les libère """
+    release, started = threading.Event(), threading.Event()
+
+    def blocking():
+        started.set()
+        release.wait(5.0)
+        return "ok"
+
+    running = pool.submit(blocking)
+    assert started.wait(5.0)
+    queued = pool.submit(lambda: "queued")
+    return release, running, queued
+
+
+def test_full_queue_is_rejected_immediately(pool):
+    release, running, queued = _occupy(pool)
+    with pytest.raises(ASRQueueFull):
+        pool.submit(lambda: "rejected")
+
+    stats = pool.stats()
+    assert stats["busy"] == 1 and stats["queue_depth"] == 1
+    assert stats["rejected"] == 1 and stats["submitted"] == 2
+
+    release.set()
+    assert running.result(5.0) == "ok"
+    assert queued.result(5.0) == "queued"
+    assert pool.submit(lambda: "again").result(5.0) == "again"  # la file s'est vidée
+
+
+def test_run_raises_queue_full_for_async_callers(pool):
+    release, _, _ = _occupy(pool)
+    try:
+        with pytest.raises(ASRQueueFull):
+            asyncio.run(pool.run(lambda: "rejected"))
+    finally:
+        release.set()
+
+
+def test_stopped_pool_refuses_jobs():
+    pool = ASRWorkerPool(workers=1, max_queue=1)
+    with pytest.raises(ASRPoolClosed):
+        pool.submit(lambda: None)
+
+
+
+def test_batcher_rejects_when_pending_queue_is_full():
+    pool = ASRWorkerPool(workers=1, max_queue=1)
+    batcher = ASRBatcher(pool, max_batch=2)  # pas démarré : rien ne vide la file
+    for _ in range(2):
+        batcher.submit(lambda audios: audios, b"clip")
+    with pytest.raises(ASRQueueFull):
+        batcher.submit(lambda audios: audios, b"clip")
@@ -0,0 +1,39 @@
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from app.speech import DECODE_PROFILES, ASRModule  # noqa: E402
+
+
+@pytest.fixture
+def asr():
+    asr = ASRModule.__new__(ASRModule)
+    asr.default_language, asr.default_profile = "fr", "accurate"
+    return asr
+
+
+def test_fast_profile_is_greedy_with_a_fixed_language(asr):
+    options = asr.decode_options("fast")
+    assert options["beam_size"] == 1 and options["without_timestamps"]
+    assert options["language"] == "fr"
+    assert "detect_language" not in options
+
+
+def test_accurate_profile_detects_the_language(asr):
+    options = asr.decode_options("accurate")
+    assert options["beam_size"] == 5 and options["language"] is None
+
+
+@pytest.mark.parametrize("profile", list(DECODE_PROFILES))
+def test_pinned_session_language_skips_detection(asr, profile):
+    assert asr.decode_options(profile, language="en")["language"] == "en"
+
+
+def test_default_profile_applies_without_profile(asr):
+    asr.default_profile = "fast"
+    assert asr.decode_options() == asr.decode_options("fast")
+
+
+def test_unknown_profile_is_rejected(asr):
+    with pytest.raises(ValueError):
+        asr.decode_options("turbo")
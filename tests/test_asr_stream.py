@@ -0,0 +1,104 @@
+from collections import namedtuple
+
+import numpy as np
+
+from app.asr_stream import SAMPLE_RATE, StreamingTranscriber
+from app.vad import VoiceActivityDetector
+
+Segment = namedtuple("Segment", ["start", "end", "text"])
+Info = namedtuple("Info", ["language", "language_probability"])
+
+
+class FakeASR:
+    """ Remplace ASRModule : segments scriptés par appel à decode() """
+
+    def __init__(self, *scripts, language="fr", probability=0.9, vad="off"):
+        self.scripts = list(scripts)
+        self.vad = VoiceActivityDetector(model=vad)
+        self.info = Info(language, probability)
+        self.calls = []
+
+    def decode(self, audio, beam_size=5, **options):
+        self.calls.append(dict(options, beam_size=beam_size, seconds=len(audio) / SAMPLE_RATE))
+        segments = self.scripts.pop(0) if self.scripts else []
+        return list(segments), self.info, 0.01
+
+    def empty_result(self):
+        return self.build_result([], Info("fr", 0.0), 0.0)
+
+    def build_result(self, segments, info, duration):
+        return {
+            "text": " ".join(s.text.strip() for s in segments).strip(),
+            "language": info.language,
+            "duration": duration,
+        }
+
+
+def _pcm(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype="<i2").tobytes()
+
+
+def test_feed_signals_a_partial_every_interval():
+    stream = StreamingTranscriber(FakeASR(), partial_interval=1.0)
+    assert not stream.feed(_pcm(0.5))
+    assert stream.feed(_pcm(0.5))
+    stream.partial()
+    assert not stream.feed(_pcm(0.2))
+
+
+def test_feed_keeps_the_odd_byte_of_a_split_sample():
+    stream = StreamingTranscriber(FakeASR())
+    frame = _pcm(0.1)
+    stream.feed(frame[:-1])
+    stream.feed(frame[-1:])
+    assert len(stream._window) == len(frame) // 2
+
+
+def test_partial_commits_stable_segments_and_final_decodes_the_tail():
+    asr = FakeASR(
+        [Segment(0.0, 0.8, " Bonjour"), Segment(0.8, 3.5, " je voudrais")],
+        [Segment(0.0, 1.0, " réserver une salle")],
+    )
+    stream = StreamingTranscriber(asr, holdback=1.5)
+    stream.feed(_pcm(4.0))
+
+    partial = stream.partial()
+    assert partial == {
+        "type": "partial",
+        "text": "Bonjour je voudrais",
+        "stable_text": "Bonjour",
+        "language": "fr",
+    }
+    assert asr.calls[0]["beam_size"] == 1
+    assert stream.window_duration == 4.0 - 0.8  # le segment validé est retiré de la fenêtre
+
+    final = stream.final()
+    assert final["type"] == "final"
+    assert final["text"] == "Bonjour réserver une salle"
+    assert asr.calls[1]["beam_size"] == 5
+    assert asr.calls[1]["initial_prompt"] == "Bonjour"
+    assert asr.calls[1]["language"] == "fr"
+
+
+def test_language_is_not_locked_when_detection_is_unsure():
+    stream = StreamingTranscriber(FakeASR([], probability=0.4))
+    stream.feed(_pcm(1.0))
+    assert stream.partial()["language"] is None
+
+
+def test_final_without_audio_does_not_call_the_model():
+    asr = FakeASR()
+    result = StreamingTranscriber(asr).final()
+    assert asr.calls == []
+    assert result["type"] == "final" and result["text"] == "" and result["language"] == "fr"
+
+
+def test_silent_window_is_not_decoded():
+    asr = FakeASR([Segment(0.0, 1.0, " euh")], vad="energy")
+    stream = StreamingTranscriber(asr, holdback=1.5)
+    stream.feed(_pcm(4.0))
+
+    assert stream.partial()["text"] == ""
+    assert stream.window_duration == 1.5  # seule la fin de la fenêtre est gardée
+    assert stream.final()["text"] == ""
+    assert asr.calls == []
@@ -0,0 +1,50 @@
+import struct
+
+import numpy as np
+import pytest
+
+from app.audio_utils import SAMPLE_RATE, AudioDecodeError, decode_wav, load_audio
+
+
+def _wav(sample_rate=SAMPLE_RATE, bits=16, channels=1, fmt_size=16, data=b"\x00\x01" * 160):
+    fmt = struct.pack("<HHIIHH", 1, channels, sample_rate, sample_rate * channels * bits // 8,
+                      channels * bits // 8, bits)[:fmt_size]
+    body = b"WAVE" + b"fmt " + struct.pack("<I", 16) + fmt + b"data" + struct.pack("<I", len(data)) + data
+    return b"RIFF" + struct.pack("<I", len(body)) + body
+
+
+def test_decode_roundtrip():
+    samples, rate = decode_wav(_wav(data=np.zeros(1600, dtype="<i2").tobytes()))
+    assert rate == SAMPLE_RATE and len(samples) == 1600
+
+
+def test_other_sample_rate_is_resampled_to_16k():
+    samples = load_audio(_wav(sample_rate=8000, data=np.zeros(800, dtype="<i2").tobytes()))
+    assert len(samples) == 1600 and samples.dtype == np.float32
+
+
+def test_stereo_is_downmixed():
+    frames = np.array([[16384, -16384], [8192, 8192]], dtype="<i2")
+    samples, _ = decode_wav(_wav(channels=2, data=frames.tobytes()))
+    assert np.allclose(samples, [0.0, 0.25])
+
+
+@pytest.mark.parametrize("data", [
+    _wav()[:30],                 # chunk 'fmt ' coupé
+    _wav(fmt_size=10)[:32],      # en-tête fmt incomplet, sans chunk data
+    _wav()[:20],                 # coupé avant la fin des champs fmt
+    _wav(sample_rate=0),
+    _wav(channels=0),
+    _wav(bits=0),
+])
+def test_invalid_wav_raises_decode_error(data):
+    with pytest.raises(AudioDecodeError):
+        load_audio(data)
+
+
+@pytest.mark.parametrize("rate", [0, -8000])
+def test_invalid_raw_sample_rate(rate):
+    with pytest.raises(AudioDecodeError):
+        load_audio(b"\x00\x01" * 100, sample_rate=rate)
+    with pytest.raises(AudioDecodeError):
+        load_audio(np.zeros(100, dtype=np.float32), sample_rate=rate)
@@ -0,0 +1,57 @@
+import threading
+import time
+
+from scripts.bench_llm import run_level, server_counters
+
+
+class FakeStreamingClient:
+    """Client de bench factice : répond en deux fragments, note les sessions en vol."""
+
+    def __init__(self):
+        self.sessions = []
+        self.overlaps = 0
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def stream_events(self, system_prompt, history, session_id=None):
+        with self._lock:
+            if session_id in self._in_flight:
+                self.overlaps += 1
+            self._in_flight.add(session_id)
+            self.sessions.append(session_id)
+        try:
+            time.sleep(0.01)
+            yield {"text": "D'accord, "}
+            yield {"text": "très bien."}
+            yield {"done": True, "eval_count": 4, "eval_duration": 2e8,
+                   "prompt_eval_count": 12, "prompt_eval_duration": 5e6}
+        finally:
+            with self._lock:
+                self._in_flight.discard(session_id)
+
+    @staticmethod
+    def delta(event):
+        return event.get("text", "")
+
+
+def test_each_worker_replays_its_conversations_on_its_own_session():
+    client = FakeStreamingClient()
+    conversations = [["Bonjour", "Horaires ?"], ["Où est la piscine ?"]]
+    report = run_level(client, "prompt", conversations, concurrency=2, rounds=2)
+
+    assert report["errors"] == [] and report["turns"] == 6
+    assert sorted(set(client.sessions)) == ["bench-2-0", "bench-2-1"]
+    assert client.sessions.count("bench-2-0") == 4 and client.sessions.count("bench-2-1") == 2
+    assert client.overlaps == 0  # jamais deux tours en vol sur la même session
+    assert report["tokens_source"] == "server"
+    assert report["prompt_tokens"]["p50"] == 12
+
+
+def test_server_counters_from_ollama_and_llamacpp():
+    ollama = server_counters({"done": True, "eval_count": 20, "eval_duration": 1e9,
+                              "prompt_eval_count": 50, "prompt_eval_duration": 2e7})
+    assert ollama == {"prompt_tokens": 50, "prompt_eval_ms": 20.0, "completion_tokens": 20, "eval_s": 1.0}
+
+    llamacpp = server_counters({"timings": {"prompt_n": 8, "prompt_ms": 3.5, "predicted_n": 10, "predicted_ms": 500}})
+    assert llamacpp == {"prompt_tokens": 8, "prompt_eval_ms": 3.5, "completion_tokens": 10, "eval_s": 0.5}
+    assert server_counters({"choices": []}) == {}
@@ -0,0 +1,121 @@
+from conftest import FakeLLM
+
+from app.context_window import SUMMARY_HEADER, SUMMARY_PROMPT, ContextBuilder, TokenCounter
+from app.sessions import SessionStore
+
+BASE_PROMPT = "P" * 10  # 11 tokens à 1 caractère par token
+
+
+def _builder(llm=None, **kwargs):
+    # budget de l'historique : 100 - 20 - 11 - 4 = 65 tokens ; un message de 15 caractères en coûte 20
+    options = {"max_tokens": 100, "reserve_tokens": 20, "summary_chunk": 2, "keep_recent": 2, **kwargs}
+    return ContextBuilder(llm or FakeLLM(reply="Le visiteur veut réserver."),
+                          counter=TokenCounter(chars_per_token=1.0), **options)
+
+
+def _history(n):
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"message {i:02d} xxxx"} for i in range(n)]
+
+
+def _wait_for_folds(builder):
+    builder._executor.submit(lambda: None).result(5.0)
+
+
+def test_build_keeps_the_most_recent_messages_within_budget():
+    builder = _builder()
+    history = _history(6)
+    prompt, kept = builder.build(BASE_PROMPT, {"history": history})
+
+    assert prompt == BASE_PROMPT
+    assert kept == history[-3:]
+    assert sum(builder.counter.count_message(m) for m in kept) <= builder.budget(prompt)
+    assert builder.stats()["truncated_turns"] == 1
+
+
+def test_build_always_sends_the_latest_message():
+    builder = _builder()
+    huge = {"role": "user", "content": "x" * 500}
+    _, kept = builder.build(BASE_PROMPT, {"history": _history(2) + [huge]})
+    assert kept == [huge]
+
+
+def test_disabled_builder_sends_the_whole_history():
+    builder = _builder(enabled=False)
+    history = _history(10)
+    assert builder.build(BASE_PROMPT, {"history": history}) == (BASE_PROMPT, history)
+    assert not builder.maybe_fold(SessionStore(), "s1", BASE_PROMPT)
+
+
+def test_trim_caps_the_stored_history():
+    builder = _builder(max_messages=4)
+    assert builder.trim(_history(10)) == _history(10)[-4:]
+    assert builder.trim(_history(3)) == _history(3)
+
+
+def test_fold_moves_the_oldest_messages_into_the_summary():
+    llm = FakeLLM(reply="Le visiteur veut réserver.")
+    builder, sessions = _builder(llm), SessionStore()
+    history = _history(4)
+    sessions.update("s1", {"history": list(history)})
+
+    assert builder.maybe_fold(sessions, "s1", BASE_PROMPT)  # 80 tokens > 0.75 x 65
+    _wait_for_folds(builder)
+
+    session = sessions.get("s1")
+    assert session["summary"] == "Le visiteur veut réserver."
+    assert session["history"] == history[2:]
+    (system_prompt, request), = llm.calls
+    assert system_prompt == SUMMARY_PROMPT
+    assert "message 00" in request[0]["content"] and "message 02" not in request[0]["content"]
+
+    prompt, kept = builder.build(BASE_PROMPT, session)
+    assert prompt == BASE_PROMPT + SUMMARY_HEADER + "Le visiteur veut réserver."
+    # le résumé prend sa part du budget : il reste la place du dernier message
+    assert kept == history[-1:]
+    assert builder.stats()["folds"] == 1
+
+
+def test_short_history_is_not_folded():
+    builder, sessions = _builder(), SessionStore()
+    sessions.update("s1", {"history": _history(3)})
+    assert not builder.maybe_fold(sessions, "s1", BASE_PROMPT)  # 60 tokens < 0.75 x 65
+
+
+def test_failed_fold_keeps_the_history():
+    builder, sessions = _builder(FakeLLM(fail=True)), SessionStore()
+    sessions.update("s1", {"history": _history(4)})
+
+    assert builder.maybe_fold(sessions, "s1", BASE_PROMPT)
+    _wait_for_folds(builder)
+
+    assert sessions.get("s1")["history"] == _history(4)
+    assert "summary" not in sessions.get("s1")
+    stats = builder.stats()
+    assert stats["fold_errors"] == 1 and stats["folding"] == 0
+
+
+def test_long_summary_is_capped_and_the_prompt_stays_within_budget():
+    # le résumé renvoyé (400 tokens) ferait déborder le prompt à lui seul
+    llm = FakeLLM(reply="résumé " * 57)
+    builder, sessions = _builder(llm, max_tokens=200, summary_max_tokens=40), SessionStore()
+    history = _history(8)
+    sessions.update("s1", {"history": list(history)})
+
+    assert builder.maybe_fold(sessions, "s1", BASE_PROMPT)
+    _wait_for_folds(builder)
+
+    session = sessions.get("s1")
+    assert builder.counter.count(session["summary"]) <= 40
+    assert session["summary"].startswith("résumé résumé") and not session["summary"].endswith(" ")
+
+    prompt, kept = builder.build(BASE_PROMPT, session)
+    total = builder.counter.count(prompt) + TokenCounter.MESSAGE_OVERHEAD + \
+        sum(builder.counter.count_message(m) for m in kept)
+    assert total <= builder.max_tokens - builder.reserve_tokens
+    assert kept == history[-4:]
+
+
+def test_truncate_keeps_whole_words():
+    counter = TokenCounter(chars_per_token=1.0)
+    assert counter.truncate("court", 10) == "court"
+    assert counter.truncate("un deux trois quatre", 10) == "un deux"
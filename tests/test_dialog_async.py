@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from conftest import FakeLLM
+
+
+def _turn(text):
+    return {"intent": "ask_hours", "confidence": 0.99, "entities": {}, "raw_text": text}
+
+
+def test_ahandle_does_not_block_the_event_loop(make_dialog):
+    dm = make_dialog(llm=FakeLLM(delay=0.2))
+
+    async def scenario():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        task = asyncio.create_task(ticker())
+        reply, _ = await dm.ahandle("s1", _turn("Quels sont les horaires ?"), use_cache=False)
+        done.set()
+        await task
+        return reply, ticks
+
+    reply, ticks = asyncio.run(scenario())
+    assert reply == "Réponse du modèle."
+    assert ticks >= 5  # la boucle a continué de tourner pendant l'appel au LLM
+
+
+def test_concurrent_ahandle_calls_overlap(make_dialog):
+    dm = make_dialog(llm=FakeLLM(delay=0.2))
+
+    async def scenario():
+        return await asyncio.gather(*(
+            dm.ahandle(f"s{i}", _turn(f"Question {i} ?"), use_cache=False) for i in range(5)
+        ))
+
+    start = time.perf_counter()
+    replies = asyncio.run(scenario())
+    elapsed = time.perf_counter() - start
+
+    assert len(replies) == 5 and len(dm.llm.calls) == 5
+    assert elapsed < 0.6  # 5 x 0.2 s en série
+
+
+def test_ahandle_stream_does_not_block_the_event_loop(make_dialog):
+    dm = make_dialog(llm=FakeLLM(reply="Bonjour. Au revoir.", delay=0.2))
+
+    async def scenario():
+        async def consume(session_id):
+            return [e async for e in dm.ahandle_stream(session_id, _turn("Salut"), use_cache=False)]
+        return await asyncio.gather(*(consume(f"s{i}") for i in range(4)))
+
+    start = time.perf_counter()
+    streams = asyncio.run(scenario())
+    elapsed = time.perf_counter() - start
+
+    assert all(events[-1]["type"] == "end" for events in streams)
+    assert elapsed < 0.6
+
+
+def test_ahandle_stream_falls_back_when_the_llm_fails(make_dialog):
+    dm = make_dialog(llm=FakeLLM(fail=True))
+
+    async def scenario():
+        return [e async for e in dm.ahandle_stream("s1", _turn("Quels sont les horaires ?"))]
+
+    events = asyncio.run(scenario())
+    assert [e["type"] for e in events] == ["sentence", "end"]
+    assert events[0]["text"] == events[1]["text"]
+    assert dm.sessions.get("s1")["history"][-1] == {"role": "assistant", "content": events[1]["text"]}
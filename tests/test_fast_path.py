@@ -0,0 +1,53 @@
+from app.fast_path import FastPathRouter
+
+FAST_PATH = {
+    "intents": {
+        "ask_hours": {"min_confidence": 0.9, "templates": ["Ouvert {hours[semaine]}."]},
+        "ask_location": {"min_confidence": 0.8, "templates": ["{location} est au rez-de-chaussée."]},
+    },
+    "data": {"hours": {"semaine": "de 8h à 22h"}},
+}
+
+
+def _turn(intent, confidence, entities=None, text="question"):
+    return {"intent": intent, "confidence": confidence, "entities": entities or {}, "raw_text": text}
+
+
+def test_route_respects_the_confidence_threshold():
+    router = FastPathRouter(FAST_PATH["intents"], FAST_PATH["data"])
+    assert router.route(_turn("ask_hours", 0.95)) == "Ouvert de 8h à 22h."
+    assert router.route(_turn("ask_hours", 0.9)) == "Ouvert de 8h à 22h."  # seuil inclus
+    assert router.route(_turn("ask_hours", 0.89)) is None
+    assert router.route(_turn("greeting", 1.0)) is None
+    assert router.route(_turn("ask_location", 0.99)) is None  # entité manquante
+    assert router.route(_turn("ask_location", 0.99, {"location": ["L'accueil"]})) == \
+        "L'accueil est au rez-de-chaussée."
+
+    stats = router.stats()
+    assert stats["answered"] == 3 and stats["low_confidence"] == 1
+    assert stats["not_configured"] == 1 and stats["missing_entities"] == 1
+
+
+def test_missing_config_disables_the_fast_path(tmp_path):
+    router = FastPathRouter.from_config(str(tmp_path / "none.json"))
+    assert not router.enabled
+    assert router.route(_turn("ask_hours", 1.0)) is None
+
+
+def test_confident_turn_skips_the_llm(make_dialog):
+    dm = make_dialog(fast_path=FAST_PATH)
+    reply, _ = dm.handle("s1", _turn("ask_hours", 0.97, text="Quels sont les horaires ?"))
+    assert reply == "Ouvert de 8h à 22h."
+    assert dm.llm.calls == []
+    assert dm.sessions.get("s1")["history"][-1] == {"role": "assistant", "content": reply}
+
+
+def test_low_confidence_turn_falls_back_to_the_llm(make_dialog):
+    dm = make_dialog(fast_path=FAST_PATH)
+    reply, _ = dm.handle("s1", _turn("ask_hours", 0.5, text="Quels sont les horaires ?"))
+    assert reply == "Réponse du modèle."
+    assert len(dm.llm.calls) == 1
+
+    events = list(dm.handle_stream("s2", _turn("ask_location", 0.99, text="Où est-ce ?")))
+    assert events[-1]["text"] == "Réponse du modèle."  # entité manquante : LLM
+    assert len(dm.llm.calls) == 2
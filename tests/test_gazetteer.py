@@ -0,0 +1,57 @@
+from app.gazetteer import Gazetteer, normalize_token
+
+CATALOGUE = {
+    "ACTIVITY": ["yoga", {"name": "basket-ball", "aliases": ["basket", "basket ball"]}, "tennis de table"],
+    "LOCATION": ["salle", "salle de sport", "vestiaire", "secrétariat", "terrain"],
+}
+
+
+def _gazetteer():
+    return Gazetteer.from_catalogue(CATALOGUE)
+
+
+def test_normalize_token():
+    assert normalize_token("Secrétariat") == "secretariat"
+    assert normalize_token("basket-ball") == normalize_token("basketball")
+    vocabulary = {"vestiaire", "douches", "paris", "prix"}
+    assert normalize_token("vestiaires", vocabulary) == "vestiaire"
+    assert normalize_token("douche", vocabulary) == "douches"
+    # les mots du catalogue terminés par s/x gardent leur forme
+    assert normalize_token("Paris", vocabulary) == "paris"
+    assert normalize_token("prix", vocabulary) == "prix"
+    assert normalize_token("tapis", vocabulary) == "tapis"
+
+
+def test_words_ending_in_s_or_x_are_not_truncated():
+    g = Gazetteer([("LOCATION", "Paris", ()), ("ACTIVITY", "boxe", ()), ("LOCATION", "douches", ())])
+    assert g.entities("le prix de la boxe à Paris") == {"activity": ["boxe"], "location": ["Paris"]}
+    assert g.entities("où est la douche ?") == {"location": ["douche"]}
+
+
+def test_accents_plurals_hyphens():
+    g = _gazetteer()
+    assert g.entities("où sont les vestiaires ?") == {"location": ["vestiaires"]}
+    assert g.entities("le secretariat est ouvert ?") == {"location": ["secretariat"]}
+    for text in ["du basket-ball", "du basketball", "du Basket Ball", "du basket"]:
+        assert [m.name for m in g.find(text)] == ["basket-ball"], text
+
+
+def test_longest_match_and_offsets():
+    g = _gazetteer()
+    text = "réserver la salle de sport pour du yoga"
+    matches = g.find(text)
+    assert [(m.label, m.text) for m in matches] == [("LOCATION", "salle de sport"), ("ACTIVITY", "yoga")]
+    assert all(text[m.start:m.end] == m.text for m in matches)
+
+
+def test_failure_links():
+    g = Gazetteer([("A", "a b c", ()), ("B", "b c d", ()), ("C", "c", ())])
+    assert [m.label for m in g.find("a b c d")] == ["A"]
+    assert [m.label for m in g.find("x b c d")] == ["B"]
+    assert [m.label for m in g.find("a b x c")] == ["C"]
+
+
+def test_no_partial_words():
+    g = _gazetteer()
+    assert g.find("les terrasses de la salle-de-bain") == []
+    assert g.find("") == []
@@ -0,0 +1,86 @@
+import io
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from app.http_transport import HTTPTransport, TransportError, TransportResponse, get_transport
+from app.llama_local_llm import LLMManager
+from app.llm import LLMClient
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.server.peers.add(self.client_address)
+        self.rfile.read(int(self.headers["Content-Length"]))
+        body = json.dumps({"text": "réservée"}, ensure_ascii=False).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def http_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+    server.peers = set()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connection_is_kept_alive_between_requests(http_server):
+    transport = HTTPTransport(pool_size=2)
+    url = f"http://127.0.0.1:{http_server.server_port}/"
+    try:
+        for _ in range(3):
+            assert transport.post(url, json={"q": 1}).json() == {"text": "réservée"}
+    finally:
+        transport.close()
+    assert len(http_server.peers) == 1
+
+
+def test_connection_errors_become_transport_errors():
+    transport = HTTPTransport(connect_timeout=0.5)
+    with pytest.raises(TransportError):
+        transport.get("http://127.0.0.1:9/")
+
+
+def test_get_transport_is_shared_per_settings():
+    assert get_transport(read_timeout=12) is get_transport(read_timeout=12)
+    assert get_transport(read_timeout=12) is not get_transport(read_timeout=13)
+
+
+def test_llm_manager_shares_the_default_llm_client_pool(tmp_path):
+    config = tmp_path / "llm.json"
+    config.write_text(json.dumps({"backend": "fastchat", "endpoint": "http://localhost:8000"}))
+    assert LLMManager().transport is LLMClient(str(config)).transport
+
+
+def _response(body, content_type):
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = content_type
+    response.raw = io.BytesIO(body)
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)  # comme HTTPAdapter
+    return TransportResponse(response, streamed=True)
+
+
+def test_text_without_charset_is_utf8():
+    assert _response("données à côté".encode("utf-8"), "text/event-stream").text == "données à côté"
+    lines = list(_response("data: é\n\ndata: è\n".encode("utf-8"), "text/event-stream").iter_lines())
+    assert [line for line in lines if line] == ["data: é", "data: è"]
+
+
+def test_explicit_charset_is_respected():
+    assert _response("côté".encode("latin-1"), "text/plain; charset=ISO-8859-1").text == "côté"
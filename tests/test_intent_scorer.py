@@ -0,0 +1,50 @@
+import pytest
+
+from app.intent_scorer import IntentScorer, NGRAM_SEP
+
+
+def _scorer():
+    # 2 labels, features: "bonjour", "horaires", bigram "quels horaires"
+    return IntentScorer(
+        ["ask_hours", "greeting"], [0.0, 0.1],
+        ["bonjour", "horaires", "quels" + NGRAM_SEP + "horaires"],
+        [-1.0, 2.0, 1.5, -0.5, 0.5, 0.0],
+        exceptions={"peut-être": ["peut-être"]},
+    )
+
+
+def test_tokenize_like_spacy_fr():
+    scorer = _scorer()
+    assert scorer.tokenize("peux-tu m'orienter vers le vestiaire ?") == \
+        ["peux", "-", "tu", "m'", "orienter", "vers", "le", "vestiaire", "?"]
+    assert scorer.tokenize("qui êtes-vous") == ["qui", "êtes", "-vous"]
+    assert scorer.tokenize("l’accueil, aujourd'hui") == ["l’", "accueil", ",", "aujourd'hui"]
+    assert scorer.tokenize("peut-être") == ["peut-être"]
+    assert scorer.tokenize("a  b") == ["a", " ", "b"]
+
+
+def test_scores():
+    scorer = _scorer()
+    assert max(scorer.scores("bonjour"), key=scorer.scores("bonjour").get) == "greeting"
+    cats = scorer.scores("quels horaires ?")
+    assert max(cats, key=cats.get) == "ask_hours"
+    assert sum(cats.values()) == pytest.approx(1.0)
+    assert scorer.scores("") == {"ask_hours": 0.0, "greeting": 0.0}
+
+
+def test_save_load(tmp_path):
+    scorer = _scorer()
+    path = str(tmp_path / "intent_scorer.bin")
+    scorer.save(path)
+    loaded = IntentScorer.load(path)
+    assert loaded.labels == scorer.labels and loaded.exceptions == scorer.exceptions
+    assert loaded.scores("quels horaires bonjour") == pytest.approx(scorer.scores("quels horaires bonjour"))
+
+
+def test_export_matches_textcat(tmp_path):
+    pytest.importorskip("spacy")
+    from app.nlu_train import export_intent_scorer, train
+
+    intent_dir = str(tmp_path / "intent_model")
+    train(intent_dir, n_iter=3)
+    assert export_intent_scorer(intent_dir, str(tmp_path / "intent_scorer.bin")) == 0
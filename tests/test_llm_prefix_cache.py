@@ -0,0 +1,64 @@
+import json
+from types import SimpleNamespace
+
+from app import llm
+from app.llm import LLMClient, SlotPinner
+
+
+class RecordingTransport:
+    def __init__(self, body):
+        self.body = body
+        self.requests = []
+
+    def post(self, url, params=None, json=None, headers=None, **kwargs):
+        self.requests.append((url, json))
+        return SimpleNamespace(status_code=200, text="", json=lambda: self.body)
+
+
+def _client(tmp_path, body, **cfg):
+    path = tmp_path / "llm.json"
+    path.write_text(json.dumps(cfg), encoding="utf-8")
+    client = LLMClient(str(path))
+    client.transport = RecordingTransport(body)
+    return client
+
+
+HISTORY = [{"role": "user", "content": "Quels sont les horaires ?"}]
+
+
+def test_default_config_uses_the_ollama_native_api():
+    with open(llm.DEFAULT_CONFIG_PATH, encoding="utf-8") as f:
+        assert json.load(f)["backend"] == "ollama"
+
+
+def test_ollama_payload_keeps_the_model_loaded(tmp_path):
+    client = _client(tmp_path, {"message": {"content": "De 8h à 22h."}}, backend="ollama",
+                     endpoint="http://localhost:11434/", model="pepper", keep_alive="1h", num_ctx=4096)
+    assert client.generate_chat("Tu es Pepper.", HISTORY, session_id="s1") == "De 8h à 22h."
+
+    (url, payload), = client.transport.requests
+    assert url == "http://localhost:11434/api/chat"
+    assert payload["keep_alive"] == "1h" and payload["options"]["num_ctx"] == 4096
+    assert payload["messages"] == [{"role": "system", "content": "Tu es Pepper."}] + HISTORY
+
+
+def test_llamacpp_payload_reuses_the_session_slot(tmp_path):
+    client = _client(tmp_path, {"choices": [{"message": {"content": "Oui."}}]}, backend="llamacpp",
+                     endpoint="http://localhost:8080/v1", model="pepper", slots=2)
+    for session_id in ("s1", "s2", "s1", None):
+        client.generate_chat("Tu es Pepper.", HISTORY, session_id=session_id)
+
+    payloads = [payload for _, payload in client.transport.requests]
+    assert all(p["cache_prompt"] is True for p in payloads)
+    assert [p["id_slot"] for p in payloads] == [0, 1, 0, -1]
+    assert client.transport.requests[0][0] == "http://localhost:8080/v1/chat/completions"
+
+
+def test_slot_pinner_evicts_the_least_recently_used_session():
+    pinner = SlotPinner(2)
+    assert pinner.slot("a") == 0 and pinner.slot("b") == 1
+    assert pinner.slot("a") == 0  # "b" devient le moins récent
+    assert pinner.slot("c") == 1  # reprend le slot de "b"
+    assert pinner.slot("b") == 0  # "a" évincé à son tour
+    assert pinner.slot(None) == -1
+    assert SlotPinner(0).slot("a") == -1
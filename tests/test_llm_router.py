@@ -0,0 +1,152 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from conftest import FakeLLM
+
+from app.llm import LLMError
+from app.llm_router import CLOSED, HALF_OPEN, OPEN, LLMRouter
+
+
+def _router(*clients, **kwargs):
+    options = {"failure_threshold": 2, "cooldown": 0.1, "hedge": False, **kwargs}
+    return LLMRouter(list(clients), **options)
+
+
+def _ask(router):
+    return router.generate_chat("prompt", [{"role": "user", "content": "Bonjour"}])
+
+
+def test_fails_over_to_the_next_backend():
+    local = FakeLLM(fail=True, model="local")
+    remote = FakeLLM(reply="Réponse distante.", model="remote")
+    router = _router(local, remote)
+
+    assert _ask(router) == "Réponse distante."
+    assert asyncio.run(router.agenerate_chat("prompt", [])) == "Réponse distante."
+    assert len(local.calls) == 2 and len(remote.calls) == 2
+    local_stats, remote_stats = router.stats()["backends"]
+    assert local_stats["errors"] == 2 and remote_stats["wins"] == 2
+
+
+def test_all_backends_down_raises_llm_error():
+    router = _router(FakeLLM(fail=True, model="a"), FakeLLM(fail=True, model="b"))
+    with pytest.raises(LLMError, match="All LLM backends failed"):
+        _ask(router)
+
+
+def test_breaker_opens_then_closes_after_a_successful_trial():
+    local = FakeLLM(fail=True, model="local")
+    remote = FakeLLM(model="remote")
+    router = _router(local, remote)
+    health = router.health[0]
+
+    _ask(router)
+    assert health.state == CLOSED
+    _ask(router)
+    assert health.state == OPEN
+
+    _ask(router)  # circuit ouvert : le backend local n'est plus appelé
+    assert len(local.calls) == 2 and health.stats()["skipped"] == 1
+
+    time.sleep(0.15)
+    local.fail = False
+    assert _ask(router) == "Réponse du modèle."  # requête d'essai (half-open) réussie
+    assert health.state == CLOSED and len(local.calls) == 3
+
+
+def test_failed_trial_reopens_the_breaker():
+    local = FakeLLM(fail=True, model="local")
+    router = _router(local, FakeLLM(model="remote"), failure_threshold=1)
+    health = router.health[0]
+
+    _ask(router)
+    assert health.state == OPEN
+    time.sleep(0.15)
+    assert health.allow() and health.state == HALF_OPEN
+    assert not health.allow()  # une seule requête d'essai à la fois
+    health.failure()
+    assert health.state == OPEN
+
+
+def test_slow_backend_is_hedged():
+    slow = FakeLLM(reply="Réponse lente.", delay=0.5, model="slow")
+    fast = FakeLLM(reply="Réponse rapide.", model="fast")
+    router = _router(slow, fast, hedge=True, hedge_default_delay=0.05)
+
+    start = time.perf_counter()
+    assert _ask(router) == "Réponse rapide."
+    assert time.perf_counter() - start < 0.4
+    assert router.health[1].stats()["hedged"] == 1
+
+    start = time.perf_counter()
+    assert asyncio.run(router.agenerate_chat("prompt", [])) == "Réponse rapide."
+    assert time.perf_counter() - start < 0.4
+    assert router.health[0].state == CLOSED  # la requête perdante annulée n'est pas un échec
+
+
+def test_no_hedge_waits_for_the_primary():
+    slow = FakeLLM(reply="Réponse lente.", delay=0.2, model="slow")
+    fast = FakeLLM(reply="Réponse rapide.", model="fast")
+    router = _router(slow, fast, hedge=False)
+    assert _ask(router) == "Réponse lente."
+    assert fast.calls == []
+
+
+def test_stream_fails_over_before_the_first_delta():
+    router = _router(FakeLLM(fail=True, model="local"), FakeLLM(reply="Flux distant.", model="remote"))
+    assert list(router.generate_chat_stream("prompt", [])) == ["Flux distant."]
+
+    async def collect():
+        return [delta async for delta in router.agenerate_chat_stream("prompt", [])]
+    assert asyncio.run(collect()) == ["Flux distant."]
+    assert router.health[0].state == OPEN
+
+
+def _saturate(router, free=0):
+    """Occupe les threads de l'exécuteur du routeur, sauf `free` ; release.set() les libère."""
+    release = threading.Event()
+    for _ in range(router._executor._max_workers - free):
+        router._executor.submit(release.wait, 5.0)
+    return release
+
+
+def test_hedge_delay_counts_from_when_the_primary_starts():
+    primary = FakeLLM(reply="Réponse principale.", delay=0.1, model="primary")
+    backup = FakeLLM(reply="Réponse de secours.", model="backup")
+    router = _router(primary, backup, hedge=True, hedge_default_delay=0.15)
+    release = _saturate(router)
+    threading.Timer(0.2, release.set).start()
+
+    # 0.2 s d'attente dans la file : le délai de 0.15 s ne court qu'à partir du démarrage
+    assert _ask(router) == "Réponse principale."
+    assert backup.calls == [] and router.health[1].stats()["hedged"] == 0
+
+
+def test_queued_losing_request_is_cancelled():
+    primary = FakeLLM(reply="Réponse principale.", delay=0.2, model="primary")
+    backup = FakeLLM(reply="Réponse de secours.", model="backup")
+    router = _router(primary, backup, hedge=True, hedge_default_delay=0.05)
+    release = _saturate(router, free=1)  # le primaire prend le dernier thread libre
+    # une tâche en file avant la requête doublée : le thread du primaire, une fois libre, la prend
+    threading.Timer(0.02, router._executor.submit, (release.wait, 5.0)).start()
+
+    assert _ask(router) == "Réponse principale."
+    assert router.health[1].stats()["hedged"] == 1
+    release.set()
+    router._executor.submit(lambda: None).result(1.0)
+    time.sleep(0.05)
+    assert backup.calls == []
+
+
+def test_running_losing_request_finishes_in_the_background():
+    slow = FakeLLM(reply="Réponse lente.", delay=0.3, model="slow")
+    fast = FakeLLM(reply="Réponse rapide.", model="fast")
+    router = _router(slow, fast, hedge=True, hedge_default_delay=0.05)
+
+    assert _ask(router) == "Réponse rapide."
+    assert router.health[0].stats()["calls"] == 0  # toujours en cours
+    time.sleep(0.4)
+    stats = router.health[0].stats()
+    assert stats["calls"] == 1 and stats["errors"] == 0 and stats["state"] == CLOSED
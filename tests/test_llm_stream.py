@@ -0,0 +1,116 @@
+import io
+import json
+
+import pytest
+import requests
+
+from app.http_transport import TransportResponse
+from app.llm import LLMClient, LLMError
+from app.sentences import SentenceChunker, iter_sentences
+
+
+def _sse_response(*events, content_type="text/event-stream"):
+    body = "".join(f"data: {json.dumps(e, ensure_ascii=False)}\n\n" for e in events) + "data: [DONE]\n\n"
+    response = requests.Response()
+    response.status_code = 200
+    response.headers["Content-Type"] = content_type
+    response.raw = io.BytesIO(body.encode("utf-8"))
+    return TransportResponse(response, streamed=True)
+
+
+def _client(backend):
+    client = LLMClient.__new__(LLMClient)
+    client.backend = backend
+    return client
+
+
+def test_sse_lines_are_decoded_as_utf8_without_charset():
+    response = _sse_response({"choices": [{"delta": {"content": "Réservée à côté, "}}]},
+                             {"choices": [{"delta": {"content": "très bien « à 14 h »."}}]})
+    deltas = [LLMClient._chat_completions_delta(e) for e in _client("openai")._iter_events(response)]
+    assert "".join(deltas) == "Réservée à côté, très bien « à 14 h »."
+
+
+def test_sse_stops_at_done_and_rejects_malformed_events():
+    response = _sse_response({"token": {"text": "é"}})
+    assert list(_client("hf_tgi")._iter_events(response)) == [{"token": {"text": "é"}}]
+
+    response = requests.Response()
+    response.raw = io.BytesIO(b"data: {pas du json\n\n")
+    with pytest.raises(LLMError):
+        list(_client("openai")._iter_events(TransportResponse(response, streamed=True)))
+
+
+def test_ollama_stream_is_one_json_object_per_line():
+    body = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in (
+        {"message": {"content": "Très "}, "done": False},
+        {"message": {"content": "bien."}, "done": False},
+        {"message": {"content": ""}, "done": True},
+    ))
+    response = requests.Response()
+    response.headers["Content-Type"] = "application/x-ndjson"
+    response.raw = io.BytesIO(body.encode("utf-8"))
+    client = _client("ollama")
+    deltas = [LLMClient._ollama_delta(e) for e in client._iter_events(TransportResponse(response, streamed=True))]
+    assert "".join(deltas) == "Très bien."
+
+
+def test_first_sentence_is_released_as_soon_as_complete():
+    chunker = SentenceChunker(min_chars=20)
+    assert chunker.feed("Oui. ") == ["Oui."]
+    assert chunker.feed("Ok. La salle B12 ") == []
+    assert chunker.feed("est libre ! Autre chose ?") == ["Ok. La salle B12 est libre !"]
+    assert chunker.flush() == ["Autre chose ?"]
+
+
+def test_abbreviations_do_not_end_a_sentence():
+    deltas = ["Bonjour M. Dupont, ", "la salle est prête. ", "Au revoir."]
+    assert list(iter_sentences(deltas)) == ["Bonjour M. Dupont, la salle est prête.", "Au revoir."]
+
+
+def test_long_sentence_is_cut_on_a_comma():
+    chunker = SentenceChunker(max_chars=30)
+    assert chunker.feed("Il reste la salle A, la salle B, la salle C et la salle D") == \
+        ["Il reste la salle A,", "la salle B,"]
+
+
+class FakeNLU:
+    def parse(self, text):
+        return {"intent": "unknown", "entities": {}, "raw_text": text}
+
+
+class FakeDialog:
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+
+    async def ahandle_stream(self, session_id, parse_result, use_cache=True):
+        yield {"type": "sentence", "text": "Très bien.", "index": 0}
+        if self.fail_after == 1:
+            raise RuntimeError("LLM coupé")
+        yield {"type": "end", "text": "Très bien.", "actions": {}, "session_id": session_id}
+
+
+def _ndjson(response):
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_respond_stream_is_one_json_object_per_line(server):
+    server.install("nlu", FakeNLU())
+    server.install("dialog", FakeDialog())
+    response = server.request("POST", "/v1/respond/stream", json={"text": "réserve", "session_id": "s1"})
+    assert response.status_code == 200
+    assert "Très bien." in response.text  # UTF-8 brut, pas d'échappement \u00e8
+    assert _ndjson(response) == [
+        {"type": "sentence", "text": "Très bien.", "index": 0},
+        {"type": "end", "text": "Très bien.", "actions": {}, "session_id": "s1"},
+    ]
+
+
+def test_respond_stream_ends_with_an_error_event(server):
+    server.install("nlu", FakeNLU())
+    server.install("dialog", FakeDialog(fail_after=1))
+    events = _ndjson(server.request("POST", "/v1/respond/stream", json={"text": "réserve", "session_id": "s1"}))
+    assert events[0]["type"] == "sentence"
+    assert events[-1] == {"type": "error", "detail": "LLM coupé", "session_id": "s1"}
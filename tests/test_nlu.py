@@ -0,0 +1,212 @@
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from app.intent_scorer import IntentScorer  # noqa: E402
+from app.nlu import NLU  # noqa: E402
+
+TEXTS = [
+    "Bonjour",
+    "Quels sont les horaires ?",
+    "je voudrais réserver le yoga demain",
+    "",
+    "où est la salle de sport",
+    "QUELS SONT LES HORAIRES ?",
+    "je voudrais réserver le yoga demain",
+    "   ",
+    "il y a du basket au vestiaire ?",
+]
+
+
+@pytest.fixture(scope="module")
+def model_paths(tmp_path_factory):
+    """ Petits modèles : textcat TextCatBOW (3 itérations), entity_ruler, pipeline unifié et IntentScorer """
+    root = tmp_path_factory.mktemp("nlu_models")
+
+    from app.nlu_train import export_intent_scorer, export_unified, train
+    train(str(root / "intent"), n_iter=3)
+
+    entity = spacy.blank("fr")
+    entity.add_pipe("entity_ruler").add_patterns([
+        {"label": "ACTIVITY", "pattern": "yoga"},
+        {"label": "ACTIVITY", "pattern": "basket"},
+        {"label": "LOCATION", "pattern": "vestiaire"},
+        {"label": "LOCATION", "pattern": [{"LOWER": "salle"}, {"LOWER": "de"}, {"LOWER": "sport"}]},
+    ])
+    entity.to_disk(root / "entity")
+
+    check_texts = [t.strip().lower() for t in TEXTS if t.strip()]  # textes normalisés comme par NLU
+    assert export_unified(str(root / "intent"), str(root / "entity"), str(root / "unified"), check_texts) == 0
+    assert export_intent_scorer(str(root / "intent"), str(root / "scorer.bin"), check_texts) == 0
+    return {"intent": str(root / "intent"), "entity": str(root / "entity"), "unified": str(root / "unified"),
+            "scorer": str(root / "scorer.bin"), "missing": str(root / "missing")}
+
+
+@pytest.fixture
+def make_nlu(model_paths, monkeypatch):
+    for var in ("INTENT_MODEL_PATH", "ENTITY_MODEL_PATH", "NLU_MODEL_PATH", "NLU_BATCH_SIZE", "NLU_N_PROCESS",
+                "NLU_ENTITIES", "NLU_GAZETTEER_PATH", "NLU_INTENT_SCORER"):
+        monkeypatch.delenv(var, raising=False)
+
+    def make(setup="separate", entity_backend=None):
+        unified = model_paths["unified"] if setup == "unified" else model_paths["missing"]
+        scorer = model_paths["scorer"] if setup == "scorer" else model_paths["missing"]
+        return NLU(model_paths["intent"], model_paths["entity"], unified, threshold=0.0,
+                   entity_backend=entity_backend, intent_scorer_path=scorer)
+    return make
+
+
+@pytest.fixture
+def nlu(make_nlu):
+    return make_nlu()
+
+
+@pytest.mark.parametrize("setup", ["separate", "unified", "scorer"])
+def test_parse_batch_matches_parse(make_nlu, setup):
+    nlu = make_nlu(setup)
+    assert nlu.unified == (setup == "unified")
+    expected = [nlu.parse(t) for t in TEXTS]
+    assert nlu.parse_batch(TEXTS) == expected
+    assert nlu.parse_batch(TEXTS, batch_size=2) == expected
+    assert nlu.parse_batch(iter(TEXTS)) == expected
+
+
+@pytest.mark.parametrize("setup", ["unified", "scorer"])
+def test_same_results_as_the_two_models(make_nlu, setup):
+    separate, other = make_nlu("separate"), make_nlu(setup)
+    assert other.parse_batch(TEXTS) == separate.parse_batch(TEXTS)
+    for text in TEXTS:
+        assert other.parse_intents_confidences(text) == separate.parse_intents_confidences(text)
+
+
+def test_intent_scorer_with_the_gazetteer_loads_no_spacy_model(make_nlu):
+    nlu = make_nlu("scorer", entity_backend="gazetteer")
+    assert nlu.scorer is not None and nlu.intent_nlp is None and nlu.entity_nlp is None
+    separate = make_nlu("separate")
+    for result, expected in zip(nlu.parse_batch(TEXTS), separate.parse_batch(TEXTS)):
+        assert (result["intent"], result["confidence"]) == (expected["intent"], expected["confidence"])
+    assert nlu.parse("du basket-ball au vestiaire")["entities"] == {"activity": ["basket-ball"],
+                                                                    "location": ["vestiaire"]}
+
+
+@pytest.mark.parametrize("setup", ["separate", "unified"])
+def test_default_entities_come_from_the_model_only(make_nlu, model_paths, setup):
+    nlu = make_nlu(setup)
+    assert nlu.entity_backend == "model" and nlu.gazetteer is None
+    intent_nlp, entity_nlp = spacy.load(model_paths["intent"]), spacy.load(model_paths["entity"])
+    for text in TEXTS:
+        text_in = text.strip().lower()
+        if not text_in:
+            continue
+        cats = intent_nlp(text_in).cats
+        intent = max(cats, key=cats.get)
+        entities = {}
+        for ent in entity_nlp(text_in).ents:
+            entities.setdefault(ent.label_.lower(), []).append(ent.text)
+        expected = {"intent": intent, "confidence": round(cats[intent], 2), "entities": entities, "raw_text": text}
+        assert nlu.parse(text) == expected
+
+
+@pytest.mark.parametrize("setup", ["separate", "unified"])
+def test_gazetteer_backends(make_nlu, setup):
+    gazetteer = make_nlu(setup, entity_backend="gazetteer")
+    assert gazetteer._pipelines.entity_nlp is None
+    assert gazetteer.parse("où sont les vestiaires ?")["entities"] == {"location": ["vestiaires"]}
+    assert gazetteer.parse("du basket-ball")["entities"] == {"activity": ["basket-ball"]}
+
+    both = make_nlu(setup, entity_backend="both")
+    assert both.parse("du basket-ball au vestiaire")["entities"] == {"activity": ["basket-ball"],
+                                                                     "location": ["vestiaire"]}
+    assert both.parse_batch(TEXTS) == [both.parse(t) for t in TEXTS]
+
+    with pytest.raises(ValueError):
+        make_nlu(setup, entity_backend="regex")
+
+
+def test_parse_batch_keeps_order_and_raw_text(nlu):
+    results = nlu.parse_batch(TEXTS)
+    assert [r["raw_text"] for r in results] == TEXTS
+    assert results[3] == {"intent": "unknown", "confidence": 0.0, "entities": {}, "raw_text": ""}
+    assert results[2]["entities"] == {"activity": ["yoga"]}
+    assert results[4]["entities"] == {"location": ["salle de sport"]}
+    assert results[8]["entities"] == {"activity": ["basket"], "location": ["vestiaire"]}
+    assert nlu.parse_batch([]) == []
+
+
+def test_parse_batch_endpoint(server, nlu):
+    server.install("nlu", nlu)
+    response = server.request("POST", "/v1/parse_batch", json={"texts": TEXTS[:3], "batch_size": 2})
+    assert response.status_code == 200
+    assert response.json() == {"results": [nlu.parse(t) for t in TEXTS[:3]]}
+
+    response = server.request("POST", "/v1/parse_batch", json={"texts": TEXTS, "n_process": 0})
+    assert response.status_code == 422
+
+
+def _entity_model(path, patterns):
+    entity = spacy.blank("fr")
+    entity.add_pipe("entity_ruler").add_patterns(patterns)
+    entity.to_disk(path)
+    return str(path)
+
+
+def test_reload_invalidates_the_memo(model_paths, tmp_path, monkeypatch):
+    for var in ("NLU_CACHE_SIZE", "NLU_ENTITIES", "NLU_INTENT_SCORER"):
+        monkeypatch.delenv(var, raising=False)
+    entity_path = _entity_model(tmp_path / "entity", [{"label": "ACTIVITY", "pattern": "yoga"}])
+    nlu = NLU(model_paths["intent"], entity_path, model_paths["missing"], threshold=0.0,
+              intent_scorer_path=model_paths["missing"])
+    assert nlu.parse("du yoga")["entities"] == {"activity": ["yoga"]}
+
+    _entity_model(tmp_path / "entity", [{"label": "LOCATION", "pattern": "yoga"}])
+    assert nlu.parse("du yoga")["entities"] == {"activity": ["yoga"]}  # mémo : les anciens modèles répondent encore
+    assert nlu.cache_stats()["hits"] == 1
+
+    nlu.reload()
+    stats = nlu.cache_stats()
+    assert stats["generation"] == 1 and stats["size"] == 0
+    assert nlu.parse("du yoga")["entities"] == {"location": ["yoga"]}
+    assert nlu.parse_batch(["Du yoga"])[0]["entities"] == {"location": ["yoga"]}
+
+
+def test_memoized_results_are_returned_as_copies(nlu):
+    text = "je voudrais réserver le yoga demain"
+    first = nlu.parse(text)
+    expected = {**first, "entities": {k: list(v) for k, v in first["entities"].items()}}
+
+    first["intent"] = "modifié"
+    first["entities"]["activity"].append("tennis")
+    nlu.parse_batch([text])[0]["entities"]["location"] = ["accueil"]
+    nlu.parse_intents_confidences(text)["greeting"] = 2.0
+
+    assert nlu.parse(text) == expected
+    assert nlu.parse_batch([text]) == [expected]
+    assert nlu.parse_intents_confidences(text)["greeting"] <= 1.0
+    assert nlu.cache_stats()["hits"] >= 4
+
+
+def test_parse_batch_parses_each_distinct_text_once(nlu, monkeypatch):
+    calls = []
+    pipe = nlu.intent_nlp.pipe
+    monkeypatch.setattr(nlu.intent_nlp, "pipe", lambda texts, **kw: pipe(calls.extend(texts) or texts, **kw))
+    nlu.parse(TEXTS[1])
+    nlu.parse_batch(TEXTS)
+    # "quels sont les horaires ?" est mémoïsé, le doublon de la phrase yoga n'est analysé qu'une fois
+    assert sorted(calls) == sorted({t.strip().lower() for t in TEXTS if t.strip()} - {"quels sont les horaires ?"})
+
+
+def test_reload_reloads_the_intent_scorer(tmp_path, monkeypatch):
+    for var in ("NLU_CACHE_SIZE", "NLU_ENTITIES", "NLU_INTENT_SCORER"):
+        monkeypatch.delenv(var, raising=False)
+    path = str(tmp_path / "intent_scorer.bin")
+    IntentScorer(["greeting", "ask_hours"], [2.0, 0.0], [], []).save(path)
+    missing = str(tmp_path / "missing")
+    nlu = NLU(missing, missing, missing, entity_backend="gazetteer", intent_scorer_path=path)
+    assert nlu.parse("Bonjour")["intent"] == "greeting"
+
+    IntentScorer(["greeting", "ask_hours"], [0.0, 2.0], [], []).save(path)
+    assert nlu.parse("Bonjour")["intent"] == "greeting"  # mémo
+    nlu.reload()
+    assert nlu.cache_stats()["generation"] == 1
+    assert nlu.parse("Bonjour")["intent"] == "ask_hours"
+    assert nlu.parse_intents_confidences("Bonjour")["ask_hours"] > 0.5
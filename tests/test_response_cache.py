@@ -0,0 +1,59 @@
+import time
+
+from app.response_cache import ResponseCache
+
+
+def _turn(text):
+    return {"intent": "ask_hours", "confidence": 0.99, "entities": {}, "raw_text": text}
+
+
+def test_entries_expire_on_ttl():
+    cache = ResponseCache(default_ttl=0.05, intent_ttls={"greeting": 10})
+    short = cache.key("m", "prompt", "ask_hours", [{"role": "user", "content": "Horaires ?"}])
+    long = cache.key("m", "prompt", "greeting", [{"role": "user", "content": "Bonjour"}])
+    cache.put(short, "ask_hours", "8h-22h")
+    cache.put(long, "greeting", "Bonjour !")
+    assert cache.get(short) == "8h-22h"
+    time.sleep(0.1)
+    assert cache.get(short) is None
+    assert cache.get(long) == "Bonjour !"
+
+
+def test_key_ignores_case_accents_and_punctuation():
+    cache = ResponseCache()
+    a = cache.key("m", "p", "ask_hours", [{"role": "user", "content": "Quels sont les horaires ?"}])
+    b = cache.key("m", "p", "ask_hours", [{"role": "user", "content": "quels  sont les HORAIRES"}])
+    assert a == b
+    assert a != cache.key("other-model", "p", "ask_hours", [{"role": "user", "content": "quels sont les horaires"}])
+
+
+def test_second_session_is_served_from_cache(make_dialog):
+    dm = make_dialog()
+    first, _ = dm.handle("s1", _turn("Quels sont les horaires ?"))
+    second, _ = dm.handle("s2", _turn("quels sont les horaires"))
+    assert first == second and len(dm.llm.calls) == 1
+
+
+def test_use_cache_false_skips_the_cache(make_dialog):
+    dm = make_dialog()
+    dm.handle("s1", _turn("Quels sont les horaires ?"))
+    dm.handle("s2", _turn("Quels sont les horaires ?"), use_cache=False)
+    assert len(dm.llm.calls) == 2
+    assert dm.cache.stats()["skipped"] == 1
+
+
+def test_uncacheable_intent_always_calls_the_llm(make_dialog):
+    dm = make_dialog()
+    for sid in ("s1", "s2"):
+        dm.handle(sid, {"intent": "book_activity", "entities": {}, "raw_text": "Je veux réserver"})
+    assert len(dm.llm.calls) == 2
+
+
+def test_key_includes_the_conversation_summary(make_dialog):
+    dm = make_dialog()
+    for sid, summary in (("s1", "Le visiteur veut réserver du yoga."), ("s2", "Le visiteur cherche le vestiaire.")):
+        dm.sessions.get(sid)["summary"] = summary
+        dm.handle(sid, _turn("Quels sont les horaires ?"))
+    # same last messages, different folded history: no shared reply
+    assert len(dm.llm.calls) == 2
+    assert "yoga" in dm.llm.calls[0][0] and "vestiaire" in dm.llm.calls[1][0]
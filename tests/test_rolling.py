@@ -0,0 +1,107 @@
+import io
+import wave
+
+import numpy as np
+
+from app.audio_utils import load_audio
+from app.rolling import RollingTranscriber
+
+
+class FakeDetector:
+    """ Détecteur de veille factice : compte les décodages, « réveil » sur le mot pepper """
+
+    def __init__(self):
+        self.decoded = []
+
+    def load(self, audio, sample_rate=None):
+        return np.asarray(audio, dtype=np.float32)
+
+    def transcribe(self, samples):
+        self.decoded.append(len(samples))
+        return f"mot{len(self.decoded)}", 0.0
+
+    def score(self, text, no_speech_prob):
+        detected = "pepper" in text
+        return detected, 1.0 if detected else 0.0, "pepper" if detected else None
+
+    def build_result(self, detected, score, keyword, text, start_time):
+        return {"detected": detected, "score": score, "keyword": keyword, "text": text}
+
+
+def _chunk(value):
+    return np.full(1600, value, dtype=np.float32)
+
+
+def test_resent_chunk_is_replayed_without_decoding():
+    rolling, detector = RollingTranscriber(window_chunks=3, overlap=0.01), FakeDetector()
+    first = rolling.feed(detector, "robot", _chunk(0.1), seq=1)
+    second = rolling.feed(detector, "robot", _chunk(0.2), seq=2)
+    retry = rolling.feed(detector, "robot", _chunk(0.2), seq=2)
+
+    assert len(detector.decoded) == 2
+    assert first["text"] == "mot1"
+    assert retry["text"] == second["text"] == "mot1 mot2"  # texte non ajouté une 2e fois
+
+    third = rolling.feed(detector, "robot", _chunk(0.3), seq=3)
+    assert third["text"] == "mot1 mot2 mot3"  # la fenêtre continue après le renvoi
+
+
+def test_resent_chunk_after_wake_hits_the_chunk_cache():
+    class WakeDetector(FakeDetector):
+        def transcribe(self, samples):
+            super().transcribe(samples)
+            return "ok pepper", 0.0
+
+    rolling, detector = RollingTranscriber(), WakeDetector()
+    assert rolling.feed(detector, "robot", _chunk(0.5), seq=7)["detected"]
+    # le réveil a réinitialisé le flux : le renvoi est servi par le cache (stream_id, seq, chunk)
+    assert rolling.feed(detector, "robot", _chunk(0.5), seq=7)["detected"]
+    assert len(detector.decoded) == 1
+
+
+def test_gap_or_new_audio_resets_the_window():
+    rolling, detector = RollingTranscriber(overlap=0.0), FakeDetector()
+    rolling.feed(detector, "robot", _chunk(0.1), seq=1)
+    assert rolling.feed(detector, "robot", _chunk(0.2), seq=5)["text"] == "mot2"
+    # même seq mais audio différent : pas un renvoi, décodé normalement
+    assert rolling.feed(detector, "robot", _chunk(0.3), seq=5)["text"] == "mot3"
+    assert len(detector.decoded) == 3
+
+
+def _wav(value):
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(16000)
+        wf.writeframes((_chunk(value) * 32767).astype("<i2").tobytes())
+    return buffer.getvalue()
+
+
+def test_wake_endpoint_streams_by_stream_id_and_seq(server):
+    """ Contrat de client/network_client.send_wake_file : multipart `file`, ?stream_id=&seq= """
+
+    class EndpointDetector(FakeDetector):
+        def load(self, audio, sample_rate=None):
+            return load_audio(audio, sample_rate)
+
+        def detect(self, audio, sample_rate=None):
+            return {"detected": False, "text": "sans flux"}
+
+    detector = server.install("wake", EndpointDetector())
+    server.main.wake_streams.reset("robot")
+
+    def send(value, **params):
+        files = {"file": ("chunk.wav", _wav(value), "audio/wav")}
+        response = server.request("POST", "/v1/wake", files=files, params=params)
+        assert response.status_code == 200
+        return response.json()
+
+    send(0.1, stream_id="robot", seq=1)
+    second = send(0.2, stream_id="robot", seq=2)
+    retry = send(0.2, stream_id="robot", seq=2)
+    assert second["stream_id"] == "robot"
+    assert retry["text"] == second["text"] == "mot1 mot2"
+    assert len(detector.decoded) == 2
+
+    assert send(0.3)["text"] == "sans flux"  # sans stream_id : détection sur le seul clip
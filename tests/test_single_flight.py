@@ -0,0 +1,185 @@
+import asyncio
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm import LLMClient
+from app.single_flight import AsyncSingleFlight, SingleFlight
+
+
+def _run_threads(n, target):
+    results = [None] * n
+
+    def run(i):
+        try:
+            results[i] = target()
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5.0)
+    return results
+
+
+def test_concurrent_callers_share_one_call():
+    flight, calls = SingleFlight(), []
+
+    def fn():
+        calls.append(1)
+        deadline = time.monotonic() + 5.0
+        while flight.stats()["calls"] < 5 and time.monotonic() < deadline:  # tous les appelants arrivés
+            time.sleep(0.005)
+        return "réponse"
+
+    barrier = threading.Barrier(5)
+
+    def caller():
+        barrier.wait(5.0)  # les 5 appelants partent ensemble
+        return flight.do("key", fn)
+
+    results = _run_threads(5, caller)
+    assert results == ["réponse"] * 5
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 5, "shared": 4, "in_flight": 0}
+
+    assert flight.do("key", lambda: "nouvelle") == "nouvelle"  # pas un cache : un appel ultérieur repart
+
+
+def test_waiters_get_the_leader_error():
+    flight = SingleFlight()
+
+    def fn():
+        deadline = time.monotonic() + 5.0
+        while flight.stats()["calls"] < 3 and time.monotonic() < deadline:
+            time.sleep(0.005)
+        raise ValueError("backend down")
+
+    results = _run_threads(3, lambda: flight.do("key", fn))
+    assert all(isinstance(r, ValueError) for r in results)
+    assert flight.stats()["in_flight"] == 0
+
+
+def test_different_keys_do_not_share():
+    flight = SingleFlight()
+    assert flight.do("a", lambda: 1) == 1
+    assert flight.do("b", lambda: 2) == 2
+    assert flight.stats()["shared"] == 0
+
+
+def test_async_concurrent_callers_share_one_call():
+    flight, calls = AsyncSingleFlight(), []
+
+    async def fn(value):
+        calls.append(value)
+        await asyncio.sleep(0.05)
+        return value
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", fn, "réponse") for _ in range(5)),
+                                    flight.do("other", fn, "autre"))
+
+    assert asyncio.run(scenario()) == ["réponse"] * 5 + ["autre"]
+    assert calls == ["réponse", "autre"]
+    assert flight.stats() == {"calls": 6, "shared": 4, "in_flight": 0}
+
+
+def test_async_waiters_get_the_leader_error():
+    flight = AsyncSingleFlight()
+
+    async def fn():
+        await asyncio.sleep(0.01)
+        raise ValueError("backend down")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", fn) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(r, ValueError) for r in asyncio.run(scenario()))
+
+
+def test_async_cancelled_waiter_does_not_cancel_the_others():
+    flight = AsyncSingleFlight()
+    cancelled = []
+
+    async def fn():
+        try:
+            await asyncio.sleep(0.05)
+            return "réponse"
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", fn))
+        second = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        result = await second
+
+        # Dernier appelant parti : l'appel lui-même est annulé
+        alone = asyncio.ensure_future(flight.do("key", fn))
+        await asyncio.sleep(0.01)
+        alone.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await alone
+        await asyncio.sleep(0)
+        return result
+
+    assert asyncio.run(scenario()) == "réponse"
+    assert cancelled == [True]
+    assert flight.stats()["in_flight"] == 0
+
+
+class SlowTransport:
+    """Transport llama.cpp qui garde chaque requête ouverte jusqu'à ce que `expected` appelants soient là."""
+
+    def __init__(self, client, expected):
+        self.client, self.expected = client, expected
+        self.payloads = []
+
+    def post(self, url, params=None, json=None, headers=None, **kwargs):
+        self.payloads.append(json)
+        deadline = time.monotonic() + 1.0
+        while self.client.single_flight.stats()["calls"] < self.expected and time.monotonic() < deadline:
+            time.sleep(0.005)
+        return SimpleNamespace(status_code=200, text="", json=lambda: {"choices": [{"message": {"content": "Oui."}}]})
+
+
+def _llamacpp_client(tmp_path, expected):
+    path = tmp_path / "llm.json"
+    path.write_text(json.dumps({"backend": "llamacpp", "endpoint": "http://localhost:8080/v1", "slots": 2}))
+    client = LLMClient(str(path))
+    client.transport = SlowTransport(client, expected)
+    return client
+
+
+def test_same_request_on_the_same_slot_is_coalesced(tmp_path):
+    client = _llamacpp_client(tmp_path, expected=2)
+    history = [{"role": "user", "content": "Bonjour"}]
+    results = _run_threads(2, lambda: client.generate_chat("prompt", history, session_id="s1"))
+    assert results == ["Oui.", "Oui."]
+    assert len(client.transport.payloads) == 1
+
+
+def test_callers_pinned_to_different_slots_are_not_coalesced(tmp_path):
+    client = _llamacpp_client(tmp_path, expected=2)
+    client.slots.slot("s1"), client.slots.slot("s2")  # s1 -> slot 0, s2 -> slot 1
+    history = [{"role": "user", "content": "Bonjour"}]
+    sessions = iter(["s1", "s2"])
+    lock = threading.Lock()
+
+    def caller():
+        with lock:
+            session_id = next(sessions)
+        return client.generate_chat("prompt", history, session_id=session_id)
+
+    assert _run_threads(2, caller) == ["Oui.", "Oui."]
+    assert sorted(p["id_slot"] for p in client.transport.payloads) == [0, 1]
+    assert client.single_flight.stats()["shared"] == 0
@@ -0,0 +1,175 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+import faster_whisper.transcribe  # noqa: E402
+from faster_whisper import WhisperModel  # noqa: E402
+from faster_whisper.utils import get_logger  # noqa: E402
+
+from app import speech  # noqa: E402
+from app.speech import ASRModule  # noqa: E402
+from app.vad import VoiceActivityDetector  # noqa: E402
+
+WORDS = ["bonjour", "je", "voudrais", "une", "salle", "euh"]
+SPECIALS = ["<|endoftext|>", "<|startoftranscript|>", "<|en|>", "<|fr|>", "<|translate|>", "<|transcribe|>",
+            "<|startoflm|>", "<|startofprev|>", "<|nocaptions|>", "<|notimestamps|>"]
+NO_TIMESTAMPS = len(WORDS) + SPECIALS.index("<|notimestamps|>")
+TIMESTAMP_BEGIN = NO_TIMESTAMPS + 1
+
+
+def _words(*words):
+    return [WORDS.index(w) for w in words]
+
+
+def _ts(seconds):
+    return TIMESTAMP_BEGIN + round(seconds / 0.02)
+
+
+class FakeHFTokenizer:
+    def token_to_id(self, token):
+        return (WORDS + SPECIALS).index(token)
+
+    def encode(self, text, add_special_tokens=False):
+        return SimpleNamespace(ids=_words(*text.split()))
+
+    def decode(self, ids):
+        return "".join(" " + WORDS[i] for i in ids)
+
+
+class FakeFeatureExtractor:
+    """ Une trame par pas de 10 ms : la moyenne du signal, puis 30 s de trames nulles """
+
+    sampling_rate = 16000
+    hop_length = 160
+    nb_max_frames = 3000
+    time_per_frame = 0.01
+
+    def __call__(self, waveform, padding=True, chunk_length=None):
+        frames = waveform[:len(waveform) // 160 * 160].reshape(-1, 160).mean(axis=1)
+        features = np.concatenate([frames, np.zeros(self.nb_max_frames)])
+        return np.tile(features, (80, 1)).astype(np.float32)
+
+
+class FakeCT2:
+    """
+    Modèle CTranslate2 factice : la sortie dépend du niveau du clip (première trame de
+    la fenêtre), du nombre de trames non nulles, du prompt et de la température.
+    """
+
+    is_multilingual = True
+    device = "cpu"
+
+    def __init__(self):
+        self.generate_batches = []
+
+    def encode(self, features, to_cpu=False):
+        return np.asarray(features)
+
+    def detect_language(self, encoder_output):
+        return [[("<|en|>", 0.7), ("<|fr|>", 0.3)] if round(float(w[0, 0]), 2) == 0.5
+                else [("<|fr|>", 0.9), ("<|en|>", 0.1)] for w in encoder_output]
+
+    def generate(self, encoder_output, prompts, **kwargs):
+        self.generate_batches.append(len(prompts))
+        return [self._script(w, prompt, kwargs) for w, prompt in zip(encoder_output, prompts)]
+
+    def _script(self, window, prompt, kwargs):
+        level = round(float(window[0, 0]), 2)
+        content = int(np.count_nonzero(window[0]))
+        timestamps = NO_TIMESTAMPS not in prompt
+        sampled = kwargs.get("sampling_temperature", 0.0) > 0
+
+        tokens, score, no_speech = _words("bonjour", "je", "voudrais"), -0.2, 0.05
+        if level == 0.2:  # silence
+            tokens, score, no_speech = _words("euh"), -2.0, 0.9
+        elif level == 0.3 and not sampled:  # logprob trop bas : repli de température
+            tokens, score = _words("salle"), -2.0
+        elif level == 0.4 and content == 100 and timestamps:  # segment inachevé : seconde fenêtre
+            tokens = [_ts(0.0)] + _words("une") + [_ts(0.6), _ts(0.6)] + _words("salle")
+        elif timestamps:
+            tokens = [_ts(0.0)] + _words("bonjour", "je") + [_ts(0.4), _ts(0.4)] + _words("voudrais") + [_ts(0.9)]
+        return SimpleNamespace(sequences_ids=[tokens], scores=[score], no_speech_prob=no_speech)
+
+
+@pytest.fixture
+def asr(monkeypatch):
+    monkeypatch.setattr(faster_whisper.transcribe, "get_ctranslate2_storage", np.asarray)
+    monkeypatch.setattr(speech, "get_ctranslate2_storage", np.asarray)
+
+    whisper = WhisperModel.__new__(WhisperModel)
+    whisper.logger = get_logger()
+    whisper.model = FakeCT2()
+    whisper.hf_tokenizer = FakeHFTokenizer()
+    whisper.feature_extractor = FakeFeatureExtractor()
+    whisper.num_samples_per_token = 320
+    whisper.frames_per_second = 100
+    whisper.tokens_per_second = 50
+    whisper.input_stride = 2
+    whisper.time_precision = 0.02
+    whisper.max_length = 448
+
+    asr = ASRModule.__new__(ASRModule)
+    asr.model = whisper
+    asr.logprob_threshold, asr.nospeech_threshold = -1.0, 0.6
+    asr.vad = VoiceActivityDetector(model="off")
+    asr.default_language, asr.default_profile = "fr", "accurate"
+    return asr
+
+
+def _clips(*levels):
+    return [np.full(16000, level, dtype=np.float32) for level in levels]
+
+
+def _without_timing(results):
+    return [{k: v for k, v in r.items() if k != "processing_time"} for r in results]
+
+
+@pytest.mark.parametrize("language", [None, "fr"])
+@pytest.mark.parametrize("profile", ["fast", "accurate"])
+def test_batch_matches_transcribe(asr, profile, language):
+    # parole, silence, repli de température, segment inachevé, autre langue détectée
+    clips = _clips(0.1, 0.2, 0.3, 0.4, 0.5)
+    expected = [asr.transcribe(clip, **asr.decode_options(profile, language)) for clip in clips]
+    asr.model.model.generate_batches.clear()
+
+    results = asr.process_batch(clips, profile=profile, language=language)
+
+    assert _without_timing(results) == _without_timing(expected)
+    assert asr.model.model.generate_batches[0] == len(clips)
+
+
+def test_clips_that_need_another_decode_are_redecoded_alone(asr):
+    # "accurate" garde le repli de température et les timestamps : clips 0.3 et 0.4 redécodés seuls
+    asr.process_batch(_clips(0.1, 0.3, 0.4), profile="accurate", language="fr")
+    first, *single = asr.model.model.generate_batches
+    assert first == 3 and len(single) >= 2 and set(single) == {1}
+
+    # "fast" : une seule température, sans timestamps, tout le lot est gardé
+    asr.model.model.generate_batches.clear()
+    asr.process_batch(_clips(0.1, 0.3, 0.4), profile="fast")
+    assert asr.model.model.generate_batches == [3]
+
+
+def test_batch_of_plain_clips_is_decoded_once(asr):
+    clips = _clips(0.1, 0.6, 0.7)
+    expected = [asr.transcribe(clip, **asr.decode_options("accurate", "fr")) for clip in clips]
+    asr.model.model.generate_batches.clear()
+
+    results = asr.process_batch(clips, profile="accurate", language="fr")
+    assert asr.model.model.generate_batches == [3]
+    assert _without_timing(results) == _without_timing(expected)
+
+
+def test_generate_receives_the_library_options(asr, monkeypatch):
+    calls = []
+    generate = asr.model.model.generate
+    monkeypatch.setattr(asr.model.model, "generate", lambda *a, **kw: calls.append(kw) or generate(*a, **kw))
+
+    for profile in ("fast", "accurate"):
+        calls.clear()
+        asr.transcribe(_clips(0.1)[0], **asr.decode_options(profile, "fr"))
+        asr.process_batch(_clips(0.1, 0.6), profile=profile, language="fr")
+        assert calls[0] == calls[1]
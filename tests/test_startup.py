@@ -0,0 +1,74 @@
+import threading
+
+import pytest
+
+from app.startup import FAILED, READY, ComponentNotReady, ComponentRegistry, LazyComponent
+
+
+def test_get_before_load_raises_and_starts_loading():
+    release = threading.Event()
+    component = LazyComponent("asr", lambda: release.wait(5.0) and "modèle")
+    with pytest.raises(ComponentNotReady) as info:
+        component.get()
+    assert info.value.name == "asr"
+
+    release.set()
+    for thread in threading.enumerate():
+        if thread.name == "load-asr":
+            thread.join(5.0)
+    assert component.state == READY and component.get() == "modèle"
+
+
+def test_failed_load_is_reported_and_retried():
+    attempts = []
+
+    def factory():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("modèle introuvable")
+        return "ok"
+
+    component = LazyComponent("nlu", factory)
+    component.load()
+    assert component.state == FAILED
+    assert component.status()["error"] == "modèle introuvable"
+
+    component.load()
+    assert component.get() == "ok" and len(attempts) == 2
+
+
+def test_registry_readiness_lists_every_component():
+    registry = ComponentRegistry("lazy")
+    registry.register("asr", lambda: "asr").load()
+    registry.register("nlu", lambda: "nlu")
+
+    readiness = registry.readiness()
+    assert not readiness["ready"] and readiness["mode"] == "lazy"
+    assert readiness["components"]["asr"]["state"] == READY
+    assert readiness["components"]["nlu"]["state"] == "pending"
+
+
+def test_lazy_registry_does_not_load_on_start():
+    loaded = []
+    registry = ComponentRegistry("lazy")
+    registry.register("asr", lambda: loaded.append("asr"))
+    registry.start()
+    assert loaded == []
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        ComponentRegistry("eager")
+
+
+def test_endpoints_answer_503_until_components_are_ready(server):
+    component = server.main.components.register("asr", lambda: None)
+    component.load_in_background = lambda: None  # reste "pending" pendant le test
+
+    assert server.request("GET", "/health").status_code == 200
+    assert server.request("GET", "/ready").status_code == 503
+
+    response = server.request("POST", "/v1/asr", content=b"\x00\x01" * 1600)
+    assert response.status_code == 503
+    assert response.json()["component"] == "asr"
+    assert response.headers["Retry-After"] == "5"
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from app.vad import VoiceActivityDetector
+
+FRAME = 480  # 30 ms à 16 kHz
+
+
+def _tone(seconds, db, rng=None):
+    """ Bruit blanc d'énergie RMS `db` dBFS """
+    rng = rng or np.random.default_rng(0)
+    noise = rng.standard_normal(int(seconds * 16000)).astype(np.float32)
+    return noise / np.sqrt(np.mean(noise ** 2)) * 10 ** (db / 20)
+
+
+def test_frame_energy_is_rms_in_dbfs():
+    vad = VoiceActivityDetector()
+    energy = vad.frame_energy_db(np.full(FRAME * 3 + 10, 0.5, dtype=np.float32))
+    assert len(energy) == 3  # trames complètes seulement
+    assert np.allclose(energy, 20 * np.log10(0.5), atol=1e-3)
+
+
+def test_energy_floor_rejects_quiet_clips():
+    # Tout le clip sous -45 dBFS : silence, même avec un écart net au bruit de fond
+    clip = np.concatenate([_tone(1.0, -70), _tone(1.0, -50)])
+    assert VoiceActivityDetector().detect(clip) is None
+
+
+def test_threshold_follows_the_noise_floor():
+    # Bruit de fond à -30 dBFS : une "voix" à -25 dB reste sous le 10e percentile + 8 dB
+    vad = VoiceActivityDetector()
+    assert vad.detect(np.concatenate([_tone(1.0, -30), _tone(1.0, -25), _tone(1.0, -30)])) is None
+    assert vad.detect(np.concatenate([_tone(1.0, -30), _tone(1.0, -15), _tone(1.0, -30)])) is not None
+
+
+def test_trim_keeps_speech_with_padding():
+    vad = VoiceActivityDetector(padding_ms=250)
+    clip = np.concatenate([_tone(1.0, -60), _tone(0.6, -20), _tone(1.0, -60)])
+    start, end = vad.detect(clip)
+    assert start == pytest.approx(16000 - 4000, abs=FRAME)
+    assert end == pytest.approx(16000 + 9600 + 4000, abs=FRAME)
+    assert len(vad.trim(clip)) == end - start
+
+
+def test_short_bursts_are_not_speech():
+    vad = VoiceActivityDetector(min_speech_ms=200)
+    click = np.concatenate([_tone(1.0, -60), _tone(0.09, -10), _tone(1.0, -60)])
+    assert vad.detect(click) is None
+
+
+def test_off_keeps_everything():
+    clip = np.zeros(16000, dtype=np.float32)
+    vad = VoiceActivityDetector(model="off")
+    assert not vad.enabled
+    assert vad.detect(clip) == (0, 16000)
+
+
+def test_unknown_model_is_rejected():
+    with pytest.raises(ValueError):
+        VoiceActivityDetector(model="magic")
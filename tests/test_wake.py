@@ -0,0 +1,79 @@
+from collections import namedtuple
+
+import numpy as np
+import pytest
+
+pytest.importorskip("faster_whisper")
+
+from app.vad import VoiceActivityDetector  # noqa: E402
+from app.wake import WakeWordDetector  # noqa: E402
+
+Segment = namedtuple("Segment", ["text", "no_speech_prob"])
+
+
+class FakeWhisper:
+    def __init__(self, text, no_speech_prob=0.05):
+        self.text = text
+        self.no_speech_prob = no_speech_prob
+        self.calls = []
+
+    def transcribe(self, audio, **options):
+        self.calls.append(options)
+        segments = [Segment(self.text, self.no_speech_prob)] if self.text else []
+        return iter(segments), None
+
+
+def _detector(text, no_speech_prob=0.05, vad="energy"):
+    detector = WakeWordDetector.__new__(WakeWordDetector)
+    detector.model = FakeWhisper(text, no_speech_prob)
+    detector.vad = VoiceActivityDetector(model=vad)
+    detector.wake_words = ["pepper", "bonjour"]
+    detector.language = "fr"
+    detector.threshold = 0.7
+    detector.max_new_tokens = 16
+    detector.prompt = "Pepper, Bonjour."
+    return detector
+
+
+def _speech(seconds=1.0):
+    """ Une seconde de "voix" (bruit à -20 dBFS) entourée de silence """
+    rng = np.random.default_rng(0)
+    voice = rng.standard_normal(int(seconds * 16000)) * 0.1
+    silence = np.zeros(8000)
+    return np.concatenate([silence, voice, silence]).astype(np.float32)
+
+
+@pytest.mark.parametrize("text, keyword", [
+    ("Bonjour !", "bonjour"),
+    ("Hé Peppeur, viens", "pepper"),
+    ("bonjours", "bonjour"),
+])
+def test_misspelled_wake_words_are_detected(text, keyword):
+    result = _detector(text).detect(_speech())
+    assert result["detected"] and result["keyword"] == keyword
+
+
+def test_other_words_are_not_wake_words():
+    result = _detector("on se voit demain").detect(_speech())
+    assert not result["detected"] and result["keyword"] is None
+
+
+def test_no_speech_probability_lowers_the_score():
+    result = _detector("Pepper", no_speech_prob=0.5).detect(_speech())
+    assert result["score"] == 0.5 and not result["detected"]
+
+
+def test_silence_never_reaches_the_model():
+    detector = _detector("Pepper")
+    result = detector.detect(np.zeros(16000, dtype=np.float32))
+    assert not result["detected"]
+    assert detector.model.calls == []
+
+
+def test_decoding_is_greedy_and_short():
+    detector = _detector("Pepper")
+    detector.detect(_speech())
+    options, = detector.model.calls
+    assert options["beam_size"] == 1 and options["temperature"] == 0.0
+    assert options["without_timestamps"] and options["language"] == "fr"
+    assert options["max_new_tokens"] == 16 and options["initial_prompt"] == "Pepper, Bonjour."